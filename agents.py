@@ -0,0 +1,221 @@
+import random
+import time
+from game_constants import *
+from cards import *
+
+# Default thinking time per turn, in seconds
+DEFAULT_TIME_BUDGET = 0.01
+
+class Agent:
+    # Base class for computer players. play_turn() asks the agent where to move,
+    # what to suggest and whether to accuse; GameState.make_suggestion asks it which
+    # card to show when it can disprove someone else's suggestion
+    def __init__(self, rng=None, time_budget=DEFAULT_TIME_BUDGET):
+        self.rng = rng if rng is not None else random.Random()
+        self.time_budget = time_budget
+        self.deadline = None
+
+    def begin_turn(self):
+        self.deadline = time.perf_counter() + self.time_budget
+
+    def time_left(self):
+        if self.deadline is None:
+            return self.time_budget
+        return self.deadline - time.perf_counter()
+
+    def close(self):
+        # Let go of anything held between turns, such as a process pool; called
+        # once the agent's game is over
+        pass
+
+    def choose_move_target(self, state, player_idx):
+        # Position to walk towards with this roll, or None to stay put
+        return None
+
+    def choose_suggestion(self, state, player_idx, room_idx):
+        # (character card, weapon card) to suggest in this room, or None to skip
+        return None
+
+    def choose_accusation(self, state, player_idx):
+        # (character card, weapon card, room card) to accuse, or None
+        knowledge = state.deduction.players[player_idx]
+        if knowledge.is_solved():
+            return knowledge.solution()
+        if not self.can_learn_more(state, player_idx):
+            return self.guess(knowledge)
+        return None
+
+    def choose_card_to_show(self, state, player_idx, suggester_idx, cards):
+        # One of cards (all in this player's hand) to show the suggester
+        return self.rng.choice(cards)
+
+    def opponent_cards(self, state, player_idx):
+        # Mask of cards an active opponent might be holding; only these can ever be shown
+        possible = state.deduction.players[player_idx].possible
+        mask = 0
+        for i, player in enumerate(state.players):
+            if i != player_idx and player["active"]:
+                mask |= possible[i]
+        return mask
+
+    def informative_cards(self, state, player_idx):
+        # Envelope candidates that an active opponent might hold. Once there are none
+        # left, the rest is split between the envelope and the undealt pile and no
+        # suggestion will tell them apart
+        knowledge = state.deduction.players[player_idx]
+        return (self.opponent_cards(state, player_idx) & knowledge.possible[knowledge.envelope] &
+                ~knowledge.known[knowledge.envelope])
+
+    def can_learn_more(self, state, player_idx):
+        return self.informative_cards(state, player_idx) != 0
+
+    def guess(self, knowledge):
+        return tuple(self.rng.choice(knowledge.envelope_candidates(category))
+                     for category in (CHARACTER_MASK, WEAPON_MASK, ROOM_MASK))
+
+    def nearest_room(self, state, position, rooms):
+        # The room in rooms with the closest center, or None if none can be reached
+        board = state.board
+        best = None
+        best_distance = None
+        for room_idx in rooms:
+            distance = board.distance(position, board.room_centers[room_idx])
+            if distance is not None and distance > 0 and (best_distance is None or distance < best_distance):
+                best = room_idx
+                best_distance = distance
+        return best
+
+class RandomAgent(Agent):
+    # Wanders to a random reachable position and suggests at random
+    def choose_move_target(self, state, player_idx):
+        reachable = sorted(state.get_reachable_positions())
+        return self.rng.choice(reachable) if reachable else None
+
+    def choose_suggestion(self, state, player_idx, room_idx):
+        return (self.rng.choice(cards_in(CHARACTER_MASK)), self.rng.choice(cards_in(WEAPON_MASK)))
+
+class GreedyRoomAgent(Agent):
+    # Heads for the nearest other room and suggests cards that could still be in the envelope
+    def choose_move_target(self, state, player_idx):
+        position = state.players[player_idx]["position"]
+        room_idx = self.nearest_room(state, position, range(len(ROOMS)))
+        return state.board.room_centers[room_idx] if room_idx is not None else None
+
+    def choose_suggestion(self, state, player_idx, room_idx):
+        knowledge = state.deduction.players[player_idx]
+        return (self.rng.choice(knowledge.envelope_candidates(CHARACTER_MASK)),
+                self.rng.choice(knowledge.envelope_candidates(WEAPON_MASK)))
+
+class DeductionAgent(Agent):
+    # Uses its deduction matrix to pick rooms and suggestions that can still teach it
+    # something, accuses once nothing more can be learned, and shows the same card again to whoever has already seen it
+    def __init__(self, rng=None, time_budget=DEFAULT_TIME_BUDGET):
+        super().__init__(rng, time_budget)
+        self.shown = {}  # Suggester index -> mask of cards already shown to them
+
+    def candidate_rooms(self, state, player_idx):
+        # Rooms worth heading for, and those of them reachable with this roll
+        player = state.players[player_idx]
+        board = state.board
+        current_room = board.get_room_center_at(*player["position"])
+
+        # Rooms that could teach us something, or else rooms nobody can show us, so
+        # that a disproof has to come from the character or weapon
+        rooms = self.informative_cards(state, player_idx) & ROOM_MASK
+        if not rooms:
+            rooms = ROOM_MASK & ~self.opponent_cards(state, player_idx)
+        candidates = [card - FIRST_ROOM_CARD for card in cards_in(rooms)]
+        candidates = [room_idx for room_idx in candidates if room_idx != current_room] or \
+                     [room_idx for room_idx in range(len(ROOMS)) if room_idx != current_room]
+        reachable = [room_idx for room_idx in board.reachable_rooms(player["position"], state.moves_left)
+                     if room_idx in candidates]
+        return candidates, reachable
+
+    def choose_move_target(self, state, player_idx):
+        # Prefer a room we can reach with this roll
+        candidates, reachable = self.candidate_rooms(state, player_idx)
+        room_idx = self.nearest_room(state, state.players[player_idx]["position"], reachable or candidates)
+        return state.board.room_centers[room_idx] if room_idx is not None else None
+
+    def choose_suggestion(self, state, player_idx, room_idx):
+        informative = self.informative_cards(state, player_idx)
+        unshowable = ALL_CARDS_MASK & ~self.opponent_cards(state, player_idx)
+        return (self.pick(informative, unshowable, CHARACTER_MASK), self.pick(informative, unshowable, WEAPON_MASK))
+
+    def pick(self, informative, unshowable, category):
+        # A card that could teach us something, or else one nobody can show us
+        return self.rng.choice(cards_in(informative & category) or cards_in(unshowable & category) or
+                               cards_in(category))
+
+    def choose_card_to_show(self, state, player_idx, suggester_idx, cards):
+        already_shown = [card for card in cards if self.shown.get(suggester_idx, 0) >> card & 1]
+        card = self.rng.choice(already_shown or cards)
+        self.shown[suggester_idx] = self.shown.get(suggester_idx, 0) | (1 << card)
+        return card
+
+def mcts_agent(*args, **kwargs):
+    # mcts.py builds on the agents here, so it's only imported once one is wanted
+    from mcts import MCTSAgent
+    return MCTSAgent(*args, **kwargs)
+
+# Agent classes (or functions making them) by the name used on the command line
+AGENT_TYPES = {
+    "random": RandomAgent,
+    "greedy": GreedyRoomAgent,
+    "deduction": DeductionAgent,
+    "mcts": mcts_agent
+}
+
+# Agent types that can spread their search over a pool of worker processes
+PARALLEL_AGENT_TYPES = {"mcts"}
+
+def make_agent(kind, rng=None, time_budget=None, workers=1):
+    # time_budget defaults to the agent type's own. workers is the number of
+    # processes for the agent types that can use them; the others ignore it
+    if kind not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent type '{kind}', expected one of: {', '.join(AGENT_TYPES)}")
+    options = {}
+    if time_budget is not None:
+        options["time_budget"] = time_budget
+    if kind in PARALLEL_AGENT_TYPES:
+        options["workers"] = workers
+    return AGENT_TYPES[kind](rng, **options)
+
+def close_agents(agents):
+    # Close every agent in a game's seats; human seats are None
+    for agent in agents:
+        if agent is not None:
+            agent.close()
+
+def play_turn(state, agent, start=None):
+    """Play the current player's whole turn for an agent and end it"""
+    # start is where the player began the turn, when picking a turn up part way
+    # through; the dice are only rolled if they haven't been already
+    player_idx = state.current_player_idx
+    player = state.players[player_idx]
+    if start is None:
+        start = player["position"]
+    agent.begin_turn()
+
+    state.roll_dice()
+    target = agent.choose_move_target(state, player_idx)
+    if target is not None and target != start:
+        state.move_to(*target)
+
+    # Suggest in a room entered this turn
+    room_idx = state.board.get_room_center_at(*player["position"])
+    if room_idx is not None and player["position"] != start:
+        suggestion = agent.choose_suggestion(state, player_idx, room_idx)
+        if suggestion is not None:
+            character, weapon = suggestion
+            state.make_suggestion(card_name(character), card_name(weapon))
+            state.acknowledge_card()
+            state.acknowledge_notification()
+
+    accusation = agent.choose_accusation(state, player_idx)
+    if accusation is not None:
+        character, weapon, room = accusation
+        state.make_accusation(card_name(character), card_name(weapon), room - FIRST_ROOM_CARD)
+
+    if state.game_phase == "playing":
+        state.end_turn()
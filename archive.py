@@ -0,0 +1,358 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from game_constants import *
+from cards import *
+from events import NO_VALUE, TurnEnd, GameOver, pack_events, unpack_events
+from replay import REPLAY_VERSION, replay
+from savegame import SAVED_PHASES, ACTION, pack_actions, unpack_actions
+
+# An append-only file of finished games, read through mmap. It starts with a
+# header, then holds blocks, each added by one flush of an ArchiveWriter:
+#   block header  number of games, length of the block's game data
+#   records       one fixed-size RECORD per game
+#   game data     each game's ACTION records, then its packed events (events.py)
+# A record holds everything needed to filter games (players, characters,
+# solution, winner) at fixed offsets, so filters read single bytes straight from
+# the mapped file and a game's actions and events are only decoded on request.
+# An append cut short leaves a partial block at the end, which readers ignore
+# and the next writer overwrites
+
+# Bumped whenever the file layout changes
+ARCHIVE_VERSION = 1
+
+# First bytes of every archive
+ARCHIVE_MAGIC = b"CLAR"
+
+# Games an ArchiveWriter buffers before writing them out as a block
+ARCHIVE_BLOCK_GAMES = 4096
+
+FILE_HEADER = struct.Struct("<4sBxH")  # Magic, version, record size
+BLOCK_HEADER = struct.Struct("<II")  # Games, game data length
+
+# seed, player count, 6 characters, 3 solution cards, winner seat, winner
+# character, eliminated seats (bitmask), phase, turns, 6 hands (card bitmasks),
+# action count, events length, file offset of the game data. Unused seats are
+# NO_VALUE characters and empty hands; a game without a winner has NO_VALUE for both
+RECORD = struct.Struct(f"<IB{len(CHARACTERS)}B3BBBBBH{len(CHARACTERS)}IIIQ4x")
+
+# Offsets of the fields in a record, so each can be read on its own
+NUM_PLAYERS_OFFSET = 4
+CHARACTERS_OFFSET = NUM_PLAYERS_OFFSET + 1
+SOLUTION_OFFSET = CHARACTERS_OFFSET + len(CHARACTERS)
+SOLUTION_ROOM_OFFSET = SOLUTION_OFFSET + 2
+WINNER_OFFSET = SOLUTION_OFFSET + 3
+WINNER_CHARACTER_OFFSET = WINNER_OFFSET + 1
+ELIMINATED_OFFSET = WINNER_CHARACTER_OFFSET + 1
+PHASE_OFFSET = ELIMINATED_OFFSET + 1
+TURNS_OFFSET = PHASE_OFFSET + 1
+HANDS_OFFSET = TURNS_OFFSET + 2
+DATA_OFFSET = HANDS_OFFSET + 4 * len(CHARACTERS)
+
+SEED = struct.Struct("<I")
+TURNS = struct.Struct("<H")
+HANDS = struct.Struct(f"<{len(CHARACTERS)}I")
+DATA = struct.Struct("<IIQ")  # Action count, events length, file offset of the game data
+
+def pack_game(state):
+    """(record fields, game data) for a game; the writer adds the data's offset"""
+    winner = None
+    if state.game_phase == "game_over" and state.events and type(state.events[-1]) is GameOver:
+        winner = state.events[-1].winner
+    characters = list(state.selected_characters) + [NO_VALUE] * (len(CHARACTERS) - len(state.players))
+    hands = [player["hand"] for player in state.players] + [0] * (len(CHARACTERS) - len(state.players))
+    eliminated = sum(1 << i for i, player in enumerate(state.players) if not player["active"])
+    turns = 1 + sum(1 for event in state.events if type(event) is TurnEnd)
+    events = pack_events(state.events)
+    fields = (state.seed, len(state.players), *characters, *state.solution_cards,
+              NO_VALUE if winner is None else winner,
+              NO_VALUE if winner is None else state.selected_characters[winner],
+              eliminated, SAVED_PHASES.index(state.game_phase), min(turns, 0xFFFF), *hands,
+              len(state.actions), len(events))
+    return fields, pack_actions(state.actions) + events
+
+def _scan_blocks(buffer, size):
+    # (offset of the first record, number of games) for each complete block, and
+    # where the complete blocks end
+    blocks = []
+    offset = FILE_HEADER.size
+    while offset + BLOCK_HEADER.size <= size:
+        count, data_length = BLOCK_HEADER.unpack_from(buffer, offset)
+        end = offset + BLOCK_HEADER.size + count * RECORD.size + data_length
+        if end > size:
+            break
+        blocks.append((offset + BLOCK_HEADER.size, count))
+        offset = end
+    return blocks, offset
+
+def _check_header(data):
+    magic, version, record_size = FILE_HEADER.unpack_from(data, 0)
+    if magic != ARCHIVE_MAGIC:
+        raise ValueError("Not a Cluedo game archive")
+    if version != ARCHIVE_VERSION or record_size != RECORD.size:
+        raise ValueError(f"Unsupported archive version {version}, expected {ARCHIVE_VERSION}")
+
+class ArchiveWriter:
+    # Appends games to an archive, creating it if needed. Games are buffered and
+    # written a block at a time; close() (or leaving a with block) writes the rest
+    def __init__(self, path, block_games=ARCHIVE_BLOCK_GAMES):
+        self.block_games = block_games
+        self.pending = []  # (record fields, game data) not yet written
+        self.file = open(path, "a+b")
+        self.file.seek(0)
+        header = self.file.read(FILE_HEADER.size)
+        if not header:
+            self.file.write(FILE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, RECORD.size))
+        else:
+            _check_header(header)
+            # Drop a partial block left by an append that was cut short. Only the
+            # block headers are read from the mapped file, however big it is
+            with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                _, end = _scan_blocks(buffer, len(buffer))
+            self.file.truncate(end)
+        self.file.flush()
+
+    def add(self, state):
+        self.add_packed(pack_game(state))
+
+    def add_packed(self, packed):
+        # A game already packed by pack_game(), e.g. in a worker process
+        self.pending.append(packed)
+        if len(self.pending) >= self.block_games:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.file.seek(0, os.SEEK_END)
+        data_offset = self.file.tell() + BLOCK_HEADER.size + len(self.pending) * RECORD.size
+        records = []
+        for fields, data in self.pending:
+            records.append(RECORD.pack(*fields, data_offset))
+            data_offset += len(data)
+        game_data = b"".join(data for fields, data in self.pending)
+        self.file.write(BLOCK_HEADER.pack(len(self.pending), len(game_data)) + b"".join(records) + game_data)
+        self.file.flush()
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class GameRecord:
+    # One game in an open archive. Fields are read from the mapped file when
+    # asked for; nothing is copied until actions(), events() or load() is called
+    __slots__ = ("buffer", "offset")
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+
+    def fields(self):
+        return RECORD.unpack_from(self.buffer, self.offset)
+
+    @property
+    def seed(self):
+        return SEED.unpack_from(self.buffer, self.offset)[0]
+
+    @property
+    def num_players(self):
+        return self.buffer[self.offset + NUM_PLAYERS_OFFSET]
+
+    @property
+    def characters(self):
+        # Character index (into CHARACTERS) of each seat
+        start = self.offset + CHARACTERS_OFFSET
+        return list(self.buffer[start:start + self.num_players])
+
+    @property
+    def solution_cards(self):
+        start = self.offset + SOLUTION_OFFSET
+        return list(self.buffer[start:start + 3])
+
+    @property
+    def solution_room(self):
+        return self.buffer[self.offset + SOLUTION_ROOM_OFFSET] - FIRST_ROOM_CARD
+
+    @property
+    def winner(self):
+        # Winning seat, or None if nobody won
+        winner = self.buffer[self.offset + WINNER_OFFSET]
+        return None if winner == NO_VALUE else winner
+
+    @property
+    def winner_character(self):
+        character = self.buffer[self.offset + WINNER_CHARACTER_OFFSET]
+        return None if character == NO_VALUE else character
+
+    @property
+    def eliminated(self):
+        # Seats eliminated by a wrong accusation
+        eliminated = self.buffer[self.offset + ELIMINATED_OFFSET]
+        return [seat for seat in range(self.num_players) if eliminated >> seat & 1]
+
+    @property
+    def game_phase(self):
+        # "playing" for a game stopped at the turn limit
+        return SAVED_PHASES[self.buffer[self.offset + PHASE_OFFSET]]
+
+    @property
+    def turns(self):
+        return TURNS.unpack_from(self.buffer, self.offset + TURNS_OFFSET)[0]
+
+    @property
+    def hands(self):
+        # Card bitmask of each seat's hand
+        return list(HANDS.unpack_from(self.buffer, self.offset + HANDS_OFFSET)[:self.num_players])
+
+    def _data(self):
+        # (actions bytes, events bytes) of this game
+        num_actions, events_length, data_offset = DATA.unpack_from(self.buffer, self.offset + DATA_OFFSET)
+        events_start = data_offset + num_actions * ACTION.size
+        return self.buffer[data_offset:events_start], self.buffer[events_start:events_start + events_length]
+
+    def actions(self):
+        return unpack_actions(self._data()[0])
+
+    def events(self):
+        return list(unpack_events(self._data()[1]))
+
+    def load(self, board=None):
+        """The finished game as a GameState, rebuilt by replaying its actions"""
+        return replay({"version": REPLAY_VERSION, "seed": self.seed, "characters": self.characters,
+                       "actions": self.actions()}, board)
+
+class GameArchive:
+    # Read-only view of an archive. Games written after it was opened aren't seen
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        _check_header(self.buffer)
+        self.blocks, _ = _scan_blocks(self.buffer, len(self.buffer))
+        # Index of the first game in each block, for random access
+        self.block_starts = []
+        total = 0
+        for start, count in self.blocks:
+            self.block_starts.append(total)
+            total += count
+        self.num_games = total
+
+    def __len__(self):
+        return self.num_games
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.num_games
+        if not 0 <= index < self.num_games:
+            raise IndexError("Archive index out of range")
+        # Blocks are usually full, so the one holding the index is found by bisection
+        low, high = 0, len(self.blocks) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.block_starts[middle] <= index:
+                low = middle
+            else:
+                high = middle - 1
+        start, count = self.blocks[low]
+        return GameRecord(self.buffer, start + (index - self.block_starts[low]) * RECORD.size)
+
+    def __iter__(self):
+        return self.games()
+
+    def _filters(self, winner, players, room):
+        # (record offset, byte value) for each filter given
+        filters = []
+        if winner is not None:
+            filters.append((WINNER_CHARACTER_OFFSET, winner))
+        if players is not None:
+            filters.append((NUM_PLAYERS_OFFSET, players))
+        if room is not None:
+            filters.append((SOLUTION_ROOM_OFFSET, room_card(room)))
+        return filters
+
+    def _column(self, start, count, field_offset):
+        # One byte field of every record in a block, copied out in a single slice
+        return self.buffer[start + field_offset:start + count * RECORD.size:RECORD.size]
+
+    def games(self, winner=None, players=None, room=None):
+        """Records of the games matching every filter given, in the order they were added"""
+        # winner is a character index into CHARACTERS, players a player count and
+        # room an index into ROOMS for the room in the solution
+        filters = self._filters(winner, players, room)
+        buffer = self.buffer
+        for start, count in self.blocks:
+            if not filters:
+                for offset in range(start, start + count * RECORD.size, RECORD.size):
+                    yield GameRecord(buffer, offset)
+                continue
+            # Candidates come from the first filter's column; the rest are checked by index
+            (field_offset, value), *others = filters
+            first = self._column(start, count, field_offset)
+            others = [(self._column(start, count, other_offset), other_value)
+                      for other_offset, other_value in others]
+            target = bytes((value,))
+            index = first.find(target)
+            while index != -1:
+                if all(column[index] == other_value for column, other_value in others):
+                    yield GameRecord(buffer, start + index * RECORD.size)
+                index = first.find(target, index + 1)
+
+    def count(self, winner=None, players=None, room=None):
+        """Number of games matching every filter given"""
+        filters = self._filters(winner, players, room)
+        if len(filters) > 1:
+            return sum(1 for _ in self.games(winner, players, room))
+        if not filters:
+            return self.num_games
+        (field_offset, value), = filters
+        target = bytes((value,))
+        return sum(self._column(start, count, field_offset).count(target) for start, count in self.blocks)
+
+    def close(self):
+        self.buffer.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise the games in an archive written by simulate.py --archive.")
+    parser.add_argument("path", help="archive file")
+    parser.add_argument("--winner", type=int, default=None, choices=range(len(CHARACTERS)),
+                        help="only games won by this character (index into CHARACTERS)")
+    parser.add_argument("--players", type=int, default=None, choices=range(3, 7), help="only games with this many players")
+    parser.add_argument("--room", type=int, default=None, choices=range(len(ROOMS)),
+                        help="only games whose solution is in this room (index into ROOMS)")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    with GameArchive(args.path) as archive:
+        wins = Counter()
+        turns = 0
+        matched = 0
+        for record in archive.games(args.winner, args.players, args.room):
+            matched += 1
+            turns += record.turns
+            wins[record.winner_character] += 1
+        elapsed = time.perf_counter() - start_time
+        print(f"{matched} of {len(archive)} games matched in {elapsed:.2f} s")
+    if matched:
+        print(f"Average turns: {turns / matched:.1f}")
+        for character, games in sorted(wins.items(), key=lambda item: -item[1]):
+            name = CHARACTERS[character]["name"] if character is not None else "No winner"
+            print(f"  {name:<16} {games} wins ({games / matched:.1%})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+import argparse
+import time
+import numpy as np
+from game_constants import *
+from board import GameBoard
+from game_state import GameState
+from cards import *
+from simulate import SimulationStats
+
+# Hands are counted with np.bitwise_count, which NumPy added in 2.0
+if not hasattr(np, "bitwise_count"):
+    raise ImportError(f"batch_simulate.py needs NumPy 2.0 or later, but NumPy {np.__version__} is installed")
+
+# Plays thousands of games in lockstep as NumPy arrays: every call to step() plays
+# one whole turn of every unfinished game. The rules are GameState's; the players
+# all follow one bot policy that fits in arrays (see BatchSimulation.step), since
+# the bots in agents.py need a deduction matrix per player. check_game() replays a
+# traced game through GameState to confirm both engines agree.
+#
+# Positions are tile indices (y * GRID_WIDTH + x), cards are card IDs and sets of
+# cards are card bitmasks, as in cards.py. Needs NumPy 2.0 or later
+
+# Longest walk a roll allows
+MAX_ROLL = 12
+
+CATEGORIES = (CHARACTER_MASK, WEAPON_MASK, ROOM_MASK)
+
+class BoardTables:
+    # The parts of the board graph the batch engine walks, as arrays. Players only
+    # ever head for a room center, so distances and first steps are only kept
+    # towards the centers
+    def __init__(self, board):
+        size = GRID_WIDTH * GRID_HEIGHT
+        self.centers = np.array([y * GRID_WIDTH + x for x, y in board.room_centers], dtype=np.int16)
+        self.center_room = np.full(size, -1, dtype=np.int8)  # Room whose center a tile is, or -1
+        for room_idx, center in enumerate(self.centers):
+            if self.center_room[center] < 0:
+                self.center_room[center] = room_idx
+
+        # Moves to each room center (255 if unreachable), and the tile a player lands
+        # on after the first move of a shortest path there, as GameState.move_to walks it
+        self.distance = np.full((size, len(ROOMS)), 255, dtype=np.uint8)
+        self.next_tile = np.full((size, len(ROOMS)), -1, dtype=np.int16)
+        for source in range(size):
+            position = (source % GRID_WIDTH, source // GRID_WIDTH)
+            if not board.get_valid_moves(*position):
+                continue
+            from_center = board.get_room_center_at(*position) is not None
+            for room_idx, center in enumerate(board.room_centers):
+                distance = board.distance(position, center)
+                if distance is None:
+                    continue
+                self.distance[source, room_idx] = distance
+                step = board.next_step_toward(position, center)
+                if step is None:
+                    continue
+                # Stepping onto a door from outside its room lands in the room center
+                is_door, door_room = board.is_door(*step)
+                if is_door and not from_center:
+                    step = board.room_centers[door_room]
+                self.next_tile[source, room_idx] = step[1] * GRID_WIDTH + step[0]
+
+# Tables for each board layout seen in this process
+_tables = {}
+
+def get_tables(board):
+    key = (id(board), board.layout_version)
+    if key not in _tables:
+        _tables[key] = BoardTables(board)
+    return _tables[key]
+
+def pick_cards(masks, rng):
+    # A random card from each mask, or -1 where a mask is empty
+    counts = np.bitwise_count(masks).astype(np.int64)
+    remaining = (rng.random(len(masks)) * counts).astype(np.int64)
+    picked = np.full(len(masks), -1, dtype=np.int64)
+    for card in range(NUM_CARDS):
+        has = ((masks >> np.uint32(card)) & np.uint32(1)) == 1
+        picked[has & (remaining == 0) & (picked < 0)] = card
+        remaining -= has
+    return picked
+
+def single_card(masks):
+    # Whether each mask holds exactly one card
+    return (masks != 0) & ((masks & (masks - np.uint32(1))) == 0)
+
+class BatchSimulation:
+    # num_games games of num_players each, dealt and played from one seed. The
+    # first trace_games games record every turn for check_game()
+    def __init__(self, num_games, num_players=3, seed=0, board=None, trace_games=0):
+        self.board = board if board is not None else GameBoard(verbose=False)
+        self.tables = get_tables(self.board)
+        self.num_games = num_games
+        self.num_players = num_players
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+        games = np.arange(num_games)
+
+        # Seats: num_players different characters per game, at their start positions
+        self.characters = np.argsort(rng.random((num_games, len(CHARACTERS))), axis=1)[:, :num_players]
+        starts = np.array([y * GRID_WIDTH + x for x, y in (character["start_pos"] for character in CHARACTERS)],
+                          dtype=np.int16)
+        self.positions = starts[self.characters]
+        self.active = np.ones((num_games, num_players), dtype=bool)
+
+        # The envelope as card IDs, then the other cards shuffled and dealt
+        # CARDS_PER_PLAYER to each seat, the last seats getting fewer if they run
+        # out (dealt is padded with -1); hands are one card bitmask per seat
+        self.solution = np.stack([FIRST_CHARACTER_CARD + rng.integers(0, len(CHARACTERS), num_games),
+                                  FIRST_WEAPON_CARD + rng.integers(0, len(WEAPONS), num_games),
+                                  FIRST_ROOM_CARD + rng.integers(0, len(ROOMS), num_games)], axis=1)
+        self.solution_mask = (np.uint32(1) << self.solution.astype(np.uint32)).sum(axis=1, dtype=np.uint32)
+        keys = rng.random((num_games, NUM_CARDS))
+        keys[games[:, None], self.solution] = 2.0  # Past every other card
+        num_dealt = min(num_players * CARDS_PER_PLAYER, NUM_CARDS - len(CATEGORIES))
+        dealt = np.full((num_games, num_players * CARDS_PER_PLAYER), -1, dtype=np.int64)
+        dealt[:, :num_dealt] = np.argsort(keys, axis=1)[:, :num_dealt]
+        self.dealt = dealt.reshape(num_games, num_players, CARDS_PER_PLAYER)
+        self.hands = np.where(self.dealt >= 0, np.uint32(1) << self.dealt.clip(0).astype(np.uint32),
+                              np.uint32(0)).sum(axis=2, dtype=np.uint32)
+        self.hand_sizes = (self.dealt[0] >= 0).sum(axis=1)
+
+        self.current = np.zeros(num_games, dtype=np.int64)
+        self.dice = np.zeros((num_games, 2), dtype=np.int64)
+        self.moves_left = np.zeros(num_games, dtype=np.int64)
+        self.running = np.ones(num_games, dtype=bool)
+        self.winner = np.full(num_games, -1, dtype=np.int64)
+        self.turns = np.zeros(num_games, dtype=np.int64)
+
+        # What each seat knows: seen holds the cards it knows aren't in the envelope
+        # (its hand and every card shown to it); shown[game, observer, owner] the
+        # cards owner has shown the observer, and lacks[game, observer, owner] the
+        # cards the observer knows owner doesn't hold (from passing on suggestions)
+        self.seen = self.hands.copy()
+        self.shown = np.zeros((num_games, num_players, num_players), dtype=np.uint32)
+        self.lacks = np.zeros((num_games, num_players, num_players), dtype=np.uint32)
+
+        # Each traced turn is (seat, dice, room walked towards or -1, position after
+        # moving, suggested character and weapon, disprover, shown card, accused
+        # cards), with -1 for whatever didn't happen
+        self.trace_games = min(trace_games, num_games)
+        self.traces = [[] for _ in range(self.trace_games)]
+
+    def opponent_cards(self, games, seats):
+        # Cards an active opponent of each seat might hold, as far as the seat knows
+        # An opponent who has shown a whole hand's worth of cards holds nothing else
+        mask = np.zeros(len(games), dtype=np.uint32)
+        for owner in range(self.num_players):
+            opponent = np.flatnonzero(self.active[games, owner] & (seats != owner))
+            shown = self.shown[games[opponent], seats[opponent], owner]
+            possible = np.where(np.bitwise_count(shown) == self.hand_sizes[owner], shown,
+                                ~self.lacks[games[opponent], seats[opponent], owner])
+            mask[opponent] |= possible & np.uint32(ALL_CARDS_MASK)
+        return mask
+
+    def step(self):
+        """Play one turn of every unfinished game"""
+        # Each turn is play_turn() for a bot that heads for the nearest room it
+        # could still learn something about (else the nearest other room),
+        # suggests cards that might be in the envelope and that an opponent might
+        # hold, and accuses once only one card of each category is left or nothing
+        # more can be learned, guessing among what's left
+        tables = self.tables
+        rng = self.rng
+        games = np.flatnonzero(self.running)
+        if not games.size:
+            return
+        seats = self.current[games]
+        self.turns[games] += 1
+
+        # Roll and walk towards the room to visit
+        dice = rng.integers(1, 7, (games.size, 2))
+        self.dice[games] = dice
+        moves = dice.sum(axis=1)
+        start = self.positions[games, seats].astype(np.int64)
+        distances = tables.distance[start].astype(np.int64)
+        distances[distances == 0] = 255  # Not the room we're in
+        candidates = ~self.seen[games, seats] & np.uint32(ALL_CARDS_MASK)
+        informative = candidates & self.opponent_cards(games, seats)
+        room_bits = np.arange(len(ROOMS), dtype=np.uint32) + np.uint32(FIRST_ROOM_CARD)
+        worth = ((informative[:, None] >> room_bits) & np.uint32(1)) == 1
+        preferred = np.where(worth, distances, 255)
+        room = np.where((preferred != 255).any(axis=1), preferred.argmin(axis=1), distances.argmin(axis=1))
+        walking = distances[np.arange(games.size), room] != 255
+        target = tables.centers[room]
+        position = start.copy()
+        for _ in range(MAX_ROLL):
+            moving = walking & (moves > 0) & (position != target)
+            if not moving.any():
+                break
+            position[moving] = tables.next_tile[position[moving], room[moving]]
+            moves[moving] -= 1
+        self.positions[games, seats] = position
+        self.moves_left[games] = moves
+
+        # Suggest in a room entered this turn
+        suggested_room = tables.center_room[position].astype(np.int64)
+        suggesting = np.flatnonzero((suggested_room >= 0) & (position != start))
+        character = np.full(games.size, -1)
+        weapon = np.full(games.size, -1)
+        disprover = np.full(games.size, -1)
+        shown_card = np.full(games.size, -1)
+        if suggesting.size:
+            sgames = games[suggesting]
+            sseats = seats[suggesting]
+            candidates = ~self.seen[sgames, sseats] & np.uint32(ALL_CARDS_MASK)
+            informative = candidates & self.opponent_cards(sgames, sseats)
+            picks = []
+            for category in (CHARACTER_MASK, WEAPON_MASK):
+                preferred = informative & np.uint32(category)
+                picks.append(pick_cards(np.where(preferred != 0, preferred, candidates & np.uint32(category)), rng))
+            character[suggesting], weapon[suggesting] = picks
+            mask = ((np.uint32(1) << picks[0].astype(np.uint32)) | (np.uint32(1) << picks[1].astype(np.uint32)) |
+                    (np.uint32(1) << (suggested_room[suggesting] + FIRST_ROOM_CARD).astype(np.uint32)))
+
+            # Asked in seat order; the first active player holding a card disproves
+            seat_numbers = np.arange(self.num_players)
+            asked = self.active[sgames] & (seat_numbers != sseats[:, None])
+            matches = asked & ((self.hands[sgames] & mask[:, None]) != 0)
+            disproved = matches.any(axis=1)
+            first = np.where(disproved, matches.argmax(axis=1), self.num_players)
+            # Everyone sees who passed
+            passed = asked & (seat_numbers < first[:, None])
+            for owner in range(self.num_players):
+                passers = passed[:, owner]
+                self.lacks[sgames[passers], :, owner] |= mask[passers, None]
+            # The disprover shows one of their matching cards to the suggester only
+            rows = np.flatnonzero(disproved)
+            card = pick_cards(self.hands[sgames[rows], first[rows]] & mask[rows], rng)
+            card_bit = np.uint32(1) << card.astype(np.uint32)
+            self.seen[sgames[rows], sseats[rows]] |= card_bit
+            self.shown[sgames[rows], sseats[rows], first[rows]] |= card_bit
+            disprover[suggesting[rows]] = first[rows]
+            shown_card[suggesting[rows]] = card
+
+        # Accuse once solved, or guess once nothing more can be learned
+        candidates = ~self.seen[games, seats] & np.uint32(ALL_CARDS_MASK)
+        solved = np.ones(games.size, dtype=bool)
+        for category in CATEGORIES:
+            solved &= single_card(candidates & np.uint32(category))
+        stuck = (candidates & self.opponent_cards(games, seats)) == 0
+        accusing = np.flatnonzero(solved | stuck)
+        accusation = np.full((games.size, 3), -1)
+        if accusing.size:
+            for i, category in enumerate(CATEGORIES):
+                accusation[accusing, i] = pick_cards(candidates[accusing] & np.uint32(category), rng)
+            agames = games[accusing]
+            aseats = seats[accusing]
+            correct = (accusation[accusing] == self.solution[agames]).all(axis=1)
+            self.winner[agames[correct]] = aseats[correct]
+            self.running[agames[correct]] = False
+            wrong = ~correct
+            self.active[agames[wrong], aseats[wrong]] = False
+            self.running[agames[wrong]] = self.active[agames[wrong]].any(axis=1)
+
+        # End the turn: the next active seat plays
+        ending = self.running[games]
+        egames = games[ending]
+        eseats = seats[ending]
+        following = (eseats[:, None] + np.arange(1, self.num_players + 1)) % self.num_players
+        next_active = self.active[egames[:, None], following]
+        self.current[egames] = following[np.arange(egames.size), next_active.argmax(axis=1)]
+
+        for row in np.flatnonzero(games < self.trace_games):
+            self.traces[games[row]].append((int(seats[row]), tuple(int(die) for die in dice[row]),
+                                            int(room[row]) if walking[row] else -1, int(position[row]),
+                                            int(character[row]), int(weapon[row]),
+                                            int(disprover[row]), int(shown_card[row]),
+                                            tuple(int(card) for card in accusation[row])))
+
+    def run(self, max_turns=MAX_TURNS):
+        """Play every game until it ends or has had max_turns turns"""
+        for _ in range(max_turns):
+            if not self.running.any():
+                break
+            self.step()
+
+    def stats(self):
+        # The results as simulate.py reports them
+        stats = SimulationStats()
+        stats.games = self.num_games
+        stats.players = self.num_games * self.num_players
+        won = self.winner >= 0
+        stats.solved = int(won.sum())
+        stats.turns_to_solve = int(self.turns[won].sum())
+        stats.eliminated = int((~self.active).sum())
+        names = [character["name"] for character in CHARACTERS]
+        seat_counts = np.bincount(self.characters.ravel(), minlength=len(CHARACTERS))
+        winners = self.characters[np.flatnonzero(won), self.winner[won]]
+        win_counts = np.bincount(winners, minlength=len(CHARACTERS))
+        for i, name in enumerate(names):
+            stats.seats[name] = int(seat_counts[i])
+            stats.wins[name] = int(win_counts[i])
+        return stats
+
+    def check_game(self, game):
+        """Replay a traced game through GameState; returns a list of disagreements"""
+        problems = []
+        state = GameState(self.board, verbose=False, seed=self.seed)
+        state.num_players = self.num_players
+        state.selected_characters = [int(character) for character in self.characters[game]]
+        state.initialize_game()
+        state.deal([int(card) for card in self.solution[game]],
+                   [[int(card) for card in cards if card >= 0] for cards in self.dealt[game]])
+
+        for turn, (seat, dice, target, position, character, weapon, disprover, shown, accusation) in \
+                enumerate(self.traces[game]):
+            if state.game_phase != "playing" or state.current_player_idx != seat:
+                problems.append(f"turn {turn}: batch has seat {seat} playing, GameState has "
+                                f"{state.current_player_idx} in phase {state.game_phase}")
+                break
+            # The batch rolled its own dice; play_turn() would have rolled here
+            player = state.players[seat]
+            start = player["position"]
+            state.dice_values = dice
+            state.moves_left = sum(dice)
+            state.has_rolled = True
+            if target >= 0:
+                state.move_to(*state.board.room_centers[target])
+            if player["position"] != (position % GRID_WIDTH, position // GRID_WIDTH):
+                problems.append(f"turn {turn}: batch moved to {position % GRID_WIDTH, position // GRID_WIDTH}, "
+                                f"GameState to {player['position']}")
+                break
+
+            room_idx = state.board.get_room_center_at(*player["position"])
+            if (character >= 0) != (room_idx is not None and player["position"] != start):
+                problems.append(f"turn {turn}: batch and GameState disagree on whether to suggest")
+                break
+            if character >= 0:
+                state.make_suggestion(card_name(character), card_name(weapon), shown if shown >= 0 else None)
+                showing = state.player_showing_card if state.showing_card_ui else None
+                if (showing, state.card_being_shown) != ((disprover, shown) if disprover >= 0 else (None, None)):
+                    problems.append(f"turn {turn}: batch had {disprover} show {shown}, GameState had "
+                                    f"{showing} show {state.card_being_shown}")
+                    break
+                state.acknowledge_card()
+                state.acknowledge_notification()
+
+            if accusation[0] >= 0:
+                state.make_accusation(card_name(accusation[0]), card_name(accusation[1]),
+                                      accusation[2] - FIRST_ROOM_CARD)
+            if state.game_phase == "playing":
+                state.end_turn()
+
+        if not problems:
+            won = state.game_phase == "game_over" and state.players[state.current_player_idx]["active"]
+            winner = state.current_player_idx if won else -1
+            if winner != self.winner[game]:
+                problems.append(f"batch winner {self.winner[game]}, GameState winner {winner}")
+            if [player["active"] for player in state.players] != list(self.active[game]):
+                problems.append("eliminated players differ")
+        return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many headless Cluedo games at once with NumPy.")
+    parser.add_argument("--games", type=int, default=10000, help="number of games to play")
+    parser.add_argument("--players", type=int, default=3, choices=range(3, 7), help="players per game")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the deals, dice and bot choices")
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="replay the first N games through GameState and report any disagreement")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    simulation = BatchSimulation(args.games, args.players, args.seed, trace_games=args.check)
+    simulation.run()
+    stats = simulation.stats()
+    stats.elapsed = time.perf_counter() - start_time
+    print(stats.report())
+
+    if args.check:
+        failed = 0
+        for game in range(simulation.trace_games):
+            problems = simulation.check_game(game)
+            if problems:
+                failed += 1
+                print(f"Game {game}: {problems[0]}")
+        print(f"Checked {simulation.trace_games} games against GameState: {failed} disagreed")
+
+if __name__ == "__main__":
+    main()
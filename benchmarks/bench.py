@@ -0,0 +1,228 @@
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+
+# Bumped whenever the result file layout changes
+RESULTS_VERSION = 1
+
+# Baseline results are compared against, relative to the repository root
+BASELINE_PATH = "benchmarks/baseline.json"
+
+# A benchmark is a regression if its best time is this much slower than the baseline's
+DEFAULT_TOLERANCE = 0.25
+
+# Benchmarks faster than this per operation are allowed this many times the
+# tolerance, as scheduling noise is a bigger share of their time
+SMALL_BENCHMARK_US = 1.0
+SMALL_TOLERANCE_FACTOR = 2
+
+# Timed rounds per benchmark; the best one is what gets compared
+DEFAULT_REPEAT = 7
+
+# Rounds keep being timed past repeat until a benchmark has had this long, up
+# to MAX_REPEAT_FACTOR times repeat, so quick ones get more chances at a quiet moment
+MIN_BENCHMARK_SECONDS = 0.5
+MAX_REPEAT_FACTOR = 10
+
+# Times a regression is timed again before it's reported; a burst of load from
+# elsewhere on the machine seldom lasts through every try, a real slowdown does
+CONFIRM_RUNS = 2
+
+# Times the calibration loop is timed over a run, spread between the benchmarks;
+# results are scaled by the median, so a busy moment during one doesn't skew them
+CALIBRATION_ROUNDS = 9
+
+def calibration_loop():
+    # Fixed pure-Python work timed with every run, so results taken on a slower or
+    # busier machine can be scaled before they're compared
+    total = 0
+    for i in range(10000):
+        total += i * i % 7
+    return total
+
+class Benchmark:
+    # One timed operation. func is called number times per round; setup, if given,
+    # runs untimed before every round. ops is how many operations one call performs
+    # (e.g. a call that queries every tile), so results are per operation
+    def __init__(self, name, func, number, setup=None, ops=1):
+        self.name = name
+        self.func = func
+        self.number = number
+        self.setup = setup
+        self.ops = ops
+
+    def run(self, repeat=DEFAULT_REPEAT, min_seconds=MIN_BENCHMARK_SECONDS):
+        """Time the benchmark and return its result as a dict"""
+        func = self.func
+        times = []
+        gc_enabled = gc.isenabled()
+        deadline = time.perf_counter() + min_seconds
+        try:
+            while len(times) < repeat or (time.perf_counter() < deadline and
+                                          len(times) < repeat * MAX_REPEAT_FACTOR):
+                if self.setup is not None:
+                    self.setup()
+                # Like timeit, keep the collector from landing in one round and not another
+                gc.collect()
+                gc.disable()
+                start = time.perf_counter()
+                for _ in range(self.number):
+                    func()
+                elapsed = time.perf_counter() - start
+                if gc_enabled:
+                    gc.enable()
+                times.append(elapsed / (self.number * self.ops))
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return {
+            "best_us": min(times) * 1e6,
+            "median_us": statistics.median(times) * 1e6,
+            "number": self.number,
+            "ops": self.ops,
+            "repeat": len(times)
+        }
+
+def collect(groups):
+    # Benchmarks of the named groups, in order; each group module builds its own fixtures
+    benchmarks = []
+    if "engine" in groups:
+        from benchmarks import engine
+        benchmarks += engine.collect()
+    if "render" in groups:
+        from benchmarks import render
+        benchmarks += render.collect()
+    return benchmarks
+
+def environment():
+    # What the numbers were measured on; results from different machines don't compare
+    info = {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine()}
+    if "pygame" in sys.modules:
+        info["pygame"] = sys.modules["pygame"].version.ver
+    return info
+
+def run_benchmarks(benchmarks, repeat=DEFAULT_REPEAT, progress=None):
+    calibration = Benchmark("calibration", calibration_loop, 20)
+    # Calibrate before the first benchmark, after the last and evenly in between
+    calibrate_after = {len(benchmarks) * i // (CALIBRATION_ROUNDS - 1) for i in range(1, CALIBRATION_ROUNDS - 1)}
+    calibrations = [calibration.run(repeat, 0)["best_us"]]
+    results = {}
+    for i, benchmark in enumerate(benchmarks, 1):
+        results[benchmark.name] = benchmark.run(repeat)
+        if progress is not None:
+            progress(benchmark.name, results[benchmark.name])
+        if i in calibrate_after:
+            calibrations.append(calibration.run(repeat, 0)["best_us"])
+    calibrations.append(calibration.run(repeat, 0)["best_us"])
+    return {"version": RESULTS_VERSION, "environment": environment(),
+            "calibration_us": statistics.median(calibrations), "results": results}
+
+def retime(results, benchmarks, repeat=DEFAULT_REPEAT):
+    # Time benchmarks again, keeping whichever of the two results was faster
+    for benchmark in benchmarks:
+        result = benchmark.run(repeat)
+        if result["best_us"] < results["results"][benchmark.name]["best_us"]:
+            results["results"][benchmark.name] = result
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def load_results(path):
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("version") != RESULTS_VERSION:
+        raise ValueError(f"Unsupported results version {results.get('version')}, expected {RESULTS_VERSION}")
+    return results
+
+def allowed_slowdown(best_us, tolerance):
+    # The tolerance for a benchmark taking best_us per operation
+    return tolerance * SMALL_TOLERANCE_FACTOR if best_us < SMALL_BENCHMARK_US else tolerance
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare best times with a baseline; returns (rows, regressions)"""
+    # Each row is (name, baseline us, current us, ratio) for a benchmark in results;
+    # the ratio is scaled by how much slower the calibration loop ran, and is None
+    # for benchmarks the baseline doesn't have
+    speed = results["calibration_us"] / baseline["calibration_us"]
+    rows = []
+    regressions = []
+    previous = baseline["results"]
+    for name, result in results["results"].items():
+        before = previous[name]["best_us"] if name in previous else None
+        after = result["best_us"]
+        ratio = after / (before * speed) if before else None
+        rows.append((name, before, after, ratio))
+        if ratio is not None and ratio > 1 + allowed_slowdown(before, tolerance):
+            regressions.append(name)
+    return rows, regressions
+
+def format_time(us):
+    if us is None:
+        return "-"
+    if us >= 1000:
+        return f"{us / 1000:.2f} ms"
+    return f"{us:.2f} us"
+
+def report(rows, tolerance, speed):
+    lines = [f"Machine speed relative to the baseline's: {1 / speed:.2f}x (changes are scaled by it)",
+             f"{'benchmark':<36} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, before, after, ratio in rows:
+        change = f"{ratio - 1:+.0%}" if ratio is not None else "-"
+        flag = "  REGRESSION" if ratio is not None and ratio > 1 + allowed_slowdown(before, tolerance) else ""
+        lines.append(f"{name:<36} {format_time(before):>12} {format_time(after):>12} {change:>8}{flag}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the rules engine and renderer, and compare with a baseline.")
+    parser.add_argument("--group", action="append", choices=("engine", "render"),
+                        help="benchmark group to run, may be repeated (default: all)")
+    parser.add_argument("--filter", default=None, help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed rounds per benchmark")
+    parser.add_argument("--output", metavar="PATH", default=None, help="write the results to PATH as JSON")
+    parser.add_argument("--baseline", metavar="PATH", default=BASELINE_PATH, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with these results")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="slowdown allowed before a benchmark counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    benchmarks = collect(args.group or ("engine", "render"))
+    if args.filter:
+        benchmarks = [benchmark for benchmark in benchmarks if args.filter in benchmark.name]
+    results = run_benchmarks(benchmarks, args.repeat,
+                             lambda name, result: print(f"{name:<36} {format_time(result['best_us']):>12}"))
+
+    if args.output:
+        save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    try:
+        baseline = load_results(args.baseline)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    rows, regressions = compare(results, baseline, args.tolerance)
+    for _ in range(CONFIRM_RUNS):
+        if not regressions:
+            break
+        print(f"Timing again: {', '.join(regressions)}")
+        retime(results, [benchmark for benchmark in benchmarks if benchmark.name in regressions], args.repeat)
+        rows, regressions = compare(results, baseline, args.tolerance)
+    print()
+    print(report(rows, args.tolerance, results["calibration_us"] / baseline["calibration_us"]))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} "
+              f"({args.tolerance * SMALL_TOLERANCE_FACTOR:.0%} under {SMALL_BENCHMARK_US:g} us): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import itertools
+import random
+from game_constants import *
+from board import GameBoard
+from game_state import GameState
+from cards import *
+from replay import make_record, replay
+from agents import make_agent, play_turn
+from simulate import play_game
+from savegame import pack_state, unpack_state
+from benchmarks.bench import Benchmark
+
+# Seed every fixture is built from, so each run times the same games
+SEED = 1234
+
+def new_game(board, num_players):
+    state = GameState(board, verbose=False, seed=SEED)
+    state.num_players = num_players
+    state.selected_characters = list(range(num_players))
+    state.initialize_game()
+    return state
+
+def collect():
+    """Benchmarks for the board queries, game rules and whole headless games"""
+    board = GameBoard(verbose=False)
+    tiles = [(x, y) for y in range(GRID_HEIGHT) for x in range(GRID_WIDTH)]
+
+    def valid_moves_sweep():
+        for x, y in tiles:
+            board.get_valid_moves(x, y)
+
+    def is_door_sweep():
+        for x, y in tiles:
+            board.is_door(x, y)
+
+    def room_at_sweep():
+        for x, y in tiles:
+            board.get_room_at(x, y)
+
+    # Suggestions from the first room, cycling through every character and weapon
+    suggestion_state = new_game(board, 6)
+    suggestion_state.players[0]["position"] = board.room_centers[0]
+    suggestion_root = suggestion_state.snapshot()
+    pairs = itertools.cycle([(card_name(character), card_name(weapon))
+                             for character in cards_in(CHARACTER_MASK) for weapon in cards_in(WEAPON_MASK)])
+
+    def suggest():
+        suggestion_state.make_suggestion(*next(pairs))
+
+    init_state = new_game(board, 6)
+
+    # The same bot game every call; the recorded one is replayed for the replay benchmark
+    def playthrough(num_players):
+        return lambda: play_game(num_players, random.Random(SEED), ("deduction",))
+
+    recorded = new_game(board, 4)
+    rng = random.Random(SEED)
+    recorded.agents = [make_agent("deduction", rng) for _ in recorded.players]
+    for _ in range(MAX_TURNS):
+        if recorded.game_phase != "playing":
+            break
+        play_turn(recorded, recorded.agents[recorded.current_player_idx])
+    record = make_record(recorded)
+    saved = pack_state(recorded)
+
+    return [
+        Benchmark("board.get_valid_moves", valid_moves_sweep, 200, ops=len(tiles)),
+        Benchmark("board.is_door", is_door_sweep, 200, ops=len(tiles)),
+        Benchmark("board.get_room_at", room_at_sweep, 200, ops=len(tiles)),
+        Benchmark("board.build", lambda: GameBoard(verbose=False), 5),
+        Benchmark("state.make_suggestion", suggest, 200, setup=lambda: suggestion_state.restore(suggestion_root)),
+        Benchmark("state.initialize_game", init_state.initialize_game, 500),
+        Benchmark("game.playthrough_3p", playthrough(3), 5),
+        Benchmark("game.playthrough_6p", playthrough(6), 5),
+        Benchmark("game.replay_4p", lambda: replay(record, board), 5),
+        Benchmark("savegame.pack_4p", lambda: pack_state(recorded), 200),
+        Benchmark("savegame.unpack_4p", lambda: unpack_state(saved, board), 200)
+    ]
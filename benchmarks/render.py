@@ -0,0 +1,92 @@
+import os
+
+# No window is needed; frames are drawn to an off-screen surface
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from game_constants import *
+from board import GameBoard
+from board_renderer import BoardRenderer
+from game_state import GameState
+from ui import UI
+from cards import *
+from main import draw_game_layers
+from benchmarks.bench import Benchmark
+
+# Seed of the game drawn in every frame
+SEED = 1234
+
+def collect():
+    """Frame times for the board renderer and each UI panel and dialog"""
+    pygame.init()
+    pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+
+    board = GameBoard(verbose=False)
+    renderer = BoardRenderer(board)
+    ui = UI()
+
+    # A game part way through: dice rolled and a log with more than a page of entries
+    state = GameState(board, verbose=False, seed=SEED)
+    state.num_players = 6
+    state.selected_characters = list(range(6))
+    state.initialize_game()
+    state.roll_dice()
+    for i in range(40):
+        state.add_to_log(f"Benchmark log entry {i}")
+    players = state.players
+    current = state.current_player_idx
+    valid_moves = state.get_valid_moves()
+    character, weapon, room = state.solution_cards
+
+    def cold_board():
+        # Rebuild the static layer, as after a layout change
+        renderer.static_layer = None
+        renderer.render(screen)
+
+    def board_layer():
+        renderer.invalidate()
+        renderer.draw_board_layer(screen, players, current, valid_moves)
+
+    def panel(draw, *args):
+        # The panels skip unchanged redraws, so force a full one every call
+        def redraw():
+            ui.invalidate()
+            draw(screen, *args)
+        return redraw
+
+    def full_frame():
+        renderer.invalidate()
+        ui.invalidate()
+        draw_game_layers(screen, state, renderer, ui)
+
+    def dialog(draw, *args):
+        # Dialogs are built when opened and redrawn every frame while open
+        def redraw():
+            draw(screen, *args)
+        return redraw
+
+    return [
+        Benchmark("render.board_static_layer", cold_board, 5),
+        Benchmark("render.board_render", lambda: renderer.render(screen), 200),
+        Benchmark("render.board_layer", board_layer, 100),
+        Benchmark("ui.draw_start_menu", lambda: ui.draw_start_menu(screen, 4), 100),
+        Benchmark("ui.draw_character_selection", lambda: ui.draw_character_selection(screen, [0, 2]), 100),
+        Benchmark("ui.draw_player_panel", panel(ui.draw_player_panel, players, current), 200),
+        Benchmark("ui.draw_player_cards", panel(ui.draw_player_cards, players[current]), 200),
+        Benchmark("ui.draw_dice_panel", panel(ui.draw_dice_panel, state.dice_values, state.moves_left), 200),
+        Benchmark("ui.draw_controls", panel(ui.draw_controls), 200),
+        Benchmark("ui.draw_game_log", panel(ui.draw_game_log, state.game_log), 200),
+        Benchmark("ui.draw_card_ui", dialog(ui.draw_card_ui, character), 100, setup=ui.close_dialog),
+        Benchmark("ui.draw_notification_ui", dialog(ui.draw_notification_ui, "Benchmark notification"), 100,
+                  setup=ui.close_dialog),
+        Benchmark("ui.draw_suggestion_ui", dialog(ui.draw_suggestion_ui, card_name(character), card_name(weapon)),
+                  100, setup=ui.close_dialog),
+        Benchmark("ui.draw_accusation_ui",
+                  dialog(ui.draw_accusation_ui, card_name(character), card_name(weapon), room - FIRST_ROOM_CARD),
+                  100, setup=ui.close_dialog),
+        Benchmark("ui.draw_game_over", dialog(ui.draw_game_over, state.solution, players[0]["name"]), 100,
+                  setup=ui.close_dialog),
+        Benchmark("frame.full_redraw", full_frame, 50),
+        Benchmark("frame.idle", lambda: draw_game_layers(screen, state, renderer, ui), 500)
+    ]
@@ -1,9 +1,8 @@
-import pygame
 from game_constants import *
 
 class GameBoard:
-    def __init__(self):
-        self.board_rect = pygame.Rect(20, 20, BOARD_WIDTH, BOARD_HEIGHT)
+    def __init__(self, verbose=True):
+        self.verbose = verbose
         
         # Create Movement grid (Tiles as hallway are walkable)
         self.grid = [[1 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
@@ -50,6 +49,21 @@ class GameBoard:
         
         # Ensure all doors connect to hallways
         self._ensure_door_connectivity()
+        
+        # Per-tile lookup table, built once the layout is final
+        self._build_tile_index()
+        
+        # Movement graph and shortest paths between every pair of tiles
+        self._compile_graph()
+        
+        # Bumped whenever the layout is rebuilt so cached views can tell it changed
+        self.layout_version = 0
+    
+    def rebuild(self):
+        # Call after editing the grid to refresh the lookup tables and drop cached queries
+        self._build_tile_index()
+        self._compile_graph()
+        self.layout_version += 1
     
     def _ensure_hallway_paths(self):
         # Create hallway paths to ensure accessibility between rooms
@@ -64,7 +78,8 @@ class GameBoard:
     def _verify_room_doors(self):
         # Verify that all rooms have sufficient doors
         for i, doors in enumerate(self.room_doors):
-            print(f"Room {i} ({ROOMS[i]['name']}) has {len(doors)} doors")
+            if self.verbose:
+                print(f"Room {i} ({ROOMS[i]['name']}) has {len(doors)} doors")
             
             if len(doors) < 1:
                 print(f"WARNING: Room {ROOMS[i]['name']} has no doors!")
@@ -110,6 +125,31 @@ class GameBoard:
                                 print(f"Created hallway at ({nx}, {ny}) for door to {ROOMS[room_idx]['name']}")
                                 break
     
+    def _build_tile_index(self):
+        # One entry per tile, indexed by y * GRID_WIDTH + x:
+        # (is_door result, room containing the tile, room whose center this is)
+        not_door = (False, -1)
+        door_results = [(True, room_idx) for room_idx in range(len(ROOMS))]
+        
+        tile_rooms = [None] * (GRID_WIDTH * GRID_HEIGHT)
+        for i, room in enumerate(ROOMS):
+            rx, ry = room["position"]
+            for y in range(ry, ry + room["height"]):
+                for x in range(rx, rx + room["width"]):
+                    # First room listed wins, matching the old linear scan
+                    if tile_rooms[y * GRID_WIDTH + x] is None:
+                        tile_rooms[y * GRID_WIDTH + x] = i
+        
+        tile_doors = [not_door] * (GRID_WIDTH * GRID_HEIGHT)
+        for door_x, door_y, room_idx in reversed(DOORS):
+            tile_doors[door_y * GRID_WIDTH + door_x] = door_results[room_idx]
+        
+        tile_centers = [None] * (GRID_WIDTH * GRID_HEIGHT)
+        for room_idx, (x, y) in reversed(list(enumerate(self.room_centers))):
+            tile_centers[y * GRID_WIDTH + x] = room_idx
+        
+        self.tile_info = list(zip(tile_doors, tile_rooms, tile_centers))
+    
     def is_walkable(self, x, y):
         # Check if a position is walkable
         if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
@@ -120,39 +160,160 @@ class GameBoard:
         # Check if a position is a door and return the room index
         if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
             return False, -1
-        
-        # Check if this position is in our door list
-        for door_x, door_y, room_idx in DOORS:
-            if x == door_x and y == door_y:
-                return True, room_idx
-        
-        return False, -1
+        return self.tile_info[y * GRID_WIDTH + x][0]
     
     def get_room_at(self, x, y):
-        for i, room in enumerate(ROOMS):
-            rx, ry = room["position"]
-            width = room["width"]
-            height = room["height"]
+        if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
+            return None
+        return self.tile_info[y * GRID_WIDTH + x][1]
+    
+    def get_room_center_at(self, x, y):
+        # Return the index of the room whose center is at this position, or None
+        if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
+            return None
+        return self.tile_info[y * GRID_WIDTH + x][2]
+
+    def _compile_graph(self):
+        # Legal moves from every tile, plus where each move actually lands:
+        # stepping onto a door from outside its room puts the player in the room center
+        size = GRID_WIDTH * GRID_HEIGHT
+        self.adjacency = []
+        self._landings = []
+        for idx in range(size):
+            moves = tuple(self._compute_valid_moves(idx % GRID_WIDTH, idx // GRID_WIDTH))
+            from_center = self.tile_info[idx][2] is not None
             
-            if rx <= x < rx + width and ry <= y < ry + height:
-                return i
+            landings = []
+            for target_x, target_y in moves:
+                is_door, room_idx = self.tile_info[target_y * GRID_WIDTH + target_x][0]
+                if is_door and not from_center:
+                    land_x, land_y = self.room_centers[room_idx]
+                else:
+                    land_x, land_y = target_x, target_y
+                landings.append(((target_x, target_y), land_y * GRID_WIDTH + land_x))
+            
+            self.adjacency.append(moves)
+            self._landings.append(tuple(landings))
         
-        return None
-
+        # Breadth-first search from every tile that has moves. Distances count
+        # move_player calls (255 = unreachable); first_steps holds the move to
+        # make from the source to get one step closer to each tile
+        self._distances = [None] * size
+        self._first_steps = [None] * size
+        for source in range(size):
+            if not self._landings[source]:
+                continue
+            
+            distances = bytearray(b"\xff") * size
+            first_steps = [None] * size
+            distances[source] = 0
+            
+            frontier = []
+            for target, landing in self._landings[source]:
+                if distances[landing] == 255:
+                    distances[landing] = 1
+                    first_steps[landing] = target
+                    frontier.append(landing)
+            
+            depth = 1
+            while frontier:
+                depth += 1
+                next_frontier = []
+                for node in frontier:
+                    step = first_steps[node]
+                    for _, landing in self._landings[node]:
+                        if distances[landing] == 255:
+                            distances[landing] = depth
+                            first_steps[landing] = step
+                            next_frontier.append(landing)
+                frontier = next_frontier
+            
+            self._distances[source] = distances
+            self._first_steps[source] = first_steps
+        
+        # Results of reachable_within, keyed on (position, steps, exact)
+        self._reachable_cache = {}
+    
+    def distance(self, a, b):
+        # Number of moves needed to get from position a to position b, or None if unreachable
+        if a == b:
+            return 0
+        ax, ay = a
+        bx, by = b
+        if not (0 <= ax < GRID_WIDTH and 0 <= ay < GRID_HEIGHT and 0 <= bx < GRID_WIDTH and 0 <= by < GRID_HEIGHT):
+            return None
+        distances = self._distances[ay * GRID_WIDTH + ax]
+        if distances is None or distances[by * GRID_WIDTH + bx] == 255:
+            return None
+        return distances[by * GRID_WIDTH + bx]
+    
+    def next_step_toward(self, a, b):
+        # The move to make from a on a shortest path to b, or None if already there or unreachable
+        ax, ay = a
+        bx, by = b
+        if not (0 <= ax < GRID_WIDTH and 0 <= ay < GRID_HEIGHT and 0 <= bx < GRID_WIDTH and 0 <= by < GRID_HEIGHT):
+            return None
+        first_steps = self._first_steps[ay * GRID_WIDTH + ax]
+        if first_steps is None:
+            return None
+        return first_steps[by * GRID_WIDTH + bx]
+    
+    def reachable_within(self, position, steps, exact=False):
+        # Every position a player at position can end on after at most (or, with
+        # exact, exactly) this many moves. Results are cached until the next rebuild()
+        key = (position, steps, exact)
+        cached = self._reachable_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        x, y = position
+        if not (0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT):
+            return frozenset()
+        source = y * GRID_WIDTH + x
+        
+        if exact:
+            # Players may double back, so walk the frontier one move at a time
+            frontier = {source}
+            for _ in range(steps):
+                frontier = {landing for node in frontier for _, landing in self._landings[node]}
+            nodes = frontier
+        else:
+            distances = self._distances[source]
+            if distances is None:
+                nodes = [source]
+            else:
+                nodes = [idx for idx, distance in enumerate(distances) if distance <= steps]
+        
+        result = frozenset((idx % GRID_WIDTH, idx // GRID_WIDTH) for idx in nodes)
+        self._reachable_cache[key] = result
+        return result
+    
+    def reachable_rooms(self, position, steps, exact=False):
+        # Indices of the rooms whose center is in reachable_within(position, steps, exact)
+        reachable = self.reachable_within(position, steps, exact)
+        return [room_idx for room_idx, center in enumerate(self.room_centers) if center in reachable]
+    
     def get_valid_moves(self, x, y):
+        # Moves are precomputed by _compile_graph; the tuple is shared, don't modify it
+        if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
+            return ()
+        return self.adjacency[y * GRID_WIDTH + x]
+    
+    def _compute_valid_moves(self, x, y):
         moves = []
         directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]  
         
+        if x < 0 or x >= GRID_WIDTH or y < 0 or y >= GRID_HEIGHT:
+            return moves
+        (is_door, room_idx), _, center_room = self.tile_info[y * GRID_WIDTH + x]
+        
         # Check if player is at a room center
-        for room_idx, center in enumerate(self.room_centers):
-            if (x, y) == center:
-                # If at room center, can move to any door of this room
-                for door_x, door_y in self.room_doors[room_idx]:
-                    moves.append((door_x, door_y))
-                return moves
+        if center_room is not None:
+            # If at room center, can move to any door of this room
+            moves.extend(self.room_doors[center_room])
+            return moves
         
         # Check if player is at a door
-        is_door, room_idx = self.is_door(x, y)
         if is_door:
             # If at a door, can move to room center
             moves.append(self.room_centers[room_idx])
@@ -170,149 +331,19 @@ class GameBoard:
         for dx, dy in directions:
             nx, ny = x + dx, y + dy
             
-            # Can move to doors
-            is_door, _ = self.is_door(nx, ny)
-            if is_door:
-                moves.append((nx, ny))
-                continue
-            
-            # Can move to walkable tiles
-            if self.is_walkable(nx, ny):
-                moves.append((nx, ny))
+            # Can move to doors and walkable tiles
+            if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT:
+                if self.tile_info[ny * GRID_WIDTH + nx][0][0] or self.grid[ny][nx] > 0:
+                    moves.append((nx, ny))
         
         return moves
-    
-    def render(self, screen):
-        # Render the game board
-        # Draw the background
-        pygame.draw.rect(screen, LIGHT_GRAY, self.board_rect)
-        pygame.draw.rect(screen, BLACK, self.board_rect, 2)
-        
-        # Draw the grid (hallways)
-        for row in range(GRID_HEIGHT):
-            for col in range(GRID_WIDTH):
-                x = col * TILE_SIZE + self.board_rect.x
-                y = row * TILE_SIZE + self.board_rect.y
-                rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-                
-                # Draw tile based on type
-                if self.grid[row][col] == 1: 
-                    pygame.draw.rect(screen, WHITE, rect)
-                    pygame.draw.rect(screen, DARK_GRAY, rect, 1)
-        
-        # Draw rooms
-        for i, room in enumerate(ROOMS):
-            rx, ry = room["position"]
-            width, height = room["width"], room["height"] 
-            x = rx * TILE_SIZE + self.board_rect.x
-            y = ry * TILE_SIZE + self.board_rect.y
-            w = width * TILE_SIZE
-            h = height * TILE_SIZE
-            
-            # Draw room fill
-            room_rect = pygame.Rect(x, y, w, h)
-            pygame.draw.rect(screen, room["color"], room_rect)
-            
-            # Draw room borders
-            pygame.draw.rect(screen, BLACK, room_rect, 2)
-            
-            # Draw room name
-            font = pygame.font.SysFont(None, 16)
-            text = font.render(room["name"], True, BLACK)
-            text_rect = text.get_rect(center=(x + w // 2, y + h // 2))
-            screen.blit(text, text_rect)
-        
-        # Draw doors on top of rooms
-        for door_x, door_y, room_idx in DOORS:
-            door_screen_x = door_x * TILE_SIZE + self.board_rect.x
-            door_screen_y = door_y * TILE_SIZE + self.board_rect.y
-            
-            # Get room properties
-            room = ROOMS[room_idx]
-            rx, ry = room["position"]
-            room_w, room_h = room["width"], room["height"]
-            
-            # Draw door
-            door_rect = pygame.Rect(door_screen_x, door_screen_y, TILE_SIZE, TILE_SIZE)
-            pygame.draw.rect(screen, DOOR_COLOR, door_rect)
-            
-            # Determine which wall to break (if door is on a boundary)
-            if door_x == rx:  
-                pygame.draw.line(screen, room["color"], 
-                                (door_screen_x, door_screen_y),
-                                (door_screen_x, door_screen_y + TILE_SIZE), 2)
-            elif door_x == rx + room_w - 1:  
-                pygame.draw.line(screen, room["color"], 
-                                (door_screen_x + TILE_SIZE, door_screen_y),
-                                (door_screen_x + TILE_SIZE, door_screen_y + TILE_SIZE), 2)
-            elif door_y == ry:  
-                pygame.draw.line(screen, room["color"], 
-                                (door_screen_x, door_screen_y),
-                                (door_screen_x + TILE_SIZE, door_screen_y), 2)
-            elif door_y == ry + room_h - 1:  
-                pygame.draw.line(screen, room["color"], 
-                                (door_screen_x, door_screen_y + TILE_SIZE),
-                                (door_screen_x + TILE_SIZE, door_screen_y + TILE_SIZE), 2)
-            
-            is_boundary_door = (door_x == rx or door_x == rx + room_w - 1 or
-                               door_y == ry or door_y == ry + room_h - 1)
-            
-            if not is_boundary_door:
-                pygame.draw.rect(screen, DOOR_COLOR, door_rect)
-                pygame.draw.rect(screen, BLACK, door_rect, 1)
-    
-    def render_player(self, screen, player, is_current):
-        x, y = player["position"]
-        
-        player_count = 0
-        player_index = 0
-        
-        color_sum = sum(player["color"])
-        offset_index = color_sum % 4 
-        
-        # Calculate offsets for multiple players in the same position
-        offset_patterns = [
-            (0, 0),     
-            (-5, -5),    
-            (5, -5),    
-            (5, 5),      
-            (-5, 5),     
-        ]
-        
-        offset_x, offset_y = offset_patterns[offset_index]
-        
-        # Calculate position with offset
-        screen_x = x * TILE_SIZE + self.board_rect.x + TILE_SIZE // 2 + offset_x
-        screen_y = y * TILE_SIZE + self.board_rect.y + TILE_SIZE // 2 + offset_y
-        
-        # Draw player token (slightly smaller to accommodate multiple players)
-        radius = TILE_SIZE // 2 - 4
-        pygame.draw.circle(screen, player["color"], (screen_x, screen_y), radius)
-        pygame.draw.circle(screen, BLACK, (screen_x, screen_y), radius, 1)
-        
-        # Highlight current player
-        if is_current:
-            pygame.draw.circle(screen, WHITE, (screen_x, screen_y), radius + 1, 1)
-    
-    def screen_to_board(self, screen_x, screen_y):
-        # Convert screen coordinates to board coordinates
-        if not self.board_rect.collidepoint(screen_x, screen_y):
-            return None
-        
-        board_x = (screen_x - self.board_rect.x) // TILE_SIZE
-        board_y = (screen_y - self.board_rect.y) // TILE_SIZE
-        
-        if 0 <= board_x < GRID_WIDTH and 0 <= board_y < GRID_HEIGHT:
-            return (board_x, board_y)
-        
-        return None
-    
-    def highlight_valid_moves(self, screen, valid_moves):
-        # Highlight valid moves on the board
-        for x, y in valid_moves:
-            screen_x = x * TILE_SIZE + self.board_rect.x
-            screen_y = y * TILE_SIZE + self.board_rect.y
-            
-            s = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-            s.fill((255, 255, 0, 128))
-            screen.blit(s, (screen_x, screen_y))
\ No newline at end of file
+
+# Board shared by every game in this process that isn't given its own
+_shared_board = None
+
+def get_board():
+    # The layout is fixed, so each process only builds the board once
+    global _shared_board
+    if _shared_board is None:
+        _shared_board = GameBoard(verbose=False)
+    return _shared_board
@@ -0,0 +1,189 @@
+import pygame
+from game_constants import *
+from fonts import get_font, render_text
+from profiler import NULL_PROFILER
+
+class BoardRenderer:
+    def __init__(self, board):
+        # Drawing layer for a GameBoard; the board itself holds no pygame state
+        self.board = board
+        self.board_rect = pygame.Rect(20, 20, BOARD_WIDTH, BOARD_HEIGHT)
+        
+        # Pre-rendered tiles, rooms and doors; rebuilt when the board layout changes
+        self.static_layer = None
+        self.layout_version = None
+        
+        # Inputs the board layer was last drawn with (see draw_board_layer)
+        self.layer_state = None
+    
+    def invalidate(self):
+        # Force the board layer to redraw on the next draw_board_layer call
+        self.layer_state = None
+    
+    def draw_board_layer(self, screen, players, current_player_idx, valid_moves, profiler=NULL_PROFILER):
+        # Draw board, tokens and move highlights if any of them changed since the
+        # last call; returns the rect that was redrawn, or None
+        state = (self.board.layout_version, current_player_idx,
+                 tuple((player["position"], player["active"]) for player in players),
+                 tuple(valid_moves))
+        if state == self.layer_state:
+            return None
+        self.layer_state = state
+        
+        with profiler.phase("board.render"):
+            self.render(screen)
+        with profiler.phase("board.players"):
+            for i, player in enumerate(players):
+                # Only draw active players
+                if player["active"]:
+                    self.render_player(screen, player, i == current_player_idx)
+        if valid_moves:
+            with profiler.phase("board.highlight"):
+                self.highlight_valid_moves(screen, valid_moves)
+        return self.board_rect
+
+    def render(self, screen):
+        # Render the game board from the cached static layer
+        if self.static_layer is None or self.layout_version != self.board.layout_version:
+            self._build_static_layer()
+        screen.blit(self.static_layer, self.board_rect)
+    
+    def _build_static_layer(self):
+        # Draw tiles, rooms, labels and doors once into an off-screen surface
+        layer = pygame.Surface(self.board_rect.size)
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert()
+        local_rect = layer.get_rect()
+        
+        # Draw the background
+        pygame.draw.rect(layer, LIGHT_GRAY, local_rect)
+        pygame.draw.rect(layer, BLACK, local_rect, 2)
+
+        # Draw the grid (hallways)
+        for row in range(GRID_HEIGHT):
+            for col in range(GRID_WIDTH):
+                x = col * TILE_SIZE
+                y = row * TILE_SIZE
+                rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
+
+                # Draw tile based on type
+                if self.board.grid[row][col] == 1:
+                    pygame.draw.rect(layer, WHITE, rect)
+                    pygame.draw.rect(layer, DARK_GRAY, rect, 1)
+
+        # Draw rooms
+        font = get_font(16)
+        for i, room in enumerate(ROOMS):
+            rx, ry = room["position"]
+            width, height = room["width"], room["height"]
+            x = rx * TILE_SIZE
+            y = ry * TILE_SIZE
+            w = width * TILE_SIZE
+            h = height * TILE_SIZE
+
+            # Draw room fill
+            room_rect = pygame.Rect(x, y, w, h)
+            pygame.draw.rect(layer, room["color"], room_rect)
+
+            # Draw room borders
+            pygame.draw.rect(layer, BLACK, room_rect, 2)
+
+            # Draw room name
+            text = render_text(font, room["name"], BLACK)
+            text_rect = text.get_rect(center=(x + w // 2, y + h // 2))
+            layer.blit(text, text_rect)
+
+        # Draw doors on top of rooms
+        for door_x, door_y, room_idx in DOORS:
+            door_screen_x = door_x * TILE_SIZE
+            door_screen_y = door_y * TILE_SIZE
+
+            # Get room properties
+            room = ROOMS[room_idx]
+            rx, ry = room["position"]
+            room_w, room_h = room["width"], room["height"]
+
+            # Draw door
+            door_rect = pygame.Rect(door_screen_x, door_screen_y, TILE_SIZE, TILE_SIZE)
+            pygame.draw.rect(layer, DOOR_COLOR, door_rect)
+
+            # Determine which wall to break (if door is on a boundary)
+            if door_x == rx:
+                pygame.draw.line(layer, room["color"],
+                                (door_screen_x, door_screen_y),
+                                (door_screen_x, door_screen_y + TILE_SIZE), 2)
+            elif door_x == rx + room_w - 1:
+                pygame.draw.line(layer, room["color"],
+                                (door_screen_x + TILE_SIZE, door_screen_y),
+                                (door_screen_x + TILE_SIZE, door_screen_y + TILE_SIZE), 2)
+            elif door_y == ry:
+                pygame.draw.line(layer, room["color"],
+                                (door_screen_x, door_screen_y),
+                                (door_screen_x + TILE_SIZE, door_screen_y), 2)
+            elif door_y == ry + room_h - 1:
+                pygame.draw.line(layer, room["color"],
+                                (door_screen_x, door_screen_y + TILE_SIZE),
+                                (door_screen_x + TILE_SIZE, door_screen_y + TILE_SIZE), 2)
+
+            is_boundary_door = (door_x == rx or door_x == rx + room_w - 1 or
+                               door_y == ry or door_y == ry + room_h - 1)
+
+            if not is_boundary_door:
+                pygame.draw.rect(layer, DOOR_COLOR, door_rect)
+                pygame.draw.rect(layer, BLACK, door_rect, 1)
+        
+        self.static_layer = layer
+        self.layout_version = self.board.layout_version
+    
+    def render_player(self, screen, player, is_current):
+        x, y = player["position"]
+
+        color_sum = sum(player["color"])
+        offset_index = color_sum % 4
+
+        # Calculate offsets for multiple players in the same position
+        offset_patterns = [
+            (0, 0),
+            (-5, -5),
+            (5, -5),
+            (5, 5),
+            (-5, 5),
+        ]
+
+        offset_x, offset_y = offset_patterns[offset_index]
+
+        # Calculate position with offset
+        screen_x = x * TILE_SIZE + self.board_rect.x + TILE_SIZE // 2 + offset_x
+        screen_y = y * TILE_SIZE + self.board_rect.y + TILE_SIZE // 2 + offset_y
+
+        # Draw player token (slightly smaller to accommodate multiple players)
+        radius = TILE_SIZE // 2 - 4
+        pygame.draw.circle(screen, player["color"], (screen_x, screen_y), radius)
+        pygame.draw.circle(screen, BLACK, (screen_x, screen_y), radius, 1)
+
+        # Highlight current player
+        if is_current:
+            pygame.draw.circle(screen, WHITE, (screen_x, screen_y), radius + 1, 1)
+
+    def screen_to_board(self, screen_x, screen_y):
+        # Convert screen coordinates to board coordinates
+        if not self.board_rect.collidepoint(screen_x, screen_y):
+            return None
+
+        board_x = (screen_x - self.board_rect.x) // TILE_SIZE
+        board_y = (screen_y - self.board_rect.y) // TILE_SIZE
+
+        if 0 <= board_x < GRID_WIDTH and 0 <= board_y < GRID_HEIGHT:
+            return (board_x, board_y)
+
+        return None
+
+    def highlight_valid_moves(self, screen, valid_moves):
+        # Highlight valid moves on the board
+        for x, y in valid_moves:
+            screen_x = x * TILE_SIZE + self.board_rect.x
+            screen_y = y * TILE_SIZE + self.board_rect.y
+
+            s = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+            s.fill((255, 255, 0, 128))
+            screen.blit(s, (screen_x, screen_y))
@@ -0,0 +1,68 @@
+from game_constants import *
+
+# Every card is a small integer ID: characters first, then weapons, then rooms, in
+# the order game_constants lists them. A set of cards (a hand, the envelope, a
+# suggestion) is a bitmask with bit ID set for each card in it.
+CARD_NAMES = ([character["name"] for character in CHARACTERS] +
+              list(WEAPONS) +
+              [room["name"] for room in ROOMS])
+CARD_TYPE_OF = ([CARD_TYPES["CHARACTER"]] * len(CHARACTERS) +
+                [CARD_TYPES["WEAPON"]] * len(WEAPONS) +
+                [CARD_TYPES["ROOM"]] * len(ROOMS))
+NUM_CARDS = len(CARD_NAMES)
+
+FIRST_CHARACTER_CARD = 0
+FIRST_WEAPON_CARD = len(CHARACTERS)
+FIRST_ROOM_CARD = len(CHARACTERS) + len(WEAPONS)
+
+CHARACTER_MASK = ((1 << len(CHARACTERS)) - 1) << FIRST_CHARACTER_CARD
+WEAPON_MASK = ((1 << len(WEAPONS)) - 1) << FIRST_WEAPON_CARD
+ROOM_MASK = ((1 << len(ROOMS)) - 1) << FIRST_ROOM_CARD
+ALL_CARDS_MASK = (1 << NUM_CARDS) - 1
+
+# Mask of all cards of each type, indexed by CARD_TYPES value
+TYPE_MASKS = {
+    CARD_TYPES["CHARACTER"]: CHARACTER_MASK,
+    CARD_TYPES["WEAPON"]: WEAPON_MASK,
+    CARD_TYPES["ROOM"]: ROOM_MASK
+}
+
+CARD_TYPE_NAMES = {
+    CARD_TYPES["CHARACTER"]: "Character",
+    CARD_TYPES["WEAPON"]: "Weapon",
+    CARD_TYPES["ROOM"]: "Room"
+}
+
+_character_ids = {character["name"]: FIRST_CHARACTER_CARD + i for i, character in enumerate(CHARACTERS)}
+_weapon_ids = {weapon: FIRST_WEAPON_CARD + i for i, weapon in enumerate(WEAPONS)}
+
+def character_card(name):
+    return _character_ids[name]
+
+def weapon_card(name):
+    return _weapon_ids[name]
+
+def room_card(room_idx):
+    return FIRST_ROOM_CARD + room_idx
+
+def card_name(card):
+    return CARD_NAMES[card]
+
+def card_type(card):
+    return CARD_TYPE_OF[card]
+
+def card_mask(cards):
+    # Bitmask holding every card in an iterable of card IDs
+    mask = 0
+    for card in cards:
+        mask |= 1 << card
+    return mask
+
+def cards_in(mask):
+    # Card IDs set in a bitmask, lowest first
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(low.bit_length() - 1)
+        mask ^= low
+    return cards
@@ -0,0 +1,196 @@
+from game_constants import *
+from cards import *
+
+# Category masks; the envelope holds exactly one card of each
+CATEGORY_MASKS = (CHARACTER_MASK, WEAPON_MASK, ROOM_MASK)
+
+class PlayerKnowledge:
+    # What one player can work out about where every card is. Owners are the
+    # players (by index), then the envelope, then the undealt pile. For each
+    # owner, possible is the mask of cards it might hold and known the mask of
+    # cards it certainly holds, so the pair is one column of the card x owner matrix.
+    # New facts are only propagated when the matrix is next read
+    def __init__(self, player_idx, hand_sizes, own_hand):
+        self.player_idx = player_idx
+        num_players = len(hand_sizes)
+        self.envelope = num_players
+        self.undealt = num_players + 1
+
+        # How many cards each owner holds is public
+        undealt_size = NUM_CARDS - len(CATEGORY_MASKS) - sum(hand_sizes)
+        self.sizes = list(hand_sizes) + [len(CATEGORY_MASKS), undealt_size]
+
+        self._possible = [ALL_CARDS_MASK & ~own_hand] * len(self.sizes)
+        self._known = [0] * len(self.sizes)
+        self._possible[player_idx] = own_hand
+        self._known[player_idx] = own_hand
+
+        # (owner, mask) pairs: the owner holds at least one card of the mask
+        self.clauses = []
+        self.pending = True  # Facts added since the last propagate()
+
+    @property
+    def possible(self):
+        if self.pending:
+            self.propagate()
+        return self._possible
+
+    @property
+    def known(self):
+        if self.pending:
+            self.propagate()
+        return self._known
+
+    def holds(self, owner, card):
+        self._known[owner] |= 1 << card
+        self._possible[owner] |= 1 << card
+        self.pending = True
+
+    def lacks(self, owner, mask):
+        self._possible[owner] &= ~mask
+        self.pending = True
+
+    def holds_one_of(self, owner, mask):
+        self.clauses.append((owner, mask))
+        self.pending = True
+
+    def propagate(self):
+        # Apply the constraints until nothing changes: every card has exactly one
+        # owner, every owner holds a known number of cards, the envelope holds one
+        # card per category, and each clause keeps at least one of its cards
+        possible = self._possible
+        known = self._known
+        sizes = self.sizes
+        envelope = self.envelope
+        owners = range(len(sizes))
+
+        changed = True
+        while changed:
+            changed = False
+
+            # A card known to be somewhere can't be anywhere else
+            known_any = 0
+            for owner in owners:
+                known_any |= known[owner]
+            for owner in owners:
+                narrowed = possible[owner] & ~(known_any & ~known[owner])
+                if narrowed != possible[owner]:
+                    possible[owner] = narrowed
+                    changed = True
+
+            # A card only one owner could have belongs to that owner
+            once = 0
+            twice = 0
+            for owner in owners:
+                twice |= once & possible[owner]
+                once |= possible[owner]
+            single = once & ~twice
+            for owner in owners:
+                found = possible[owner] & single & ~known[owner]
+                if found:
+                    known[owner] |= found
+                    changed = True
+
+            # Hand sizes: all cards found, or only as many candidates as cards
+            for owner in owners:
+                if possible[owner] != known[owner]:
+                    if known[owner].bit_count() == sizes[owner]:
+                        possible[owner] = known[owner]
+                        changed = True
+                    elif possible[owner].bit_count() == sizes[owner]:
+                        known[owner] = possible[owner]
+                        changed = True
+
+            # One card of each category in the envelope
+            for category in CATEGORY_MASKS:
+                if known[envelope] & category:
+                    narrowed = possible[envelope] & ~(category & ~known[envelope])
+                    if narrowed != possible[envelope]:
+                        possible[envelope] = narrowed
+                        changed = True
+                else:
+                    candidates = possible[envelope] & category
+                    if candidates and candidates & (candidates - 1) == 0:
+                        known[envelope] |= candidates
+                        changed = True
+
+            # "Showed one of these": once only one candidate is left, it's known
+            remaining = []
+            for owner, mask in self.clauses:
+                if known[owner] & mask:
+                    continue
+                candidates = possible[owner] & mask
+                if candidates and candidates & (candidates - 1) == 0:
+                    known[owner] |= candidates
+                    changed = True
+                    continue
+                remaining.append((owner, mask))
+            self.clauses = remaining
+        self.pending = False
+
+    def is_solved(self):
+        return self.known[self.envelope].bit_count() == len(CATEGORY_MASKS)
+
+    def solution(self):
+        # (character, weapon, room) card IDs if the envelope is determined, else None
+        if not self.is_solved():
+            return None
+        return tuple(cards_in(self.known[self.envelope]))
+
+    def envelope_candidates(self, category_mask):
+        # Cards of one category that could still be in the envelope
+        return cards_in(self.possible[self.envelope] & category_mask)
+
+    def snapshot(self):
+        return (tuple(self.possible), tuple(self.known), tuple(self.clauses))
+
+    def restore(self, snapshot):
+        possible, known, clauses = snapshot
+        self._possible = list(possible)
+        self._known = list(known)
+        self.clauses = list(clauses)
+        self.pending = False
+
+    def owner_of(self, card):
+        # Index of the owner known to hold a card (players, then envelope, then undealt), or None
+        bit = 1 << card
+        for owner, mask in enumerate(self.known):
+            if mask & bit:
+                return owner
+        return None
+
+class Deduction:
+    # Every player's knowledge in one game, updated as suggestions are resolved
+    def __init__(self, hands):
+        hand_sizes = [hand.bit_count() for hand in hands]
+        self.players = [PlayerKnowledge(i, hand_sizes, hand) for i, hand in enumerate(hands)]
+
+        # What everyone saw of each suggestion: (suggester, mask, passers, disprover)
+        self.history = []
+
+    def record_suggestion(self, suggester, suggestion_mask, passers, disprover=None, shown_card=None):
+        # passers couldn't disprove; disprover (if any) showed shown_card to the suggester only
+        self.history.append((suggester, suggestion_mask, tuple(passers), disprover))
+        for observer, knowledge in enumerate(self.players):
+            for passer in passers:
+                knowledge.lacks(passer, suggestion_mask)
+            if disprover is not None:
+                if observer == suggester:
+                    knowledge.holds(disprover, shown_card)
+                elif observer != disprover:
+                    knowledge.holds_one_of(disprover, suggestion_mask)
+
+    def snapshot(self):
+        return (tuple(knowledge.snapshot() for knowledge in self.players), tuple(self.history))
+
+    def restore(self, snapshot):
+        players, history = snapshot
+        for knowledge, player_snapshot in zip(self.players, players):
+            knowledge.restore(player_snapshot)
+        self.history = list(history)
+
+    def is_solved(self, player_idx):
+        return self.players[player_idx].is_solved()
+
+    def solution(self, player_idx):
+        return self.players[player_idx].solution()
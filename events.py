@@ -0,0 +1,177 @@
+import json
+import struct
+from collections import namedtuple
+from game_constants import *
+from cards import *
+
+# Everything that happens in a game, as GameState.events records it. Players are
+# indices into GameState.players, rooms are indices into ROOMS, and characters,
+# weapons and shown cards are card IDs (see cards.py)
+GameStart = namedtuple("GameStart", "num_players")
+Roll = namedtuple("Roll", "player die1 die2")
+Move = namedtuple("Move", "player x y")
+EnterRoom = namedtuple("EnterRoom", "player room via_door")
+ExitRoom = namedtuple("ExitRoom", "player room")
+Suggestion = namedtuple("Suggestion", "player character weapon room")
+Disproof = namedtuple("Disproof", "player suggester card")  # player is None if nobody could
+CardSeen = namedtuple("CardSeen", "player shown_by card")
+Accusation = namedtuple("Accusation", "player character weapon room correct")
+Elimination = namedtuple("Elimination", "player")
+TurnEnd = namedtuple("TurnEnd", "player next_player")
+GameOver = namedtuple("GameOver", "winner")  # winner is None if everyone was eliminated
+Note = namedtuple("Note", "text")  # Free-form status message
+
+# Type names used in exports, and the code for each in the binary format
+EVENT_NAMES = {
+    GameStart: "game_start",
+    Roll: "roll",
+    Move: "move",
+    EnterRoom: "enter_room",
+    ExitRoom: "exit_room",
+    Suggestion: "suggestion",
+    Disproof: "disproof",
+    CardSeen: "card_seen",
+    Accusation: "accusation",
+    Elimination: "elimination",
+    TurnEnd: "turn_end",
+    GameOver: "game_over",
+    Note: "note"
+}
+EVENT_TYPES = {name: event_type for event_type, name in EVENT_NAMES.items()}
+EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_NAMES, 1)}
+EVENT_TYPES_BY_CODE = {code: event_type for event_type, code in EVENT_CODES.items()}
+
+def describe(event, names):
+    # The game log lines for an event, given the players' names
+    event_type = type(event)
+    if event_type is GameStart:
+        return [f"Game started with {event.num_players} players.",
+                f"Each player has been dealt {CARDS_PER_PLAYER} cards.",
+                f"It's {names[0]}'s turn. Roll the dice."]
+    if event_type is Roll:
+        return [f"{names[event.player]} rolled {event.die1 + event.die2} ({event.die1}, {event.die2})."]
+    if event_type is Move:
+        return []
+    if event_type is EnterRoom:
+        room_name = ROOMS[event.room]["name"]
+        if event.via_door:
+            return [f"{names[event.player]} is at a door to {room_name}.",
+                    f"{names[event.player]} moved to the center of {room_name}."]
+        return [f"{names[event.player]} is in the center of {room_name}."]
+    if event_type is ExitRoom:
+        return [f"{names[event.player]} exited the {ROOMS[event.room]['name']} through a door."]
+    if event_type is Suggestion:
+        return [f"{names[event.player]} suggests: {card_name(event.character)} in the "
+                f"{ROOMS[event.room]['name']} with the {card_name(event.weapon)}."]
+    if event_type is Disproof:
+        if event.player is None:
+            return ["No one could disprove the suggestion."]
+        card_type_name = CARD_TYPE_NAMES[card_type(event.card)]
+        return [f"{names[event.player]} can disprove the suggestion.",
+                f"{names[event.player]} shows {names[event.suggester]} a {card_type_name} card."]
+    if event_type is CardSeen:
+        card_type_name = CARD_TYPE_NAMES[card_type(event.card)]
+        return [f"{names[event.player]} acknowledges seeing the {card_type_name} card "
+                f"{card_name(event.card)} from {names[event.shown_by]}."]
+    if event_type is Accusation:
+        return [f"{names[event.player]} accuses: {card_name(event.character)} in the "
+                f"{ROOMS[event.room]['name']} with the {card_name(event.weapon)}."]
+    if event_type is Elimination:
+        return [f"{names[event.player]} made an incorrect accusation and is eliminated."]
+    if event_type is TurnEnd:
+        return [f"It's {names[event.next_player]}'s turn. Roll the dice."]
+    if event_type is GameOver:
+        if event.winner is None:
+            return ["Game over! All players have been eliminated."]
+        return [f"{names[event.winner]} wins! The accusation was correct."]
+    if event_type is Note:
+        return [event.text]
+    raise ValueError(f"Unknown event {event!r}")
+
+# JSONL: one object per event, with its type name and fields
+
+def event_to_dict(event):
+    record = {"type": EVENT_NAMES[type(event)]}
+    record.update(event._asdict())
+    return record
+
+def event_from_dict(record):
+    event_type = EVENT_TYPES[record["type"]]
+    return event_type(*(record[field] for field in event_type._fields))
+
+def write_jsonl(events, f):
+    # Stream events to a text file, one JSON object per line
+    for event in events:
+        f.write(json.dumps(event_to_dict(event), separators=(",", ":")))
+        f.write("\n")
+
+def read_jsonl(f):
+    for line in f:
+        if line.strip():
+            yield event_from_dict(json.loads(line))
+
+# Binary: every field of every event except Note fits in a byte, so each event
+# is a type code followed by five field bytes, with NO_VALUE for None and for
+# unused fields. A Note is its type code, NOTE_MARKER, then a little-endian
+# length and that many bytes of UTF-8 text
+
+EVENT_RECORD = struct.Struct("<6B")
+NOTE_LENGTH = struct.Struct("<H")
+NO_VALUE = 255
+NOTE_MARKER = 254
+
+# Longest text a 16-bit length can hold
+MAX_TEXT_BYTES = 0xFFFF
+
+def encode_text(text):
+    # text as UTF-8, cut to MAX_TEXT_BYTES at a character boundary so what's kept still decodes
+    return text.encode("utf-8")[:MAX_TEXT_BYTES].decode("utf-8", "ignore").encode("utf-8")
+
+def pack_event(event):
+    code = EVENT_CODES[type(event)]
+    if type(event) is Note:
+        text = encode_text(event.text)
+        return bytes((code, NOTE_MARKER)) + NOTE_LENGTH.pack(len(text)) + text
+    fields = [NO_VALUE if value is None else int(value) for value in event]
+    fields += [NO_VALUE] * (EVENT_RECORD.size - 1 - len(fields))
+    return EVENT_RECORD.pack(code, *fields)
+
+def pack_events(events):
+    return b"".join(pack_event(event) for event in events)
+
+def write_binary(events, f):
+    # Stream events to a binary file
+    for event in events:
+        f.write(pack_event(event))
+
+# Fields each event type has in the binary format; the last field of these types is a bool
+_FIELD_COUNTS = {code: len(event_type._fields) for code, event_type in EVENT_TYPES_BY_CODE.items()}
+_BOOL_LAST = (EnterRoom, Accusation)
+
+def unpack_events(data):
+    # Events packed by pack_events, in order
+    offset = 0
+    end = len(data)
+    view = memoryview(data)
+    unpack = EVENT_RECORD.unpack_from
+    note_code = EVENT_CODES[Note]
+    while offset < end:
+        code = data[offset]
+        if code == note_code:
+            (length,) = NOTE_LENGTH.unpack_from(data, offset + 2)
+            start = offset + 2 + NOTE_LENGTH.size
+            yield Note(str(view[start:start + length], "utf-8"))
+            offset = start + length
+            continue
+        event_type = EVENT_TYPES_BY_CODE[code]
+        fields = unpack(data, offset)[1:1 + _FIELD_COUNTS[code]]
+        if NO_VALUE in fields:
+            fields = tuple(None if value == NO_VALUE else value for value in fields)
+        if event_type in _BOOL_LAST:
+            fields = fields[:-1] + (bool(fields[-1]),)
+        # Built like namedtuple._make, without its length check
+        yield tuple.__new__(event_type, fields)
+        offset += EVENT_RECORD.size
+
+def read_binary(f):
+    return unpack_events(f.read())
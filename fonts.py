@@ -0,0 +1,37 @@
+import pygame
+from collections import OrderedDict
+from game_constants import *
+
+# Font objects by (name, size), shared by the whole process
+_fonts = {}
+
+# Rendered text surfaces by (font, text, colour, antialias), least recently used first
+_text_cache = OrderedDict()
+
+def get_font(size, name=None):
+    # SysFont does a system font lookup on every call, so each font is only created once
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.SysFont(name, size)
+        _fonts[key] = font
+    return font
+
+def render_text(font, text, color, antialias=True):
+    # Render text through the cache; the returned surface is shared, don't draw on it
+    key = (font, text, color, antialias)
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        return surface
+    
+    surface = font.render(text, antialias, color)
+    _text_cache[key] = surface
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surface
+
+def clear_caches():
+    # Drop every cached font and text surface (e.g. before pygame.quit)
+    _fonts.clear()
+    _text_cache.clear()
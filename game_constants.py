@@ -119,4 +119,18 @@ CARD_TYPES = {
 # Game state constants
 MAX_LOG_ENTRIES = 50  
 LOG_ENTRIES_PER_PAGE = 8 
-CARDS_PER_PLAYER = 3  # Each player is dealt exactly 3 cards
\ No newline at end of file
+CARDS_PER_PLAYER = 3  # Each player is dealt exactly 3 cards
+MAX_TURNS = 300  # Bot games still running after this many turns end unsolved
+SEED_MASK = 0xFFFFFFFF  # Game seeds are kept to 32 bits, the size saves and archives store
+
+# Frame pacing
+FRAME_RATE = 60  # Frame cap while the screen is changing
+IDLE_WAIT_MS = 250  # Longest the event-driven loop sleeps waiting for input
+BOT_TURN_DELAY_MS = 600  # Pause before a bot plays so its moves can be followed
+
+# Profiling overlay (F3 or --profile)
+PROFILE_WINDOW = 240  # Most recent frames the percentiles are taken over
+PROFILE_OVERLAY_MS = 500  # How often the overlay refreshes when nothing else redraws
+
+# Rendering caches
+TEXT_CACHE_SIZE = 512  # Rendered text surfaces kept in the LRU cache
\ No newline at end of file
@@ -0,0 +1,66 @@
+from game_constants import *
+
+class GameLog:
+    # The most recent log entries in a fixed-size ring buffer. Entries are numbered
+    # in the order they were added; once capacity entries are held, each new one
+    # replaces the oldest, which is appended to the spill file if there is one
+    def __init__(self, capacity=MAX_LOG_ENTRIES, spill_path=None):
+        self.capacity = capacity
+        self.entries = [None] * capacity
+        self.total = 0  # Entries ever added; the next entry's sequence number
+        self.spill_path = spill_path
+        self.spill_file = None
+        self.spilled = 0  # Sequence number of the next entry to go to the spill file
+
+    @property
+    def first(self):
+        # Sequence number of the oldest entry still held
+        return max(0, self.total - self.capacity)
+
+    def append(self, message):
+        slot = self.total % self.capacity
+        # After a restore the oldest entry may be one that was spilled before
+        if self.total - self.capacity >= self.spilled and self.spill_path is not None:
+            if self.spill_file is None:
+                self.spill_file = open(self.spill_path, "a", encoding="utf-8")
+            self.spill_file.write(self.entries[slot] + "\n")
+            self.spilled = self.total - self.capacity + 1
+        self.entries[slot] = message
+        self.total += 1
+
+    def entry(self, sequence):
+        # The entry with a sequence number, which must still be held
+        if not self.first <= sequence < self.total:
+            raise IndexError(f"Log entry {sequence} is not held")
+        return self.entries[sequence % self.capacity]
+
+    def __len__(self):
+        return self.total - self.first
+
+    def __getitem__(self, index):
+        # Index or slice the held entries, oldest first, like a list
+        if isinstance(index, slice):
+            return [self.entry(self.first + i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Log index out of range")
+        return self.entries[(self.first + index) % self.capacity]
+
+    def __iter__(self):
+        for sequence in range(self.first, self.total):
+            yield self.entries[sequence % self.capacity]
+
+    def snapshot(self):
+        return (tuple(self.entries), self.total)
+
+    def restore(self, snapshot):
+        # Entries already spilled to the file stay there, and aren't written again
+        # when they fall out of the buffer a second time
+        entries, self.total = snapshot
+        self.entries = list(entries)
+
+    def close(self):
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
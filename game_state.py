@@ -1,16 +1,71 @@
 import random
-import pygame
 from game_constants import *
 from board import GameBoard
+from cards import *
+from deduction import Deduction
+from game_log import GameLog
+from events import *
+
+class GameSnapshot:
+    # The rules state of a game at one moment, as taken by GameState.snapshot().
+    # Everything is a tuple or a scalar, so a snapshot is never changed after it
+    # is taken and can be restored any number of times. Dialog selections are UI
+    # state and aren't included
+    __slots__ = ("positions", "active", "cards", "solution_cards", "current_player_idx",
+                 "dice_values", "moves_left", "has_rolled", "game_phase",
+                 "player_showing_card", "card_shown_to", "card_being_shown", "showing_card_ui",
+                 "showing_notification_ui", "notification_message", "current_suggestion",
+                 "num_events", "num_actions", "log", "deduction", "rng_state")
+
+    def __init__(self, state):
+        players = state.players
+        self.positions = tuple(player["position"] for player in players)
+        self.active = tuple(player["active"] for player in players)
+        self.cards = tuple(tuple(player["cards"]) for player in players)
+        self.solution_cards = tuple(state.solution_cards)
+        self.current_player_idx = state.current_player_idx
+        self.dice_values = state.dice_values
+        self.moves_left = state.moves_left
+        self.has_rolled = state.has_rolled
+        self.game_phase = state.game_phase
+        self.player_showing_card = state.player_showing_card
+        self.card_shown_to = state.card_shown_to
+        self.card_being_shown = state.card_being_shown
+        self.showing_card_ui = state.showing_card_ui
+        self.showing_notification_ui = state.showing_notification_ui
+        self.notification_message = state.notification_message
+        self.current_suggestion = tuple(state.current_suggestion.items()) if state.current_suggestion else None
+        
+        # Events and actions are only ever appended, so their lengths are enough
+        self.num_events = len(state.events)
+        self.num_actions = len(state.actions)
+        self.log = state.game_log.snapshot()
+        self.deduction = state.deduction.snapshot() if state.deduction is not None else None
+        self.rng_state = state.rng.getstate()
 
 class GameState:
-    def __init__(self):
-        self.board = GameBoard()
+    def __init__(self, board=None, verbose=True, seed=None, log_path=None):
+        # A board can be shared between games since its layout never changes
+        self.board = board if board is not None else GameBoard(verbose)
+        self.verbose = verbose
+        
+        # Every random choice comes from this game's own stream, so the seed and
+        # the recorded actions are enough to replay the game (see replay.py). Any
+        # integer is taken as a seed and wrapped to 32 bits
+        self.seed = (seed if seed is not None else random.getrandbits(32)) & SEED_MASK
+        self.rng = random.Random(self.seed)
+        self.actions = []  # Tuples of (action name, *arguments) since initialize_game
+        
+        # Search rollouts turn this off to skip the action list, events and game log
+        self.record_history = True
         self.players = []
         self.current_player_idx = 0
         self.dice_values = (0, 0)
         self.moves_left = 0
-        self.game_log = []
+        self.log_path = log_path  # Entries that fall out of the game log are appended here
+        self.game_log = GameLog(spill_path=log_path)
+        self.player_names = []
+        self.events = []  # Everything that happened, see events.py; the game log is written from these
         self.solution = None
         self.game_phase = "start_menu"  
         self.num_players = 3  
@@ -18,10 +73,14 @@ class GameState:
         self.has_rolled = False  # Track if current player has rolled dice
         
         # Card tracking
-        self.all_cards = []  # All cards in the game
-        self.solution_cards = []  # Cards in the solution envelope
+        self.all_cards = []  # All card IDs in the game
+        self.solution_cards = []  # Card IDs in the solution envelope
+        self.solution_mask = 0  # The same cards as a bitmask
         self.player_showing_card = None  # Index of player showing a card
-        self.card_being_shown = None  # Card currently being shown
+        self.card_shown_to = None  # Index of the player who made the suggestion it disproves
+        self.card_being_shown = None  # Card ID currently being shown
+        self.deduction = None  # What each player can work out, see deduction.py
+        self.agents = []  # Agent (see agents.py) for each seat, or None for a human
         
         # UI state
         self.showing_suggestion_ui = False
@@ -37,6 +96,11 @@ class GameState:
         self.current_suggestion = None  
     
     def initialize_game(self):
+        self.rng.seed(self.seed)
+        self.actions = []
+        if self.verbose:
+            print(f"Game seed: {self.seed}")
+        
         self.players = []
         for i in range(self.num_players):
             char_idx = self.selected_characters[i]
@@ -46,99 +110,87 @@ class GameState:
                 "color": character["color"],
                 "position": character["start_pos"],
                 "active": True,
-                "cards": []
+                "cards": [],  # Card IDs in the order they were dealt
+                "hand": 0  # The same cards as a bitmask
             })
         
-        self.all_cards = []
+        self.player_names = [player["name"] for player in self.players]
         
-        for character in CHARACTERS:
-            self.all_cards.append({
-                "type": CARD_TYPES["CHARACTER"],
-                "name": character["name"]
-            })
-        
-        for weapon in WEAPONS:
-            self.all_cards.append({
-                "type": CARD_TYPES["WEAPON"],
-                "name": weapon
-            })
-        
-        for room in ROOMS:
-            self.all_cards.append({
-                "type": CARD_TYPES["ROOM"],
-                "name": room["name"]
-            })
+        self.all_cards = list(range(NUM_CARDS))
         
         # Select the solution (murderer, weapon, room)
-        character_cards = [c for c in self.all_cards if c["type"] == CARD_TYPES["CHARACTER"]]
-        weapon_cards = [c for c in self.all_cards if c["type"] == CARD_TYPES["WEAPON"]]
-        room_cards = [c for c in self.all_cards if c["type"] == CARD_TYPES["ROOM"]]
-        
-        murderer_card = random.choice(character_cards)
-        weapon_card = random.choice(weapon_cards)
-        room_card = random.choice(room_cards)
-        
-        self.solution_cards = [murderer_card, weapon_card, room_card]
-        
-        self.solution = {
-            "murderer": murderer_card["name"],
-            "weapon": weapon_card["name"],
-            "room": room_card["name"]
-        }
+        murderer_card = FIRST_CHARACTER_CARD + self.rng.randrange(len(CHARACTERS))
+        weapon_card = FIRST_WEAPON_CARD + self.rng.randrange(len(WEAPONS))
+        room_card = FIRST_ROOM_CARD + self.rng.randrange(len(ROOMS))
         
-        print(f"Solution (for testing): {self.solution}")
+        solution_cards = [murderer_card, weapon_card, room_card]
+        remaining_cards = cards_in(ALL_CARDS_MASK & ~card_mask(solution_cards))
         
-        remaining_cards = [card for card in self.all_cards if card not in self.solution_cards]
+        self.rng.shuffle(remaining_cards)
         
-        random.shuffle(remaining_cards)
-        
-        # Deal exactly 3 cards to each player
-        for i, player in enumerate(self.players):
-            start_idx = i * CARDS_PER_PLAYER
-            end_idx = start_idx + CARDS_PER_PLAYER
-            
-            # Handle case where we might run out of cards
-            if end_idx <= len(remaining_cards):
-                player["cards"] = remaining_cards[start_idx:end_idx]
-            else:
-                # If we're at the end, give whatever cards are left
-                player["cards"] = remaining_cards[start_idx:]
-            
-            # Add a log entry for each player's cards 
-            card_names = [card["name"] for card in player["cards"]]
-            print(f"{player['name']} has cards: {', '.join(card_names)}")
+        # Deal exactly 3 cards to each player (the last players get fewer if we run out)
+        self.deal(solution_cards, [remaining_cards[i * CARDS_PER_PLAYER:(i + 1) * CARDS_PER_PLAYER]
+                                   for i in range(len(self.players))])
         
         # Initialize game state
         self.current_player_idx = 0
         self.moves_left = 0
         self.has_rolled = False
-        self.game_log = []
-        self.add_to_log(f"Game started with {self.num_players} players.")
-        self.add_to_log(f"Each player has been dealt {CARDS_PER_PLAYER} cards.")
-        self.add_to_log(f"It's {self.players[0]['name']}'s turn. Roll the dice.")
+        self.game_log.close()
+        self.game_log = GameLog(spill_path=self.log_path)
+        self.events = []
+        self.emit(GameStart(self.num_players))
         
         self.game_phase = "playing"
     
+    def deal(self, solution_cards, hands):
+        # Put the solution cards in the envelope and give each player the card IDs in
+        # their entry of hands; initialize_game deals at random, other engines pass their own deal
+        murderer_card, weapon_card, room_card = solution_cards
+        self.solution_cards = list(solution_cards)
+        self.solution_mask = card_mask(solution_cards)
+        self.solution = {
+            "murderer": card_name(murderer_card),
+            "weapon": card_name(weapon_card),
+            "room": card_name(room_card)
+        }
+        for player, cards in zip(self.players, hands):
+            player["cards"] = list(cards)
+            player["hand"] = card_mask(cards)
+        
+        # Everyone starts out knowing only their own hand
+        self.deduction = Deduction([player["hand"] for player in self.players])
+    
+    def record(self, *action):
+        # Remember an action that changed the game, for replays
+        if self.record_history:
+            self.actions.append(action)
+    
+    def emit(self, event):
+        # Record an event and add its lines to the game log
+        if not self.record_history:
+            return
+        self.events.append(event)
+        for line in describe(event, self.player_names):
+            # Only the last MAX_LOG_ENTRIES are kept, see game_log.py
+            self.game_log.append(line)
+    
     def add_to_log(self, message):
-        self.game_log.append(message)
-        if len(self.game_log) > MAX_LOG_ENTRIES:
-            # Keep the log size within limits but don't remove entries
-            # This allows scrolling through all entries
-            pass
+        self.emit(Note(message))
     
     def roll_dice(self):
         # Can only roll once per turn and if no moves left
         if self.has_rolled or self.moves_left > 0:
             return False
         
-        die1 = random.randint(1, 6)
-        die2 = random.randint(1, 6)
+        die1 = self.rng.randint(1, 6)
+        die2 = self.rng.randint(1, 6)
+        self.record("roll")
         self.dice_values = (die1, die2)
         self.moves_left = die1 + die2
         self.has_rolled = True
         
-        player_name = self.players[self.current_player_idx]["name"]
-        self.add_to_log(f"{player_name} rolled {die1 + die2} ({die1}, {die2}).")
+        self.emit(Roll(self.current_player_idx, die1, die2))
         
         return True
     
@@ -152,9 +204,36 @@ class GameState:
         
         return self.board.get_valid_moves(x, y)
     
+    def get_reachable_positions(self):
+        # Every position the current player could finish this turn's movement on
+        if self.moves_left <= 0:
+            return frozenset()
+        
+        player = self.players[self.current_player_idx]
+        return self.board.reachable_within(player["position"], self.moves_left)
+    
+    def move_to(self, target_x, target_y):
+        # Walk the current player along a shortest path towards the target,
+        # stopping once it is reached or the moves run out
+        player = self.players[self.current_player_idx]
+        target = (target_x, target_y)
+        if player["position"] == target:
+            return False, "Already there."
+        if self.board.distance(player["position"], target) is None:
+            return False, "Invalid move."
+        
+        message = None
+        while self.moves_left > 0 and player["position"] != target:
+            step = self.board.next_step_toward(player["position"], target)
+            success, message = self.move_player(*step)
+            if not success:
+                return False, message
+        
+        return True, message
+    
     def move_player(self, target_x, target_y):
         if self.moves_left <= 0:
-            return False,
+            return False, "No moves left."
         
         player = self.players[self.current_player_idx]
         x, y = player["position"]
@@ -163,35 +242,44 @@ class GameState:
         valid_moves = self.get_valid_moves()
         if (target_x, target_y) not in valid_moves:
             return False, "Invalid move."
+        self.record("move", target_x, target_y)
         
         # Update player position
         player["position"] = (target_x, target_y)
         self.moves_left -= 1
+        self.emit(Move(self.current_player_idx, target_x, target_y))
+        
+        # Leaving a room center onto one of its doors exits the room
+        exited_room = self.board.get_room_center_at(x, y)
+        if exited_room is not None:
+            room_name = ROOMS[exited_room]["name"]
+            self.emit(ExitRoom(self.current_player_idx, exited_room))
+            return True, f"Exited {room_name} through a door. Moves left: {self.moves_left}"
         
         # Check if player moved to a door
         is_door, room_idx = self.board.is_door(target_x, target_y)
         if is_door:
             room_name = ROOMS[room_idx]["name"]
-            self.add_to_log(f"{player['name']} is at a door to {room_name}.")
             
             # Automatically move to room center
             room_center = self.board.room_centers[room_idx]
             player["position"] = room_center
-            self.add_to_log(f"{player['name']} moved to the center of {room_name}.")
+            self.emit(EnterRoom(self.current_player_idx, room_idx, True))
             
             return True, f"In {room_name}. Press 'S' to make a suggestion or move to a door to exit."
         
         # Check if player moved to room center
-        for i, center in enumerate(self.board.room_centers):
-            if (target_x, target_y) == center:
-                room_name = ROOMS[i]["name"]
-                self.add_to_log(f"{player['name']} is in the center of {room_name}.")
-                return True, f"In {room_name}. Press 'S' to make a suggestion or move to a door to exit."
+        center_room = self.board.get_room_center_at(target_x, target_y)
+        if center_room is not None:
+            room_name = ROOMS[center_room]["name"]
+            self.emit(EnterRoom(self.current_player_idx, center_room, False))
+            return True, f"In {room_name}. Press 'S' to make a suggestion or move to a door to exit."
         
         return True, f"Moved to ({target_x}, {target_y}). Moves left: {self.moves_left}"
     
     def end_turn(self):
         # End the current player's turn and move to the next player
+        self.record("end_turn")
         self.moves_left = 0
         self.has_rolled = False
         
@@ -202,16 +290,57 @@ class GameState:
         
         if next_idx == self.current_player_idx and not self.players[next_idx]["active"]:
             self.game_phase = "game_over"
-            self.add_to_log("Game over! All players have been eliminated.")
+            self.emit(GameOver(None))
             return
         
         # Update current player
+        self.emit(TurnEnd(self.current_player_idx, next_idx))
         self.current_player_idx = next_idx
-        player_name = self.players[self.current_player_idx]["name"]
-        self.add_to_log(f"It's {player_name}'s turn. Roll the dice.")
     
-    def make_suggestion(self, character_name, weapon_name):
-        # Make a suggestion about the murder
+    def snapshot(self):
+        # Capture the rules state so it can be put back with restore()
+        return GameSnapshot(self)
+    
+    def restore(self, snapshot):
+        # Put the game back the way it was when the snapshot was taken. Player dicts
+        # are updated in place, so anything holding on to them stays valid
+        for player, position, active, cards in zip(self.players, snapshot.positions, snapshot.active, snapshot.cards):
+            player["position"] = position
+            player["active"] = active
+            player["cards"] = list(cards)
+            player["hand"] = card_mask(cards)
+        self.solution_cards = list(snapshot.solution_cards)
+        self.solution_mask = card_mask(snapshot.solution_cards)
+        murderer_card, weapon_card, room_card = snapshot.solution_cards
+        self.solution = {
+            "murderer": card_name(murderer_card),
+            "weapon": card_name(weapon_card),
+            "room": card_name(room_card)
+        }
+        
+        self.current_player_idx = snapshot.current_player_idx
+        self.dice_values = snapshot.dice_values
+        self.moves_left = snapshot.moves_left
+        self.has_rolled = snapshot.has_rolled
+        self.game_phase = snapshot.game_phase
+        self.player_showing_card = snapshot.player_showing_card
+        self.card_shown_to = snapshot.card_shown_to
+        self.card_being_shown = snapshot.card_being_shown
+        self.showing_card_ui = snapshot.showing_card_ui
+        self.showing_notification_ui = snapshot.showing_notification_ui
+        self.notification_message = snapshot.notification_message
+        self.current_suggestion = dict(snapshot.current_suggestion) if snapshot.current_suggestion else None
+        
+        del self.events[snapshot.num_events:]
+        del self.actions[snapshot.num_actions:]
+        self.game_log.restore(snapshot.log)
+        if snapshot.deduction is not None:
+            self.deduction.restore(snapshot.deduction)
+        self.rng.setstate(snapshot.rng_state)
+    
+    def make_suggestion(self, character_name, weapon_name, shown_card=None):
+        # Make a suggestion about the murder. shown_card replays a recorded choice
+        # of which card the disproving player showed
         player = self.players[self.current_player_idx]
         x, y = player["position"]
         
@@ -235,50 +364,56 @@ class GameState:
         }
         
         # Log the suggestion
-        suggestion_text = f"{player['name']} suggests: {character_name} in the {room_name} with the {weapon_name}."
-        self.add_to_log(suggestion_text)
-        
-        # Check if any player can disprove the suggestion
+        self.emit(Suggestion(self.current_player_idx, character_card(character_name), weapon_card(weapon_name), room_idx))
+        
+        # Check if any player can disprove the suggestion: one AND per hand
+        suggestion_mask = ((1 << character_card(character_name)) |
+                           (1 << weapon_card(weapon_name)) |
+                           (1 << room_card(room_idx)))
+        action = ["suggest", character_card(character_name), weapon_card(weapon_name)]
+        passers = []
         for i, other_player in enumerate(self.players):
             if i == self.current_player_idx or not other_player["active"]:
                 continue
             
-            # Check if player has any of the suggested cards
-            has_matching_cards = []
-            for card in other_player["cards"]:
-                if (card["type"] == CARD_TYPES["CHARACTER"] and card["name"] == character_name) or \
-                   (card["type"] == CARD_TYPES["WEAPON"] and card["name"] == weapon_name) or \
-                   (card["type"] == CARD_TYPES["ROOM"] and card["name"] == room_name):
-                    has_matching_cards.append(card)
-            
-            if has_matching_cards:
+            matches = other_player["hand"] & suggestion_mask
+            if not matches:
+                passers.append(i)
+            else:
                 # This player can disprove
                 self.player_showing_card = i
+                self.card_shown_to = self.current_player_idx
                 
                 # If only one card matches, show that one
-                if len(has_matching_cards) == 1:
-                    self.card_being_shown = has_matching_cards[0]
+                if matches & (matches - 1) == 0:
+                    self.card_being_shown = matches.bit_length() - 1
+                elif shown_card is not None and matches >> shown_card & 1:
+                    self.card_being_shown = shown_card
+                    action.append(shown_card)
+                elif i < len(self.agents) and self.agents[i] is not None:
+                    # Bots choose which card to show; the choice is recorded since
+                    # replays run without the bots
+                    self.card_being_shown = self.agents[i].choose_card_to_show(
+                        self, i, self.current_player_idx, cards_in(matches))
+                    action.append(self.card_being_shown)
                 else:
                     # If multiple cards match, randomly select one to show
-                    self.card_being_shown = random.choice(has_matching_cards)
+                    self.card_being_shown = self.rng.choice(cards_in(matches))
+                self.record(*action)
                 
-                self.showing_card_ui = True
-                self.add_to_log(f"{other_player['name']} can disprove the suggestion.")
-                
-                card_type_names = {
-                    CARD_TYPES["CHARACTER"]: "Character",
-                    CARD_TYPES["WEAPON"]: "Weapon",
-                    CARD_TYPES["ROOM"]: "Room"
-                }
+                self.deduction.record_suggestion(self.current_player_idx, suggestion_mask, passers,
+                                                 i, self.card_being_shown)
                 
-                card_type = card_type_names[self.card_being_shown["type"]]
-                self.add_to_log(f"{other_player['name']} shows {player['name']} a {card_type} card.")
+                self.showing_card_ui = True
+                self.emit(Disproof(i, self.current_player_idx, self.card_being_shown))
                 
                 # Create a card reveal message that only the suggesting player can see
-                return True, f"{other_player['name']} shows you the {self.card_being_shown['name']} card, disproving your suggestion."
+                return True, f"{other_player['name']} shows you the {card_name(self.card_being_shown)} card, disproving your suggestion."
         
         # No one could disprove - show a notification popup
-        self.add_to_log("No one could disprove the suggestion.")
+        self.record(*action)
+        self.deduction.record_suggestion(self.current_player_idx, suggestion_mask, passers)
+        self.emit(Disproof(None, self.current_player_idx, None))
         self.showing_notification_ui = True
         self.notification_message = "No one could disprove your suggestion. This card might be part of the solution!"
         return True, "No one could disprove your suggestion."
@@ -287,22 +422,22 @@ class GameState:
         """Make an accusation about the murder"""
         player = self.players[self.current_player_idx]
         room_name = ROOMS[room_idx]["name"]
+        self.record("accuse", character_card(character_name), weapon_card(weapon_name), room_idx)
         
-        # Log the accusation
         accusation_text = f"{player['name']} accuses: {character_name} in the {room_name} with the {weapon_name}."
-        self.add_to_log(accusation_text)
         
         # Check if accusation is correct
-        is_correct = (character_name == self.solution["murderer"] and 
-                      weapon_name == self.solution["weapon"] and 
-                      room_name == self.solution["room"])
+        accusation_mask = card_mask((character_card(character_name), weapon_card(weapon_name), room_card(room_idx)))
+        is_correct = accusation_mask == self.solution_mask
+        self.emit(Accusation(self.current_player_idx, character_card(character_name), weapon_card(weapon_name),
+                             room_idx, is_correct))
         
         if is_correct:
-            self.add_to_log(f"{player['name']} wins! The accusation was correct.")
+            self.emit(GameOver(self.current_player_idx))
             self.game_phase = "game_over"
             return True, accusation_text
         else:
-            self.add_to_log(f"{player['name']} made an incorrect accusation and is eliminated.")
+            self.emit(Elimination(self.current_player_idx))
             
             # Mark player as inactive
             player["active"] = False
@@ -310,7 +445,7 @@ class GameState:
             # Check if game is over (all players eliminated)
             active_players = [p for p in self.players if p["active"]]
             if not active_players:
-                self.add_to_log("Game over! All players have been eliminated.")
+                self.emit(GameOver(None))
                 self.game_phase = "game_over"
             
             return False, accusation_text
@@ -318,23 +453,15 @@ class GameState:
     def acknowledge_card(self):
         """Player acknowledges seeing the card shown to them"""
         if self.showing_card_ui and self.player_showing_card is not None and self.card_being_shown is not None:
-            showing_player = self.players[self.player_showing_card]["name"]
-            current_player = self.players[self.current_player_idx]["name"]
-            
-            # Get the card type for better messaging
-            card_type_names = {
-                CARD_TYPES["CHARACTER"]: "Character",
-                CARD_TYPES["WEAPON"]: "Weapon",
-                CARD_TYPES["ROOM"]: "Room"
-            }
-            card_type = card_type_names[self.card_being_shown["type"]]
-            
             # Log that the player has seen the card and can now eliminate it
-            self.add_to_log(f"{current_player} acknowledges seeing the {card_type} card {self.card_being_shown['name']} from {showing_player}.")
+            self.emit(CardSeen(self.current_player_idx, self.player_showing_card, self.card_being_shown))
+            
+            self.record("acknowledge_card")
             
             # Reset card showing state
             self.showing_card_ui = False
             self.player_showing_card = None
+            self.card_shown_to = None
             self.card_being_shown = None
             return True
         return False
@@ -342,6 +469,7 @@ class GameState:
     def acknowledge_notification(self):
         """Player acknowledges a notification popup"""
         if self.showing_notification_ui:
+            self.record("acknowledge_notification")
             self.showing_notification_ui = False
             self.notification_message = None
             return True
@@ -1,20 +1,68 @@
+import argparse
 import pygame
 import sys
 from game_constants import *
-from board import GameBoard
+from board_renderer import BoardRenderer
 from game_state import GameState
 from ui import UI
+from fonts import clear_caches
+from agents import AGENT_TYPES, make_agent, close_agents, play_turn
+from replay import save_replay
+from savegame import save_game, load_game
+from profiler import NULL_PROFILER, FrameProfiler
 
-def main():
+# Seat type for a player driven by the keyboard and mouse
+HUMAN = "human"
+
+def draw_game_layers(screen, game_state, board_renderer, ui, profiler=NULL_PROFILER):
+    # Draw the board and side panels; each layer skips itself if its inputs are
+    # unchanged. Returns the rects that were redrawn
+    valid_moves = game_state.get_valid_moves() if game_state.moves_left > 0 else ()
+    current_player = game_state.players[game_state.current_player_idx]
+    rects = [board_renderer.draw_board_layer(screen, game_state.players, game_state.current_player_idx,
+                                             valid_moves, profiler)]
+    with profiler.phase("ui.draw_player_panel"):
+        rects.append(ui.draw_player_panel(screen, game_state.players, game_state.current_player_idx))
+    with profiler.phase("ui.draw_player_cards"):
+        rects.append(ui.draw_player_cards(screen, current_player))
+    with profiler.phase("ui.draw_dice_panel"):
+        rects.append(ui.draw_dice_panel(screen, game_state.dice_values, game_state.moves_left))
+    with profiler.phase("ui.draw_controls"):
+        rects.append(ui.draw_controls(screen))
+    with profiler.phase("ui.draw_game_log"):
+        rects.append(ui.draw_game_log(screen, game_state.game_log))
+    return [rect for rect in rects if rect is not None]
+
+def current_agent(game_state):
+    # Agent playing the current seat, or None if it's a human's turn
+    idx = game_state.current_player_idx
+    return game_state.agents[idx] if idx < len(game_state.agents) else None
+
+def seat_agents(seats, num_players, mcts_workers):
+    # An agent for each seat a bot was asked for, None for the human seats
+    return [make_agent(seats[i], workers=mcts_workers) if i < len(seats) and seats[i] != HUMAN else None
+            for i in range(num_players)]
+
+def main(event_driven=True, seats=(), seed=None, record_path=None, log_path=None, profile=False,
+         trace_path=None, save_path=None, load_path=None, mcts_workers=1):
     # Initialize pygame
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Cluedo")
     
     # Initialize game components
-    game_state = GameState()
+    if load_path:
+        # Carry on with a saved game, skipping the menus
+        game_state = load_game(load_path, log_path=log_path)
+        game_state.agents = seat_agents(seats, game_state.num_players, mcts_workers)
+    else:
+        game_state = GameState(seed=seed, log_path=log_path)
+    board_renderer = BoardRenderer(game_state.board)
     ui = UI()
     
+    # Per-phase frame timings, shown with F3
+    profiler = FrameProfiler(enabled=profile, trace_path=trace_path)
+    
     # Main game loop
     clock = pygame.time.Clock()
     running = True
@@ -22,14 +70,45 @@ def main():
     mouse_down = False
     message = None
     
+    # What the screen currently shows; None forces a full redraw
+    frame_key = None
+    
+    # Whether the last frame changed anything; while it does the loop keeps running at FRAME_RATE
+    busy = True
+    
+    # Snapshots taken before each of the current player's moves, for undo
+    move_undo = []
+    
+    # When the current bot's turn became due; it plays once BOT_TURN_DELAY_MS has passed
+    bot_turn_due = None
+    
     while running:
+        events = pygame.event.get()
+        if event_driven and not events and not busy:
+            # Nothing changing and no input: sleep until an event arrives
+            event = pygame.event.wait(IDLE_WAIT_MS)
+            if event.type != pygame.NOEVENT:
+                events = [event] + pygame.event.get()
+        
+        profiler.begin_frame()
+        profiler.start("events")
+        
         mouse_pos = pygame.mouse.get_pos()
         mouse_click = False
         
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                # Show or hide the profiling overlay, repainting what it covered
+                profiler.toggle()
+                frame_key = None
+            
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                # Window contents were lost, repaint everything
+                frame_key = None
+            
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1: 
                     mouse_down = True
@@ -71,7 +150,8 @@ def main():
                     elif not (game_state.showing_suggestion_ui or 
                              game_state.showing_accusation_ui or 
                              game_state.showing_card_ui or
-                             game_state.showing_notification_ui):
+                             game_state.showing_notification_ui or
+                             current_agent(game_state) is not None):
                         # Roll dice
                         if event.key == pygame.K_d:
                             if game_state.roll_dice():
@@ -84,20 +164,15 @@ def main():
                             if game_state.moves_left <= 0:
                                 message = "No moves left. Roll dice (D) or end turn (Enter)."
                             else:
+                                before_move = game_state.snapshot()
                                 player = game_state.players[game_state.current_player_idx]
                                 x, y = player["position"]
                                 
                                 # Check if player is in a room center
-                                in_room_center = False
-                                room_idx = None
-                                for i, center in enumerate(game_state.board.room_centers):
-                                    if (x, y) == center:
-                                        in_room_center = True
-                                        room_idx = i
-                                        break
+                                room_idx = game_state.board.get_room_center_at(x, y)
                                 
                                 # If in a room center, we need to handle exiting through one of the doors
-                                if in_room_center and room_idx is not None:
+                                if room_idx is not None:
                                     # Get all doors for this room
                                     doors = game_state.board.room_doors[room_idx]
                                     
@@ -118,16 +193,7 @@ def main():
                                         
                                         # Move to the selected door
                                         door_x, door_y = doors[door_index]
-                                        
-                                        player["position"] = (door_x, door_y)
-                                        game_state.moves_left -= 1
-                                        
-                                        # Get room name for message
-                                        room_name = ROOMS[room_idx]["name"]
-                                        game_state.add_to_log(f"{player['name']} exited the {room_name} through a door.")
-                                        
-                                        # Set a message for the player
-                                        message = f"Exited {room_name} through a door. Moves left: {game_state.moves_left}"
+                                        success, message = game_state.move_player(door_x, door_y)
                                     else:
                                         message = "No doors available to exit."
                                 
@@ -147,6 +213,19 @@ def main():
                                         message = msg
                                     else:
                                         message = msg or "Invalid move."
+                                
+                                if len(game_state.actions) > before_move.num_actions:
+                                    move_undo.append(before_move)
+                        
+                        # Undo the last move, as long as nothing else has happened since
+                        elif event.key == pygame.K_u:
+                            if move_undo and all(action[0] == "move" for action in
+                                                 game_state.actions[move_undo[-1].num_actions:]):
+                                game_state.restore(move_undo.pop())
+                                message = "Move undone."
+                            else:
+                                move_undo.clear()
+                                message = "Nothing to undo."
                         
                         # Make suggestion
                         elif event.key == pygame.K_s:
@@ -182,10 +261,21 @@ def main():
                             game_state.end_turn()
                             message = f"Turn ended. It's {game_state.players[game_state.current_player_idx]['name']}'s turn."
         
-        # Handle UI based on game phase
+        profiler.stop("events")
+        
+        # Handle UI based on game phase. Each screen is only redrawn when its
+        # inputs change; frame_key identifies what the whole screen currently shows
+        full_redraw = False
+        dirty_rects = []
+        
         if game_state.game_phase == "start_menu":
-            # Draw start menu
-            player_buttons, start_btn = ui.draw_start_menu(screen, game_state.num_players)
+            key = ("start_menu", game_state.num_players)
+            if key != frame_key:
+                frame_key = key
+                # Draw start menu
+                with profiler.phase("ui.draw_start_menu"):
+                    player_buttons, start_btn = ui.draw_start_menu(screen, game_state.num_players)
+                full_redraw = True
             
             # Check player count buttons
             for i, btn in enumerate(player_buttons):
@@ -200,8 +290,13 @@ def main():
                 game_state.selected_characters = []
         
         elif game_state.game_phase == "player_setup":
-            # Draw character selection
-            char_buttons, start_btn = ui.draw_character_selection(screen, game_state.selected_characters)
+            key = ("player_setup", tuple(game_state.selected_characters))
+            if key != frame_key:
+                frame_key = key
+                # Draw character selection
+                with profiler.phase("ui.draw_character_selection"):
+                    char_buttons, start_btn = ui.draw_character_selection(screen, game_state.selected_characters)
+                full_redraw = True
             
             # Check character buttons
             for i, btn in enumerate(char_buttons):
@@ -216,51 +311,51 @@ def main():
             # Check start button
             start_btn.check_hover(mouse_pos)
             if mouse_click and start_btn.check_click(mouse_pos, mouse_click) and len(game_state.selected_characters) == game_state.num_players:
-                # Initialize the game
+                # Initialize the game, seating a bot wherever one was asked for
                 game_state.initialize_game()
+                game_state.agents = seat_agents(seats, game_state.num_players, mcts_workers)
         
         elif game_state.game_phase == "playing":
-            # Draw game board
-            screen.fill(LIGHT_GRAY)
-            game_state.board.render(screen)
-            
-            # Draw players 
-            for i, player in enumerate(game_state.players):
-                # Only draw active players
-                if player["active"]:
-                    is_current = (i == game_state.current_player_idx)
-                    game_state.board.render_player(screen, player, is_current)
-            
-            # Draw valid moves
-            if game_state.moves_left > 0:
-                valid_moves = game_state.get_valid_moves()
-                game_state.board.highlight_valid_moves(screen, valid_moves)
-            
-            # Draw player panel
-            ui.draw_player_panel(screen, game_state.players, game_state.current_player_idx)
-            
-            # Draw current player's cards
-            current_player = game_state.players[game_state.current_player_idx]
-            ui.draw_player_cards(screen, current_player)
-            
-            # Draw dice panel
-            ui.draw_dice_panel(screen, game_state.dice_values, game_state.moves_left)
-            
-            # Draw controls
-            ui.draw_controls(screen)
-            
-            # Draw game log
-            ui.draw_game_log(screen, game_state.game_log)
-            
-            # Add message to game log if there's a new message
+            # Log the message from this frame's input before drawing, so the log
+            # panel shows it now rather than after the next wait for input
             if message:
                 game_state.add_to_log(message)
                 message = None
             
+            # Anything that changes the open dialog means the whole screen is redrawn
+            key = ("playing",
+                   game_state.showing_card_ui, game_state.player_showing_card,
+                   game_state.showing_notification_ui, game_state.notification_message,
+                   game_state.showing_suggestion_ui,
+                   game_state.selected_suggestion_character, game_state.selected_suggestion_weapon,
+                   game_state.showing_accusation_ui, game_state.selected_accusation_character,
+                   game_state.selected_accusation_weapon, game_state.selected_accusation_room,
+                   ui.dialog_hover_state())
+            dialog_open = (game_state.showing_card_ui or game_state.showing_notification_ui or
+                           game_state.showing_suggestion_ui or game_state.showing_accusation_ui)
+            if key != frame_key:
+                frame_key = key
+                full_redraw = True
+                ui.invalidate()
+                board_renderer.invalidate()
+                screen.fill(LIGHT_GRAY)
+            
+            dirty_rects = draw_game_layers(screen, game_state, board_renderer, ui, profiler)
+            
+            # Panels changed under an open dialog: redraw everything so the
+            # translucent overlay is applied exactly once
+            if dirty_rects and dialog_open and not full_redraw:
+                full_redraw = True
+                ui.invalidate()
+                board_renderer.invalidate()
+                screen.fill(LIGHT_GRAY)
+                draw_game_layers(screen, game_state, board_renderer, ui, profiler)
             
             # When a card is being shown
             if game_state.showing_card_ui:
-                ok_btn = ui.draw_card_ui(screen, game_state.card_being_shown)
+                if full_redraw:
+                    with profiler.phase("ui.draw_card_ui"):
+                        ok_btn = ui.draw_card_ui(screen, game_state.card_being_shown)
                 
                 if ok_btn:
                     ok_btn.check_hover(mouse_pos)
@@ -269,7 +364,9 @@ def main():
                         
             # When there's a message to display
             elif game_state.showing_notification_ui:
-                ok_btn = ui.draw_notification_ui(screen, game_state.notification_message)
+                if full_redraw:
+                    with profiler.phase("ui.draw_notification_ui"):
+                        ok_btn = ui.draw_notification_ui(screen, game_state.notification_message)
                 
                 if ok_btn:
                     ok_btn.check_hover(mouse_pos)
@@ -278,11 +375,13 @@ def main():
             
             # Suggestion 
             elif game_state.showing_suggestion_ui:
-                char_buttons, weapon_buttons, submit_btn, cancel_btn = ui.draw_suggestion_ui(
-                    screen, 
-                    game_state.selected_suggestion_character,
-                    game_state.selected_suggestion_weapon
-                )
+                if full_redraw:
+                    with profiler.phase("ui.draw_suggestion_ui"):
+                        char_buttons, weapon_buttons, submit_btn, cancel_btn = ui.draw_suggestion_ui(
+                            screen, 
+                            game_state.selected_suggestion_character,
+                            game_state.selected_suggestion_weapon
+                        )
                 
                 # Check character buttons
                 for btn, char_name in char_buttons:
@@ -321,12 +420,14 @@ def main():
             
             # Accusation UI
             elif game_state.showing_accusation_ui:
-                char_buttons, weapon_buttons, room_buttons, submit_btn, cancel_btn = ui.draw_accusation_ui(
-                    screen,
-                    game_state.selected_accusation_character,
-                    game_state.selected_accusation_weapon,
-                    game_state.selected_accusation_room
-                )
+                if full_redraw:
+                    with profiler.phase("ui.draw_accusation_ui"):
+                        char_buttons, weapon_buttons, room_buttons, submit_btn, cancel_btn = ui.draw_accusation_ui(
+                            screen,
+                            game_state.selected_accusation_character,
+                            game_state.selected_accusation_weapon,
+                            game_state.selected_accusation_room
+                        )
                 
                 # Check character buttons
                 for btn, char_name in char_buttons:
@@ -371,39 +472,126 @@ def main():
                 if mouse_click and cancel_btn.check_click(mouse_pos, mouse_click):
                     game_state.showing_accusation_ui = False
                     message = "Accusation canceled."
+            
+            # No dialog showing, free the last one
+            else:
+                ui.close_dialog()
+                
+                # Let a bot play its turn after a short pause
+                agent = current_agent(game_state)
+                if agent is None:
+                    bot_turn_due = None
+                elif bot_turn_due is None:
+                    bot_turn_due = pygame.time.get_ticks() + BOT_TURN_DELAY_MS
+                elif pygame.time.get_ticks() >= bot_turn_due:
+                    bot_turn_due = None
+                    name = game_state.players[game_state.current_player_idx]["name"]
+                    with profiler.phase("bot_turn"):
+                        play_turn(game_state, agent)
+                    if game_state.game_phase == "playing":
+                        message = f"{name} finished their turn. It's {game_state.players[game_state.current_player_idx]['name']}'s turn."
         
         elif game_state.game_phase == "game_over":
-            # Draw game board (background)
-            screen.fill(LIGHT_GRAY)
-            game_state.board.render(screen)
-            
-            # Draw player panel
-            ui.draw_player_panel(screen, game_state.players, game_state.current_player_idx)
-            
-            # Draw game log
-            ui.draw_game_log(screen, game_state.game_log)
-            
-            # Get winner name if any
-            winner_name = None
-            if any(player["active"] for player in game_state.players):
-                winner_name = game_state.players[game_state.current_player_idx]["name"]
-            
-            menu_btn = ui.draw_game_over(screen, game_state.solution, winner_name)
+            key = ("game_over", ui.dialog_hover_state())
+            if key != frame_key:
+                frame_key = key
+                full_redraw = True
+                ui.invalidate()
+                
+                # Draw game board (background)
+                screen.fill(LIGHT_GRAY)
+                with profiler.phase("board.render"):
+                    board_renderer.render(screen)
+                
+                # Draw player panel
+                with profiler.phase("ui.draw_player_panel"):
+                    ui.draw_player_panel(screen, game_state.players, game_state.current_player_idx)
+                
+                # Draw game log
+                with profiler.phase("ui.draw_game_log"):
+                    ui.draw_game_log(screen, game_state.game_log)
+                
+                # Get winner name if any
+                winner_name = None
+                if any(player["active"] for player in game_state.players):
+                    winner_name = game_state.players[game_state.current_player_idx]["name"]
+                
+                with profiler.phase("ui.draw_game_over"):
+                    menu_btn = ui.draw_game_over(screen, game_state.solution, winner_name)
             
             # Check menu button
             menu_btn.check_hover(mouse_pos)
             if mouse_click and menu_btn.check_click(mouse_pos, mouse_click):
                 # Reset the game
-                game_state = GameState()
+                if record_path:
+                    save_replay(game_state, record_path)
+                game_state.game_log.close()
+                close_agents(game_state.agents)
+                game_state = GameState(seed=seed, log_path=log_path)
+                move_undo = []
+                board_renderer = BoardRenderer(game_state.board)
                 ui = UI()  
         
-        pygame.display.flip()
+        # The profiling overlay goes on top of whatever was drawn, and refreshes
+        # on its own every PROFILE_OVERLAY_MS
+        update_rects = list(dirty_rects)
+        if profiler.enabled and (full_redraw or dirty_rects or profiler.overlay_due()):
+            update_rects.append(profiler.draw_overlay(screen))
+        
+        # Push only what changed to the display
+        with profiler.phase("display"):
+            if full_redraw:
+                pygame.display.flip()
+            elif update_rects:
+                pygame.display.update(update_rects)
+        profiler.end_frame()
         
-        # Cap the frame rate
-        clock.tick(60)
+        # Cap the frame rate while the screen is changing; when idle the next
+        # iteration blocks on the event queue instead
+        busy = full_redraw or bool(dirty_rects) or message is not None
+        if busy or not event_driven:
+            clock.tick(FRAME_RATE)
+    
+    # Keep the game for replaying if it got past the menus
+    if record_path and game_state.players:
+        save_replay(game_state, record_path)
+    # Keep an unfinished game to carry on with --load
+    if save_path and game_state.game_phase == "playing":
+        save_game(game_state, save_path)
+    game_state.game_log.close()
+    close_agents(game_state.agents)
+    profiler.close()
     
+    clear_caches()
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Play Cluedo.")
+    parser.add_argument("--fixed-fps", action="store_true",
+                        help="poll and tick at a fixed frame rate instead of waiting for input")
+    parser.add_argument("--seats", default="",
+                        help="comma-separated seat types in player order, each one of: "
+                             f"{', '.join([HUMAN] + list(AGENT_TYPES))} (unlisted seats are human)")
+    parser.add_argument("--mcts-workers", type=int, default=1, help="processes each mcts bot searches with")
+    parser.add_argument("--seed", type=int, default=None, help="seed for dealing and dice (default: random)")
+    parser.add_argument("--record", metavar="PATH", default=None,
+                        help="save the game to PATH for replay.py when it ends or the window closes")
+    parser.add_argument("--save", metavar="PATH", default=None,
+                        help="save an unfinished game to PATH when the window closes (JSON if PATH ends in .json)")
+    parser.add_argument("--load", metavar="PATH", default=None,
+                        help="carry on with a game saved by --save instead of starting a new one")
+    parser.add_argument("--log-file", metavar="PATH", default=None,
+                        help="append game log entries to PATH as they scroll out of the in-game log")
+    parser.add_argument("--profile", action="store_true",
+                        help="start with the frame-time overlay shown (F3 toggles it)")
+    parser.add_argument("--profile-trace", metavar="PATH", default=None,
+                        help="write each profiled frame's phase times to PATH as CSV")
+    args = parser.parse_args()
+    seats = [seat.strip() for seat in args.seats.split(",") if seat.strip()]
+    for seat in seats:
+        if seat != HUMAN and seat not in AGENT_TYPES:
+            parser.error(f"unknown seat type '{seat}'")
+    main(event_driven=not args.fixed_fps, seats=seats, seed=args.seed, record_path=args.record,
+         log_path=args.log_file, profile=args.profile, trace_path=args.profile_trace, save_path=args.save,
+         load_path=args.load, mcts_workers=args.mcts_workers)
\ No newline at end of file
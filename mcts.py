@@ -0,0 +1,287 @@
+import math
+import multiprocessing
+import random
+import time
+from collections import Counter
+from game_constants import *
+from board import get_board
+from game_state import GameState
+from cards import *
+from deduction import Deduction, CATEGORY_MASKS
+from agents import Agent, DeductionAgent, play_turn
+
+# Rollouts per decision, unless the time budget runs out first
+MCTS_ITERATIONS = 5000
+
+# Thinking time per turn, in seconds, shared between the turn's decisions
+MCTS_TIME_BUDGET = 1.0
+
+# Exploration constant for UCB1
+EXPLORATION = 1.4
+
+# Most character/weapon pairs considered for one suggestion
+MAX_SUGGESTIONS = 12
+
+# The decisions searched, in the order a turn makes them
+TURN_DECISIONS = ("move", "suggestion", "accusation")
+
+# Worlds sampled to pick the likeliest accusation, and as many again to score it
+ACCUSATION_SAMPLES = 256
+
+def sample_world(knowledge, rng, attempts=50):
+    # Deal the cards this player can't see in a way consistent with everything it
+    # knows. Returns a mask per owner (players, envelope, undealt) and a weight, or
+    # None. Some deals come up more often than others; the weight is the number of
+    # ways each choice could have gone, so weighted counts treat every deal alike
+    sizes = knowledge.sizes
+    possible = knowledge.possible
+    known = knowledge.known
+    free_cards = ALL_CARDS_MASK
+    for mask in known:
+        free_cards &= ~mask
+    # Who could hold each card nobody is known to hold
+    holders = {card: [owner for owner in range(len(sizes)) if possible[owner] >> card & 1]
+               for card in cards_in(free_cards)}
+    for _ in range(attempts):
+        owned = list(known)
+        free = free_cards
+        weight = 1
+
+        # One card of each category in the envelope
+        envelope = knowledge.envelope
+        for category in CATEGORY_MASKS:
+            if not owned[envelope] & category:
+                choices = cards_in(possible[envelope] & category & free)
+                if not choices:
+                    break
+                card = rng.choice(choices)
+                weight *= len(choices)
+                owned[envelope] |= 1 << card
+                free &= ~(1 << card)
+        if owned[envelope].bit_count() != len(CATEGORY_MASKS):
+            continue
+
+        # The rest go to whoever could hold them, most constrained cards first
+        cards = cards_in(free)
+        rng.shuffle(cards)
+        cards.sort(key=lambda card: len(holders[card]))
+        for card in cards:
+            room = [owner for owner in holders[card] if owned[owner].bit_count() < sizes[owner]]
+            if not room:
+                break
+            weight *= len(room)
+            owned[rng.choice(room)] |= 1 << card
+        else:
+            if all(owned[owner] & mask for owner, mask in knowledge.clauses):
+                return owned, weight
+    return None
+
+class RolloutAgent(DeductionAgent):
+    # Plays rollouts like a DeductionAgent, except for the choices forced on it for
+    # the decision being searched; each forced choice is used once
+    def __init__(self, rng, forced=None):
+        super().__init__(rng)
+        self.forced = dict(forced or {})
+
+    def choose_move_target(self, state, player_idx):
+        if "move" in self.forced:
+            return self.forced.pop("move")
+        return super().choose_move_target(state, player_idx)
+
+    def choose_suggestion(self, state, player_idx, room_idx):
+        if "suggestion" in self.forced:
+            return self.forced.pop("suggestion")
+        return super().choose_suggestion(state, player_idx, room_idx)
+
+    def choose_accusation(self, state, player_idx):
+        if "accusation" in self.forced:
+            return self.forced.pop("accusation")
+        return super().choose_accusation(state, player_idx)
+
+def build_scratch_state(characters):
+    # A game to run rollouts in; everything about it is overwritten from snapshots
+    state = GameState(get_board(), verbose=False)
+    state.record_history = False
+    state.num_players = len(characters)
+    state.selected_characters = list(characters)
+    state.initialize_game()
+    return state
+
+def rollout(state, root, player_idx, decision, action, turn_start, rng):
+    # Play out one sampled world after taking action; returns 1 if this player
+    # wins it and 0 if it doesn't
+    state.restore(root)
+    state.rng.seed(rng.getrandbits(32))
+
+    sample = sample_world(state.deduction.players[player_idx], rng)
+    if sample is None:
+        return None
+    world, _ = sample
+    own_knowledge = state.deduction.players[player_idx].snapshot()
+    history = state.deduction.history
+    hands = world[:len(state.players)]
+    for player, hand in zip(state.players, hands):
+        player["hand"] = hand
+        player["cards"] = cards_in(hand)
+    state.solution_cards = cards_in(world[len(state.players)])
+    state.solution_mask = world[len(state.players)]
+
+    # Give the opponents what they would know in this world by replaying every
+    # suggestion so far, with a card the disprover could have shown; we keep what we know
+    deduction = Deduction(hands)
+    for suggester, mask, passers, disprover in history:
+        shown_card = rng.choice(cards_in(hands[disprover] & mask)) if disprover is not None else None
+        deduction.record_suggestion(suggester, mask, passers, disprover, shown_card)
+    deduction.players[player_idx].restore(own_knowledge)
+    state.deduction = deduction
+    state.agents = [RolloutAgent(rng) for _ in state.players]
+
+    # Finish the current turn with the action forced, skipping the decisions the turn
+    # has already made, then play the game out; a game still unsolved after MAX_TURNS
+    # more turns counts as a loss, as in simulate.py
+    forced = dict.fromkeys(TURN_DECISIONS[:TURN_DECISIONS.index(decision)])
+    forced[decision] = action
+    state.agents[player_idx].forced = forced
+    play_turn(state, state.agents[player_idx], turn_start)
+    for _ in range(MAX_TURNS):
+        if state.game_phase != "playing" or not state.players[player_idx]["active"]:
+            break
+        play_turn(state, state.agents[state.current_player_idx])
+
+    won = state.game_phase == "game_over" and state.players[player_idx]["active"] and \
+        state.current_player_idx == player_idx
+    return 1.0 if won else 0.0
+
+def run_search(task):
+    """Run UCB1 over the root actions for one decision; returns (wins, visits) per action"""
+    root, characters, player_idx, decision, actions, turn_start, iterations, seconds, seed = task
+    rng = random.Random(seed)
+    state = build_scratch_state(characters)
+    deadline = time.perf_counter() + seconds
+
+    wins = [0.0] * len(actions)
+    visits = [0] * len(actions)
+    total = 0
+    while total < iterations and time.perf_counter() < deadline:
+        # Try every action once, then the one with the best upper confidence bound
+        if total < len(actions):
+            choice = total
+        else:
+            log_total = math.log(total)
+            choice = max(range(len(actions)), key=lambda i: wins[i] / visits[i] +
+                         EXPLORATION * math.sqrt(log_total / visits[i]))
+        reward = rollout(state, root, player_idx, decision, actions[choice], turn_start, rng)
+        if reward is None:
+            # No deal fitting what this player knows turned up this time; give up
+            # only if none ever has
+            if not total:
+                break
+            continue
+        wins[choice] += reward
+        visits[choice] += 1
+        total += 1
+    return wins, visits
+
+class MCTSAgent(Agent):
+    # Picks the room to head for, what to suggest and whether to accuse by playing
+    # out sampled worlds (hidden hands dealt consistently with what it knows) and
+    # keeping the choice that wins most often. Rollouts run in a process pool when
+    # workers is more than 1
+    def __init__(self, rng=None, time_budget=MCTS_TIME_BUDGET, iterations=MCTS_ITERATIONS, workers=1):
+        super().__init__(rng, time_budget)
+        self.iterations = iterations
+        self.workers = workers
+        self.pool = None
+        self.turn_start = None
+        self.fallback = DeductionAgent(self.rng)
+
+    def rollouts(self, state, player_idx, decision, actions, seconds):
+        # Total (wins, visits) per action from searching a decision for up to seconds
+        root = state.snapshot()
+        workers = max(1, self.workers)
+        tasks = [(root, tuple(state.selected_characters), player_idx, decision, actions, self.turn_start,
+                  -(-self.iterations // workers), seconds, self.rng.getrandbits(32))
+                 for _ in range(workers)]
+        if workers == 1:
+            results = [run_search(tasks[0])]
+        else:
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(workers)
+            results = self.pool.map(run_search, tasks)
+        wins = [sum(result[0][i] for result in results) for i in range(len(actions))]
+        visits = [sum(result[1][i] for result in results) for i in range(len(actions))]
+        return wins, visits
+
+    def search(self, state, player_idx, decision, actions):
+        # The best of actions for a decision, by number of rollouts it earned
+        if len(actions) == 1:
+            return actions[0]
+        # Moving and suggesting each get half of what's left of the turn's budget
+        _, visits = self.rollouts(state, player_idx, decision, actions, max(0.0, self.time_left()) / 2)
+        if not any(visits):
+            return None
+        return actions[max(range(len(actions)), key=visits.__getitem__)]
+
+    def choose_move_target(self, state, player_idx):
+        self.turn_start = state.players[player_idx]["position"]
+
+        # Search between the worthwhile rooms in reach, otherwise head for the nearest
+        candidates, reachable = self.fallback.candidate_rooms(state, player_idx)
+        if len(reachable) < 2:
+            return self.fallback.choose_move_target(state, player_idx)
+        actions = [state.board.room_centers[room_idx] for room_idx in reachable]
+        target = self.search(state, player_idx, "move", actions)
+        return target if target is not None else self.fallback.choose_move_target(state, player_idx)
+
+    def choose_suggestion(self, state, player_idx, room_idx):
+        informative = self.informative_cards(state, player_idx)
+        unshowable = ALL_CARDS_MASK & ~self.opponent_cards(state, player_idx)
+        characters = cards_in(informative & CHARACTER_MASK) or cards_in(unshowable & CHARACTER_MASK) or cards_in(CHARACTER_MASK)
+        weapons = cards_in(informative & WEAPON_MASK) or cards_in(unshowable & WEAPON_MASK) or cards_in(WEAPON_MASK)
+        actions = [(character, weapon) for character in characters for weapon in weapons]
+        if len(actions) > MAX_SUGGESTIONS:
+            actions = self.rng.sample(actions, MAX_SUGGESTIONS)
+        suggestion = self.search(state, player_idx, "suggestion", actions)
+        return suggestion if suggestion is not None else self.fallback.choose_suggestion(state, player_idx, room_idx)
+
+    def choose_accusation(self, state, player_idx):
+        knowledge = state.deduction.players[player_idx]
+        if knowledge.is_solved():
+            return knowledge.solution()
+
+        # An accusation wins or loses on the spot, so its chance is just how often
+        # it's the envelope in sampled worlds; only not accusing needs playing out.
+        # The likeliest is scored on fresh worlds, as the ones that picked it flatter it
+        envelope = knowledge.envelope
+        ranking = Counter()
+        scoring = Counter()
+        for i in range(2 * ACCUSATION_SAMPLES):
+            sample = sample_world(knowledge, self.rng)
+            if sample is not None:
+                world, weight = sample
+                (scoring if i % 2 else ranking)[tuple(cards_in(world[envelope]))] += weight
+        if not ranking or not scoring:
+            return self.fallback.choose_accusation(state, player_idx)
+        accusation = ranking.most_common(1)[0][0]
+        chance = scoring[accusation] / sum(scoring.values())
+        # With nothing left to learn, waiting only gives the others time to win
+        if not self.can_learn_more(state, player_idx):
+            return accusation
+
+        # Accusing can't be taken back, so it has to beat waiting (smoothed, so a few
+        # lost rollouts don't count as no chance) by more than the rollouts' standard
+        # error; the accusation gets what's left of the turn
+        self.turn_start = state.players[player_idx]["position"]
+        wins, visits = self.rollouts(state, player_idx, "accusation", [None], max(0.0, self.time_left()))
+        if not visits[0]:
+            return self.fallback.choose_accusation(state, player_idx)
+        waiting = (wins[0] + 1) / (visits[0] + 2)
+        return accusation if chance > waiting + math.sqrt(waiting * (1 - waiting) / visits[0]) else None
+
+    def choose_card_to_show(self, state, player_idx, suggester_idx, cards):
+        return self.fallback.choose_card_to_show(state, player_idx, suggester_idx, cards)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
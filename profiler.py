@@ -0,0 +1,159 @@
+import csv
+import time
+from collections import deque
+from contextlib import nullcontext
+import pygame
+from game_constants import *
+from fonts import get_font
+
+# Every phase of a frame that can be timed, in the order the overlay and the trace list them
+PROFILE_PHASES = [
+    "frame",
+    "events",
+    "bot_turn",
+    "board.render",
+    "board.players",
+    "board.highlight",
+    "ui.draw_start_menu",
+    "ui.draw_character_selection",
+    "ui.draw_player_panel",
+    "ui.draw_player_cards",
+    "ui.draw_dice_panel",
+    "ui.draw_controls",
+    "ui.draw_game_log",
+    "ui.draw_card_ui",
+    "ui.draw_notification_ui",
+    "ui.draw_suggestion_ui",
+    "ui.draw_accusation_ui",
+    "ui.draw_game_over",
+    "display"
+]
+
+# Returned by phase() while profiling is off, so timing a phase costs next to nothing
+_untimed = nullcontext()
+
+class _PhaseTimer:
+    # Adds the time spent inside a with block to one phase of the current frame
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + time.perf_counter() - self.start
+
+class FrameProfiler:
+    # Times the phases of each frame of the main loop while enabled. Keeps the last
+    # window frames of each phase for the percentile overlay, and writes one CSV
+    # row per frame to trace_path if it's set
+    def __init__(self, enabled=False, window=PROFILE_WINDOW, trace_path=None):
+        self.enabled = enabled
+        self.samples = {phase: deque(maxlen=window) for phase in PROFILE_PHASES}
+        self.current = {}  # Phase -> seconds spent in it so far this frame
+        self.started = {}  # Phase -> when start() was called for it
+        self.frame_start = None
+        self.frames = 0
+        self.trace_path = trace_path
+        self.trace_file = None
+        self.trace_writer = None
+        self.overlay_rect = pygame.Rect(20, 20, 400, 40)
+        self.overlay_drawn_at = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frame_start = None
+        self.overlay_drawn_at = None
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self.started = {}
+            self.frame_start = time.perf_counter()
+
+    def start(self, name):
+        # Start timing a phase that doesn't fit in a with block; stop() ends it
+        if self.enabled:
+            self.started[name] = time.perf_counter()
+
+    def stop(self, name):
+        start = self.started.pop(name, None)
+        if self.enabled and start is not None:
+            self.current[name] = self.current.get(name, 0.0) + time.perf_counter() - start
+
+    def phase(self, name):
+        # Context manager timing one phase; a phase entered twice in a frame adds up
+        if not self.enabled:
+            return _untimed
+        return _PhaseTimer(self, name)
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        self.current["frame"] = time.perf_counter() - self.frame_start
+        self.frame_start = None
+        for name, seconds in self.current.items():
+            self.samples[name].append(seconds)
+        if self.trace_path is not None:
+            self.write_trace_row()
+        self.frames += 1
+
+    def write_trace_row(self):
+        # Times in milliseconds; phases that didn't run this frame are left empty
+        if self.trace_writer is None:
+            self.trace_file = open(self.trace_path, "w", newline="")
+            self.trace_writer = csv.writer(self.trace_file)
+            self.trace_writer.writerow(["frame"] + [f"{phase}_ms" for phase in PROFILE_PHASES])
+        self.trace_writer.writerow([self.frames] + [f"{self.current[phase] * 1000:.3f}" if phase in self.current else ""
+                                                    for phase in PROFILE_PHASES])
+
+    def percentiles(self, phase):
+        """(p50, p95, p99) of a phase over the window in milliseconds, or None if it hasn't run"""
+        samples = sorted(self.samples[phase])
+        if not samples:
+            return None
+        last = len(samples) - 1
+        return tuple(samples[round(last * fraction)] * 1000 for fraction in (0.5, 0.95, 0.99))
+
+    def overlay_due(self):
+        # Whether the overlay should refresh even though nothing under it was redrawn
+        return (self.overlay_drawn_at is None or
+                pygame.time.get_ticks() - self.overlay_drawn_at >= PROFILE_OVERLAY_MS)
+
+    def draw_overlay(self, screen):
+        # Draw the percentile table in the top left corner; returns the rect it covers
+        font = get_font(16)
+        rows = [("phase", "p50", "p95", "p99")]
+        for phase in PROFILE_PHASES:
+            stats = self.percentiles(phase)
+            if stats is not None:
+                rows.append((phase,) + tuple(f"{value:.2f}" for value in stats))
+
+        line_height = 16
+        self.overlay_rect.height = 10 + line_height * (len(rows) + 1)
+        pygame.draw.rect(screen, BLACK, self.overlay_rect)
+        x, y = self.overlay_rect.x + 6, self.overlay_rect.y + 5
+        caption = f"Frame times (ms), last {len(self.samples['frame'])} frames - F3 to hide"
+        screen.blit(font.render(caption, True, LIGHT_YELLOW), (x, y))
+        for i, row in enumerate(rows, 1):
+            color = LIGHT_YELLOW if i == 1 else WHITE
+            row_y = y + i * line_height
+            screen.blit(font.render(row[0], True, color), (x, row_y))
+            for j, value in enumerate(row[1:]):
+                text = font.render(value, True, color)
+                screen.blit(text, (x + 220 + (j + 1) * 55 - text.get_width(), row_y))
+        self.overlay_drawn_at = pygame.time.get_ticks()
+        return self.overlay_rect
+
+    def close(self):
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+            self.trace_writer = None
+
+# Stands in wherever no profiler is passed; it is never enabled
+NULL_PROFILER = FrameProfiler()
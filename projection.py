@@ -0,0 +1,163 @@
+from events import Disproof, CardSeen, event_to_dict, event_from_dict
+
+# Versions a client may leave unacknowledged before the oldest can no longer be
+# acknowledged or resynced from
+MAX_UNACKED_VERSIONS = 64
+
+# Views are plain dicts of JSON-friendly values, so they can be sent as they are.
+# "players" is the only nested key: a list of per-player dicts, diffed by index
+
+def player_view(state, seat):
+    """What the player in a seat can see of a game"""
+    # Everything public plus their own hand, the card shown to or by them and the
+    # solution once the game is over. seat None is a spectator, who sees no cards.
+    # A shown card goes by who suggested, not whose turn it is now
+    current = state.current_player_idx
+    shown_card = None
+    if (state.showing_card_ui and seat is not None and
+            seat in (state.card_shown_to, state.player_showing_card)):
+        shown_card = state.card_being_shown
+    return {
+        "phase": state.game_phase,
+        "seat": seat,
+        "current_player": current,
+        "dice": list(state.dice_values),
+        "moves_left": state.moves_left,
+        "has_rolled": state.has_rolled,
+        "players": [{"name": player["name"], "position": list(player["position"]), "active": player["active"]}
+                    for player in state.players],
+        "hand": list(state.players[seat]["cards"]) if seat is not None else [],
+        "showing_player": state.player_showing_card if state.showing_card_ui else None,
+        "shown_card": shown_card,
+        "notification": state.notification_message if seat == current else None,
+        "solution": list(state.solution_cards) if state.game_phase == "game_over" else None
+    }
+
+def visible_event(event, seat):
+    # An event as the player in a seat may see it; a shown card is hidden from
+    # everyone but the two players it passed between
+    if type(event) is Disproof and event.card is not None and seat not in (event.player, event.suggester):
+        return event._replace(card=None)
+    if type(event) is CardSeen and seat not in (event.player, event.shown_by):
+        return event._replace(card=None)
+    return event
+
+# Stands in for a field an old view doesn't have, so any value counts as a change
+_MISSING = object()
+
+def diff_view(old, new):
+    """The keys of new that differ from old, with players diffed entry by entry"""
+    changes = {}
+    for key, value in new.items():
+        if key == "players":
+            old_players = old.get("players", [])
+            players = {}
+            for i, player in enumerate(value):
+                old_player = old_players[i] if i < len(old_players) else {}
+                changed = {field: field_value for field, field_value in player.items()
+                           if old_player.get(field, _MISSING) != field_value}
+                if changed:
+                    players[str(i)] = changed  # JSON object keys are strings
+            if players:
+                changes["players"] = players
+        elif key not in old or old[key] != value:
+            changes[key] = value
+    return changes
+
+def apply_view_changes(view, changes):
+    """A new view with changes from diff_view applied; view itself is left alone"""
+    updated = dict(view)
+    for key, value in changes.items():
+        if key == "players":
+            players = [dict(player) for player in view.get("players", [])]
+            for index, fields in value.items():
+                i = int(index)
+                while len(players) <= i:
+                    players.append({})
+                players[i].update(fields)
+            updated["players"] = players
+        else:
+            updated[key] = value
+    return updated
+
+class ViewTracker:
+    # Turns one seat's view of a game into deltas for its client. Each update gets
+    # the next version number and holds the changes and events since the version
+    # sent before it, so its size doesn't grow with the game however far behind
+    # the client's acknowledgements are. A client that loses track asks for a
+    # resync, built on a version it still has or from nothing
+    def __init__(self, seat):
+        self.seat = seat
+        self.version = 0
+        self.acked_version = 0
+        self.sent = {0: ({}, 0)}  # Version -> (view, number of events), from the acknowledged one on
+
+    def update(self, state):
+        """The delta taking the client from the last version sent to now, or None if nothing changed"""
+        view = player_view(state, self.seat)
+        num_events = len(state.events)
+        last_view, last_events = self.sent[self.version]
+        if view == last_view and num_events == last_events:
+            return None
+        return self._delta(self.version, view, state, num_events)
+
+    def resync(self, state, version):
+        """The delta taking the client from version to now; from nothing if version isn't held any more"""
+        if type(version) is not int or version not in self.sent:
+            version = 0
+        return self._delta(version, player_view(state, self.seat), state, len(state.events))
+
+    def _delta(self, base, view, state, num_events):
+        # Version 0, the empty view, is always there to build on
+        base_view, base_events = self.sent.get(base, ({}, 0))
+        self.version += 1
+        self.sent[self.version] = (view, num_events)
+        if len(self.sent) > MAX_UNACKED_VERSIONS:
+            del self.sent[min(version for version in self.sent if version != self.acked_version)]
+        return {
+            "version": self.version,
+            "base": base,
+            "changes": diff_view(base_view, view),
+            "events": [event_to_dict(visible_event(event, self.seat))
+                       for event in state.events[base_events:num_events]]
+        }
+
+    def acknowledge(self, version):
+        # The client has applied this version and will keep it until it
+        # acknowledges a later one. Returns False for a version that was never
+        # sent or is already superseded
+        if type(version) is not int or version not in self.sent:
+            return False
+        self.acked_version = version
+        self.sent = {sent: entry for sent, entry in self.sent.items() if sent >= version}
+        return True
+
+class ViewMirror:
+    # The client side of a ViewTracker: rebuilds the view and the event list from
+    # deltas. It keeps every version received since the last one it acknowledged,
+    # and the empty version 0, as a resync may be built on any of them
+    def __init__(self):
+        self.versions = {0: ({}, 0)}  # Version -> (view, number of events)
+        self.version = 0
+        self.events = []
+
+    @property
+    def view(self):
+        return self.versions[self.version][0]
+
+    def apply(self, delta):
+        """Apply a delta from ViewTracker.update or resync; returns the events it added"""
+        base_view, base_events = self.versions[delta["base"]]
+        events = [event_from_dict(record) for record in delta["events"]]
+        known = len(self.events) - base_events
+        del self.events[base_events:]
+        self.events.extend(events)
+
+        self.version = delta["version"]
+        self.versions[self.version] = (apply_view_changes(base_view, delta["changes"]), len(self.events))
+        return events[known:]
+
+    def acknowledge(self, version):
+        # Call when sending {"type": "ack", "version": version}; older versions are
+        # no longer needed
+        self.versions = {kept: entry for kept, entry in self.versions.items() if kept >= version or kept == 0}
@@ -0,0 +1,95 @@
+import argparse
+import json
+import time
+from game_constants import *
+from game_state import GameState
+from cards import *
+from events import write_binary, write_jsonl
+
+# Bumped whenever the meaning of a recorded action changes
+REPLAY_VERSION = 1
+
+def make_record(state):
+    # Everything needed to replay a game: its seed, who played and what they did
+    return {
+        "version": REPLAY_VERSION,
+        "seed": state.seed,
+        "characters": list(state.selected_characters),
+        "actions": [list(action) for action in state.actions]
+    }
+
+def save_replay(state, path):
+    with open(path, "w") as f:
+        json.dump(make_record(state), f, separators=(",", ":"))
+
+def load_replay(path):
+    with open(path) as f:
+        record = json.load(f)
+    if record.get("version") != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version {record.get('version')}, expected {REPLAY_VERSION}")
+    return record
+
+def apply_action(state, action):
+    # Perform one recorded action; returns False if the game rejected it
+    name, args = action[0], action[1:]
+    if name == "roll":
+        return state.roll_dice()
+    if name == "move":
+        return state.move_player(*args)[0]
+    if name == "suggest":
+        shown_card = args[2] if len(args) > 2 else None
+        return state.make_suggestion(card_name(args[0]), card_name(args[1]), shown_card)[0]
+    if name == "accuse":
+        # A wrong accusation is still a valid action
+        state.make_accusation(card_name(args[0]), card_name(args[1]), args[2])
+        return True
+    if name == "end_turn":
+        state.end_turn()
+        return True
+    if name == "acknowledge_card":
+        return state.acknowledge_card()
+    if name == "acknowledge_notification":
+        return state.acknowledge_notification()
+    raise ValueError(f"Unknown action '{name}'")
+
+def replay(record, board=None):
+    """Rerun a recorded game headless and return its final GameState"""
+    state = GameState(board, verbose=False, seed=record["seed"])
+    state.num_players = len(record["characters"])
+    state.selected_characters = list(record["characters"])
+    state.initialize_game()
+
+    for step, action in enumerate(record["actions"]):
+        if not apply_action(state, action):
+            raise ValueError(f"Replay diverged at action {step}: {action}")
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Cluedo game headless.")
+    parser.add_argument("path", help="replay file written by main.py --record")
+    parser.add_argument("--log", action="store_true", help="print the replayed game log")
+    parser.add_argument("--events", metavar="PATH", default=None,
+                        help="write the game's events to PATH, as JSON lines if it ends in .jsonl, else packed binary")
+    args = parser.parse_args()
+
+    record = load_replay(args.path)
+    start_time = time.perf_counter()
+    state = replay(record)
+    elapsed = time.perf_counter() - start_time
+
+    if args.log:
+        for entry in state.game_log:
+            print(entry)
+    if args.events:
+        if args.events.endswith(".jsonl"):
+            with open(args.events, "w") as f:
+                write_jsonl(state.events, f)
+        else:
+            with open(args.events, "wb") as f:
+                write_binary(state.events, f)
+    print(f"Seed {state.seed}, {len(record['actions'])} actions replayed in {elapsed * 1000:.1f} ms")
+    print(f"Phase: {state.game_phase}")
+    print(f"Solution: {state.solution['murderer']} in the {state.solution['room']} with the {state.solution['weapon']}")
+
+if __name__ == "__main__":
+    main()
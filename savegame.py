@@ -0,0 +1,420 @@
+import argparse
+import json
+import math
+import struct
+import time
+from game_constants import *
+from board import get_board
+from game_state import GameState
+from cards import *
+from deduction import Deduction
+from events import NO_VALUE, encode_text, pack_events, unpack_events, event_to_dict, event_from_dict
+
+# Saves hold everything GameState.snapshot() does, so a loaded game carries on
+# exactly where it was saved: positions, hands, the solution, whose turn it is,
+# the dice and any open card or notification, the log, every player's deduction
+# state, and optionally the game's actions, events and random number stream.
+# Nothing here touches pygame.
+#
+# The binary format is little-endian throughout. Cards are card IDs, players are
+# seat indices and NO_VALUE stands for None:
+#   header       magic, version, section flags
+#   core         seed, player count, turn, dice, moves left, phase, state bits,
+#                solution, showing player, shown card, current suggestion
+#   players      character, x, y, active, card count, then that many card IDs
+#   notification text, if the state bits say there is one
+#   log          total entries ever added, entries held, then each entry
+#   deduction    per player: possible and known masks for every owner, clauses;
+#                then the suggestion history
+#   events       byte length, then pack_events() output     (SECTION_EVENTS)
+#   actions      count, then one ACTION record each         (SECTION_ACTIONS)
+#   rng          Mersenne Twister state                     (SECTION_RNG)
+# The JSON format holds the same things with names, for reading and debugging
+
+# Bumped whenever the binary or JSON layout changes
+SAVE_VERSION = 1
+
+# First bytes of every binary save
+SAVE_MAGIC = b"CLUE"
+
+# Optional sections, as bits of the header's flags
+SECTION_EVENTS = 1
+SECTION_ACTIONS = 2
+SECTION_RNG = 4
+ALL_SECTIONS = SECTION_EVENTS | SECTION_ACTIONS | SECTION_RNG
+
+# Phases a dealt game can be in, by their code in the core record
+SAVED_PHASES = ("playing", "game_over")
+
+# Bits of the core record's state byte
+HAS_ROLLED = 1
+SHOWING_CARD_UI = 2
+SHOWING_NOTIFICATION_UI = 4
+HAS_NOTIFICATION = 8
+HAS_SUGGESTION = 16
+
+# Action names as GameState.record() writes them, by their code in an ACTION record
+ACTION_NAMES = ("roll", "move", "suggest", "accuse", "end_turn", "acknowledge_card", "acknowledge_notification")
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+
+# The current suggestion names its room; saves hold the room's index
+ROOM_INDEX = {room["name"]: i for i, room in enumerate(ROOMS)}
+
+HEADER = struct.Struct("<4sBB")
+CORE = struct.Struct("<I15B")
+PLAYER = struct.Struct("<5B")
+LENGTH = struct.Struct("<H")  # Strings and short lists
+COUNT = struct.Struct("<I")  # Log totals and long sections
+CLAUSE = struct.Struct("<BI")  # Owner, mask
+SUGGESTION = struct.Struct("<BIBB")  # Suggester, mask, passers as a bitmask of seats, disprover
+ACTION = struct.Struct("<4B")  # Code, then up to three arguments
+RNG_STATE = struct.Struct("<625Id")  # The generator's words and position, then gauss_next (NaN for None)
+
+# Possible and known masks for every owner, by number of players
+_masks = {}
+
+def _mask_struct(num_players):
+    if num_players not in _masks:
+        _masks[num_players] = struct.Struct(f"<{2 * (num_players + 2)}I")
+    return _masks[num_players]
+
+# Action tuples by ACTION record; games repeat the same few hundred actions, and
+# tuples can be shared since they're never changed
+_decoded_actions = {}
+
+def _decode_action(record):
+    action = (ACTION_NAMES[record[0]],) + tuple(arg for arg in record[1:] if arg != NO_VALUE)
+    _decoded_actions[record] = action
+    return action
+
+def pack_actions(actions):
+    # One ACTION record per action, as the actions section holds them
+    parts = []
+    for action in actions:
+        args = list(action[1:]) + [NO_VALUE] * (ACTION.size - len(action))
+        parts.append(ACTION.pack(ACTION_CODES[action[0]], *args))
+    return b"".join(parts)
+
+def unpack_actions(data):
+    return [_decoded_actions.get(record) or _decode_action(record) for record in ACTION.iter_unpack(data)]
+
+def _pack_string(text):
+    data = encode_text(text)
+    return LENGTH.pack(len(data)) + data
+
+def _unpack_string(data, offset):
+    # (text, offset after it)
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    return str(data[offset:offset + length], "utf-8"), offset + length
+
+def _check_saveable(state):
+    if state.deduction is None or state.game_phase not in SAVED_PHASES:
+        raise ValueError("Only a game that has been dealt can be saved")
+
+def pack_state(state, sections=ALL_SECTIONS):
+    """A game as bytes in the binary save format"""
+    _check_saveable(state)
+    bits = HAS_ROLLED if state.has_rolled else 0
+    if state.showing_card_ui:
+        bits |= SHOWING_CARD_UI
+    if state.showing_notification_ui:
+        bits |= SHOWING_NOTIFICATION_UI
+    if state.notification_message is not None:
+        bits |= HAS_NOTIFICATION
+    suggestion = (NO_VALUE, NO_VALUE, NO_VALUE)
+    if state.current_suggestion:
+        bits |= HAS_SUGGESTION
+        suggestion = (character_card(state.current_suggestion["character"]),
+                      weapon_card(state.current_suggestion["weapon"]),
+                      ROOM_INDEX[state.current_suggestion["room"]])
+    die1, die2 = state.dice_values
+    parts = [
+        HEADER.pack(SAVE_MAGIC, SAVE_VERSION, sections),
+        CORE.pack(state.seed, len(state.players), state.current_player_idx, die1, die2, state.moves_left,
+                  SAVED_PHASES.index(state.game_phase), bits, *state.solution_cards,
+                  NO_VALUE if state.player_showing_card is None else state.player_showing_card,
+                  NO_VALUE if state.card_being_shown is None else state.card_being_shown,
+                  *suggestion)
+    ]
+    for character, player in zip(state.selected_characters, state.players):
+        x, y = player["position"]
+        parts.append(PLAYER.pack(character, x, y, player["active"], len(player["cards"])))
+        parts.append(bytes(player["cards"]))
+    if state.notification_message is not None:
+        parts.append(_pack_string(state.notification_message))
+
+    log = state.game_log
+    parts.append(COUNT.pack(log.total) + LENGTH.pack(len(log)))
+    parts.extend(_pack_string(entry) for entry in log)
+
+    players, history = state.deduction.snapshot()
+    mask_struct = _mask_struct(len(state.players))
+    for possible, known, clauses in players:
+        parts.append(mask_struct.pack(*possible, *known))
+        parts.append(LENGTH.pack(len(clauses)))
+        parts.extend(CLAUSE.pack(owner, mask) for owner, mask in clauses)
+    parts.append(LENGTH.pack(len(history)))
+    for suggester, mask, passers, disprover in history:
+        parts.append(SUGGESTION.pack(suggester, mask, card_mask(passers),
+                                     NO_VALUE if disprover is None else disprover))
+
+    if sections & SECTION_EVENTS:
+        events = pack_events(state.events)
+        parts.append(COUNT.pack(len(events)))
+        parts.append(events)
+    if sections & SECTION_ACTIONS:
+        parts.append(COUNT.pack(len(state.actions)))
+        parts.append(pack_actions(state.actions))
+    if sections & SECTION_RNG:
+        version, words, gauss_next = state.rng.getstate()
+        parts.append(RNG_STATE.pack(*words, math.nan if gauss_next is None else gauss_next))
+    return b"".join(parts)
+
+def _new_state(board, seed, characters, log_path):
+    # A GameState with its players seated but nothing dealt, for the loaders to fill in
+    state = GameState(board if board is not None else get_board(), verbose=False, seed=seed, log_path=log_path)
+    state.num_players = len(characters)
+    state.selected_characters = list(characters)
+    state.players = [{"name": CHARACTERS[character]["name"], "color": CHARACTERS[character]["color"]}
+                     for character in characters]
+    state.player_names = [player["name"] for player in state.players]
+    state.all_cards = list(range(NUM_CARDS))
+    return state
+
+def _set_solution(state, solution_cards):
+    state.solution_cards = list(solution_cards)
+    state.solution_mask = card_mask(solution_cards)
+    murderer_card, weapon_card, room_card = solution_cards
+    state.solution = {
+        "murderer": card_name(murderer_card),
+        "weapon": card_name(weapon_card),
+        "room": card_name(room_card)
+    }
+
+def _set_log(state, total, entries):
+    # Put the held entries back in the ring slots they were in when saved
+    log = state.game_log
+    first = total - len(entries)
+    for sequence, entry in enumerate(entries, first):
+        log.entries[sequence % log.capacity] = entry
+    log.total = total
+
+def _set_deduction(state, players, history):
+    state.deduction = Deduction([player["hand"] for player in state.players])
+    state.deduction.restore((players, history))
+    # A card on display was shown to whoever made the last suggestion
+    if state.player_showing_card is not None:
+        state.card_shown_to = history[-1][0]
+
+def unpack_state(data, board=None, log_path=None):
+    """The GameState saved in bytes from pack_state()"""
+    magic, version, sections = HEADER.unpack_from(data, 0)
+    if magic != SAVE_MAGIC:
+        raise ValueError("Not a Cluedo save")
+    if version != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version {version}, expected {SAVE_VERSION}")
+    (seed, num_players, current, die1, die2, moves_left, phase, bits, *solution,
+     showing_player, shown_card, character, weapon, room) = CORE.unpack_from(data, HEADER.size)
+    offset = HEADER.size + CORE.size
+
+    # Seats first, since the GameState is built from the characters in them
+    seats = []
+    for _ in range(num_players):
+        seat = PLAYER.unpack_from(data, offset)
+        offset += PLAYER.size
+        seats.append((seat, list(data[offset:offset + seat[4]])))
+        offset += seat[4]
+    state = _new_state(board, seed, [seat[0] for seat, cards in seats], log_path)
+    for player, ((_, x, y, active, _), cards) in zip(state.players, seats):
+        player["position"] = (x, y)
+        player["active"] = bool(active)
+        player["cards"] = cards
+        player["hand"] = card_mask(cards)
+    _set_solution(state, solution)
+
+    state.current_player_idx = current
+    state.dice_values = (die1, die2)
+    state.moves_left = moves_left
+    state.game_phase = SAVED_PHASES[phase]
+    state.has_rolled = bool(bits & HAS_ROLLED)
+    state.showing_card_ui = bool(bits & SHOWING_CARD_UI)
+    state.showing_notification_ui = bool(bits & SHOWING_NOTIFICATION_UI)
+    state.player_showing_card = None if showing_player == NO_VALUE else showing_player
+    state.card_being_shown = None if shown_card == NO_VALUE else shown_card
+    if bits & HAS_SUGGESTION:
+        state.current_suggestion = {"character": card_name(character), "weapon": card_name(weapon),
+                                    "room": ROOMS[room]["name"]}
+    if bits & HAS_NOTIFICATION:
+        state.notification_message, offset = _unpack_string(data, offset)
+
+    total, held = struct.unpack_from("<IH", data, offset)
+    offset += COUNT.size + LENGTH.size
+    entries = []
+    for _ in range(held):
+        entry, offset = _unpack_string(data, offset)
+        entries.append(entry)
+    _set_log(state, total, entries)
+
+    mask_struct = _mask_struct(num_players)
+    owners = num_players + 2
+    players = []
+    for _ in range(num_players):
+        masks = mask_struct.unpack_from(data, offset)
+        offset += mask_struct.size
+        (num_clauses,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        end = offset + num_clauses * CLAUSE.size
+        players.append((masks[:owners], masks[owners:], tuple(CLAUSE.iter_unpack(data[offset:end]))))
+        offset = end
+    (num_suggestions,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    end = offset + num_suggestions * SUGGESTION.size
+    history = tuple((suggester, mask, tuple(cards_in(passers)), None if disprover == NO_VALUE else disprover)
+                    for suggester, mask, passers, disprover in SUGGESTION.iter_unpack(data[offset:end]))
+    offset = end
+    _set_deduction(state, players, history)
+
+    if sections & SECTION_EVENTS:
+        (length,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        state.events = list(unpack_events(data[offset:offset + length]))
+        offset += length
+    if sections & SECTION_ACTIONS:
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        end = offset + count * ACTION.size
+        state.actions = unpack_actions(data[offset:end])
+        offset = end
+    if sections & SECTION_RNG:
+        *words, gauss_next = RNG_STATE.unpack_from(data, offset)
+        state.rng.setstate((3, tuple(words), None if math.isnan(gauss_next) else gauss_next))
+    return state
+
+def state_to_dict(state, sections=ALL_SECTIONS):
+    """A game as a JSON-friendly dict, holding the same things as the binary format"""
+    _check_saveable(state)
+    players, history = state.deduction.snapshot()
+    record = {
+        "version": SAVE_VERSION,
+        "seed": state.seed,
+        "players": [{"character": character, "name": player["name"], "position": list(player["position"]),
+                     "active": player["active"], "cards": [card_name(card) for card in player["cards"]]}
+                    for character, player in zip(state.selected_characters, state.players)],
+        "solution": [card_name(card) for card in state.solution_cards],
+        "current_player": state.current_player_idx,
+        "dice": list(state.dice_values),
+        "moves_left": state.moves_left,
+        "has_rolled": state.has_rolled,
+        "phase": state.game_phase,
+        "player_showing_card": state.player_showing_card,
+        "card_being_shown": None if state.card_being_shown is None else card_name(state.card_being_shown),
+        "showing_card_ui": state.showing_card_ui,
+        "showing_notification_ui": state.showing_notification_ui,
+        "notification_message": state.notification_message,
+        "current_suggestion": state.current_suggestion,
+        "log": {"total": state.game_log.total, "entries": list(state.game_log)},
+        # Masks as lists of card names, one list per owner: players, envelope, undealt
+        "deduction": {
+            "players": [{"possible": [[card_name(card) for card in cards_in(mask)] for mask in possible],
+                         "known": [[card_name(card) for card in cards_in(mask)] for mask in known],
+                         "clauses": [[owner, [card_name(card) for card in cards_in(mask)]]
+                                     for owner, mask in clauses]}
+                        for possible, known, clauses in players],
+            "history": [{"suggester": suggester, "cards": [card_name(card) for card in cards_in(mask)],
+                         "passers": list(passers), "disprover": disprover}
+                        for suggester, mask, passers, disprover in history]
+        }
+    }
+    if sections & SECTION_EVENTS:
+        record["events"] = [event_to_dict(event) for event in state.events]
+    if sections & SECTION_ACTIONS:
+        record["actions"] = [list(action) for action in state.actions]
+    if sections & SECTION_RNG:
+        version, words, gauss_next = state.rng.getstate()
+        record["rng"] = {"state": list(words), "gauss_next": gauss_next}
+    return record
+
+def state_from_dict(record, board=None, log_path=None):
+    """The GameState saved in a dict from state_to_dict()"""
+    if record.get("version") != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version {record.get('version')}, expected {SAVE_VERSION}")
+    card_ids = {name: card for card, name in enumerate(CARD_NAMES)}
+
+    def mask_of(names):
+        return card_mask(card_ids[name] for name in names)
+
+    state = _new_state(board, record["seed"], [player["character"] for player in record["players"]], log_path)
+    for player, saved in zip(state.players, record["players"]):
+        player["position"] = tuple(saved["position"])
+        player["active"] = saved["active"]
+        player["cards"] = [card_ids[name] for name in saved["cards"]]
+        player["hand"] = card_mask(player["cards"])
+    _set_solution(state, [card_ids[name] for name in record["solution"]])
+
+    state.current_player_idx = record["current_player"]
+    state.dice_values = tuple(record["dice"])
+    state.moves_left = record["moves_left"]
+    state.has_rolled = record["has_rolled"]
+    state.game_phase = record["phase"]
+    state.player_showing_card = record["player_showing_card"]
+    state.card_being_shown = None if record["card_being_shown"] is None else card_ids[record["card_being_shown"]]
+    state.showing_card_ui = record["showing_card_ui"]
+    state.showing_notification_ui = record["showing_notification_ui"]
+    state.notification_message = record["notification_message"]
+    state.current_suggestion = record["current_suggestion"]
+    _set_log(state, record["log"]["total"], record["log"]["entries"])
+
+    deduction = record["deduction"]
+    players = tuple((tuple(mask_of(names) for names in saved["possible"]),
+                     tuple(mask_of(names) for names in saved["known"]),
+                     tuple((owner, mask_of(names)) for owner, names in saved["clauses"]))
+                    for saved in deduction["players"])
+    history = tuple((saved["suggester"], mask_of(saved["cards"]), tuple(saved["passers"]), saved["disprover"])
+                    for saved in deduction["history"])
+    _set_deduction(state, players, history)
+
+    if "events" in record:
+        state.events = [event_from_dict(event) for event in record["events"]]
+    if "actions" in record:
+        state.actions = [tuple(action) for action in record["actions"]]
+    if "rng" in record:
+        state.rng.setstate((3, tuple(record["rng"]["state"]), record["rng"]["gauss_next"]))
+    return state
+
+def save_game(state, path, sections=ALL_SECTIONS):
+    # JSON if the path ends in .json, else the binary format
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(state_to_dict(state, sections), f, indent=2)
+    else:
+        with open(path, "wb") as f:
+            f.write(pack_state(state, sections))
+
+def load_game(path, board=None, log_path=None):
+    """Load a game saved by save_game(), in either format"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(SAVE_MAGIC):
+        return unpack_state(data, board, log_path)
+    return state_from_dict(json.loads(data), board, log_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or convert a saved Cluedo game.")
+    parser.add_argument("path", help="save file written by main.py --save")
+    parser.add_argument("--convert", metavar="PATH", default=None,
+                        help="write the game to PATH, as JSON if it ends in .json, else binary")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    state = load_game(args.path)
+    elapsed = time.perf_counter() - start_time
+    print(f"Seed {state.seed}, {len(state.players)} players, loaded in {elapsed * 1000:.2f} ms")
+    print(f"Phase: {state.game_phase}, {state.players[state.current_player_idx]['name']} to play")
+    print(f"Solution: {state.solution['murderer']} in the {state.solution['room']} with the {state.solution['weapon']}")
+    if args.convert:
+        save_game(state, args.convert)
+        print(f"Saved to {args.convert}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,572 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from game_constants import *
+from board import GameBoard
+from game_state import GameState
+from cards import *
+from agents import AGENT_TYPES, make_agent, close_agents, play_turn
+from replay import apply_action
+from events import Disproof, CardSeen, GameOver
+from projection import ViewMirror, ViewTracker
+
+# Seat type for a player connected over the network
+HUMAN = "human"
+
+# Longest request line accepted from a client; longer ones close the connection
+MAX_MESSAGE_BYTES = 4096
+
+# Messages queued for a client that isn't reading them before it is disconnected
+MAX_PENDING_MESSAGES = 256
+
+# Tables hosted at once
+MAX_GAMES = 1000
+
+# Longest line the loopback client reads; the last update of a game the bots
+# finish on their own holds every event since the one before it
+MAX_UPDATE_BYTES = 1 << 24
+
+# Number of arguments each action takes; all of them are integers (see replay.apply_action)
+ACTION_ARGS = {
+    "roll": 0,
+    "move": 2,
+    "suggest": 2,
+    "accuse": 3,
+    "end_turn": 0,
+    "acknowledge_card": 0,
+    "acknowledge_notification": 0
+}
+
+def check_action(action):
+    # Error message for a malformed action, or None if it's well formed
+    if not isinstance(action, list) or not action or action[0] not in ACTION_ARGS:
+        return f"Unknown action, expected one of: {', '.join(ACTION_ARGS)}"
+    name, args = action[0], action[1:]
+    if len(args) != ACTION_ARGS[name] or not all(type(arg) is int for arg in args):
+        return f"'{name}' takes {ACTION_ARGS[name]} integer arguments"
+    if name in ("suggest", "accuse"):
+        if not (0 <= args[0] < NUM_CARDS and card_type(args[0]) == CARD_TYPES["CHARACTER"]):
+            return "Not a character card"
+        if not (0 <= args[1] < NUM_CARDS and card_type(args[1]) == CARD_TYPES["WEAPON"]):
+            return "Not a weapon card"
+    if name == "accuse" and not 0 <= args[2] < len(ROOMS):
+        return "Not a room"
+    return None
+
+class Connection:
+    # One client. Outgoing messages go through a bounded queue drained by its own
+    # task, so a slow reader never holds up a game; one that falls
+    # MAX_PENDING_MESSAGES behind is disconnected
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.queue = asyncio.Queue(MAX_PENDING_MESSAGES)
+        self.closed = False
+        self.game = None
+        self.seat = None
+        self.tracker = None  # Builds this client's updates, see projection.py
+        self.task = asyncio.create_task(self.write_loop())
+
+    def send(self, message):
+        if self.closed:
+            return
+        if self.queue.full():
+            # Not reading; drop it rather than buffer without limit
+            self.close(flush=False)
+            return
+        self.queue.put_nowait((json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    async def write_loop(self):
+        try:
+            while True:
+                data = await self.queue.get()
+                if data is None:
+                    break
+                self.writer.write(data)
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+
+    def close(self, flush=True):
+        # With flush, whatever is queued is still sent first
+        if self.closed:
+            return
+        self.closed = True
+        if flush and not self.queue.full():
+            self.queue.put_nowait(None)
+        else:
+            # Nothing more will be sent, so don't wait for the client to read what's buffered
+            self.task.cancel()
+            self.writer.transport.abort()
+
+class GameHost:
+    # One table: a GameState, who is sitting where, and a lock so only one
+    # action or bot turn changes the game at a time
+    def __init__(self, game_id, board, seats, characters, seed, mcts_workers=1):
+        self.game_id = game_id
+        self.seats = list(seats)
+        self.state = GameState(board, verbose=False, seed=seed)
+        self.state.num_players = len(seats)
+        self.state.selected_characters = list(characters)
+        self.state.initialize_game()
+        rng = random.Random(self.state.seed)
+        self.state.agents = [make_agent(kind, rng, workers=mcts_workers) if kind != HUMAN else None
+                             for kind in seats]
+        self.connections = {}  # Seat -> Connection
+        self.lock = asyncio.Lock()
+        self.suggested = False  # Whether the current player has suggested this turn
+        self.bot_task = None  # Plays bot turns, see play_bots
+        self.turn = None  # Future of the bot turn running in the executor, if any
+        self.bot_turns = 0
+
+    def open_seats(self):
+        return [seat for seat, kind in enumerate(self.seats) if kind == HUMAN and seat not in self.connections]
+
+    def started(self):
+        # Play starts once every human seat is taken
+        return not self.open_seats()
+
+    def summary(self):
+        return {"game": self.game_id, "seats": self.seats, "open_seats": self.open_seats(),
+                "phase": self.state.game_phase}
+
+    def broadcast(self):
+        # Send each seated client what changed in its view since its last update,
+        # and the events since then
+        for connection in self.connections.values():
+            delta = connection.tracker.update(self.state)
+            if delta is not None:
+                connection.send({"type": "update", "game": self.game_id, **delta})
+
+    def perform(self, seat, action):
+        """Apply a client's action for its seat; returns (success, message)"""
+        state = self.state
+        if not self.started():
+            return False, "Waiting for players to join."
+        if state.game_phase != "playing":
+            return False, "The game is over."
+        if seat != state.current_player_idx:
+            return False, "It's not your turn."
+        error = check_action(action)
+        if error is not None:
+            return False, error
+
+        name = action[0]
+        # An open card or notification has to be acknowledged before anything else,
+        # so the turn can't move on while a shown card is still on display
+        if state.showing_card_ui and name != "acknowledge_card":
+            return False, "Acknowledge the card you were shown first."
+        if state.showing_notification_ui and name != "acknowledge_notification":
+            return False, "Acknowledge the notification first."
+        if not state.players[seat]["active"] and name != "end_turn":
+            return False, "You have been eliminated; end your turn."
+        if name == "suggest" and self.suggested:
+            return False, "You have already made a suggestion this turn."
+        previous_player = state.current_player_idx
+        if not apply_action(state, action):
+            return False, f"'{name}' is not allowed right now."
+        if name == "suggest":
+            self.suggested = True
+        if state.current_player_idx != previous_player:
+            self.suggested = False
+        return True, None
+
+    def bot_to_play(self):
+        state = self.state
+        return (self.started() and state.game_phase == "playing" and
+                state.agents[state.current_player_idx] is not None)
+
+    def human_playing(self):
+        return any(kind == HUMAN and player["active"] for kind, player in zip(self.seats, self.state.players))
+
+    def start_bots(self):
+        # Bot turns are played by a task of their own, so the request that handed
+        # the turn to a bot returns straight away and its client's acks keep being read
+        if self.bot_to_play() and (self.bot_task is None or self.bot_task.done()):
+            self.bot_task = asyncio.create_task(self.play_bots())
+
+    async def play_bots(self):
+        # Play bot turns until it's a human's turn or the game ends, taking the lock
+        # for one turn at a time. Turns run in a worker thread so a slow bot doesn't
+        # stall the other tables' connections. With no human left in the game the
+        # rest is played out with one update at the end, and a game still going
+        # after MAX_TURNS bot turns is ended with no winner
+        loop = asyncio.get_running_loop()
+        state = self.state
+        while True:
+            async with self.lock:
+                if not self.bot_to_play():
+                    return
+                if self.bot_turns >= MAX_TURNS:
+                    state.emit(GameOver(None))
+                    state.game_phase = "game_over"
+                    close_agents(state.agents)
+                    self.broadcast()
+                    return
+                self.turn = loop.run_in_executor(None, play_turn, state, state.agents[state.current_player_idx])
+                # Shielded, so cancelling this task still leaves the turn's future
+                # pending until the thread is done with it (see close)
+                await asyncio.shield(self.turn)
+                self.bot_turns += 1
+                self.suggested = False
+                if state.game_phase != "playing":
+                    close_agents(state.agents)
+                if self.human_playing() or not self.bot_to_play():
+                    self.broadcast()
+            await asyncio.sleep(0)
+
+    def close(self):
+        # The table is going away: stop playing bots, and close them once a turn
+        # still running in the executor has finished with them
+        if self.bot_task is not None:
+            self.bot_task.cancel()
+        if self.turn is not None and not self.turn.done():
+            self.turn.add_done_callback(lambda turn: close_agents(self.state.agents))
+        else:
+            close_agents(self.state.agents)
+
+class GameServer:
+    """Hosts many tables for clients speaking JSON lines over TCP"""
+    def __init__(self, max_games=MAX_GAMES, mcts_workers=1):
+        self.board = GameBoard(verbose=False)  # Shared by every table; the layout never changes
+        self.games = {}
+        self.connections = set()
+        self.next_game_id = 1
+        self.max_games = max_games
+        self.mcts_workers = mcts_workers  # Processes each mcts bot searches with
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        # Returns the listening asyncio server; port 0 picks a free port
+        return await asyncio.start_server(self.handle_client, host, port, limit=MAX_MESSAGE_BYTES)
+
+    async def handle_client(self, reader, writer):
+        connection = Connection(reader, writer)
+        self.connections.add(connection)
+        try:
+            while not connection.closed:
+                # The next request is only read once this one is handled, so a client
+                # sending faster than its table can keep up is held back by TCP
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # Longer than MAX_MESSAGE_BYTES, or the connection dropped
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    connection.send({"type": "error", "message": "Requests are one JSON object per line."})
+                    continue
+                if not isinstance(message, dict):
+                    connection.send({"type": "error", "message": "Requests are one JSON object per line."})
+                    continue
+                await self.handle_message(connection, message)
+        finally:
+            await self.leave(connection)
+            connection.close()
+            # The writer task may have been cancelled if the client fell behind
+            await asyncio.gather(connection.task, return_exceptions=True)
+            self.connections.discard(connection)
+
+    async def handle_message(self, connection, message):
+        kind = message.get("type")
+        if kind == "list":
+            connection.send({"type": "games", "games": [game.summary() for game in self.games.values()]})
+        elif kind == "create":
+            # The creator sits down straight away, so no table is left without anyone at it
+            if connection.game is not None:
+                connection.send({"type": "error", "message": "Leave your current game first."})
+                return
+            success, result = self.create_game(message)
+            if not success:
+                connection.send({"type": "error", "message": result})
+                return
+            connection.send({"type": "created", "game": result.game_id, "seats": result.seats})
+            await self.join(connection, result.game_id, message.get("seat", result.seats.index(HUMAN)))
+            if connection.game is None:
+                self.games.pop(result.game_id, None)
+        elif kind == "join":
+            await self.join(connection, message.get("game"), message.get("seat"))
+        elif kind == "leave":
+            await self.leave(connection)
+            connection.send({"type": "left"})
+        elif kind == "action":
+            await self.act(connection, message.get("action"))
+        elif kind == "ack":
+            # Later updates are built on this version; no reply
+            if connection.tracker is None or not connection.tracker.acknowledge(message.get("version")):
+                connection.send({"type": "error", "message": f"Can't acknowledge version {message.get('version')}"})
+        elif kind == "resync":
+            await self.resync(connection, message.get("version"))
+        else:
+            connection.send({"type": "error", "message": f"Unknown request type '{kind}'"})
+
+    def create_game(self, message):
+        """Set up a table from a create request; returns (success, GameHost or error message)"""
+        if len(self.games) >= self.max_games:
+            return False, "The server is full."
+        seats = message.get("seats", [HUMAN] * 3)
+        if not isinstance(seats, list) or not 3 <= len(seats) <= len(CHARACTERS):
+            return False, f"A game takes 3 to {len(CHARACTERS)} seats."
+        for kind in seats:
+            if kind != HUMAN and kind not in AGENT_TYPES:
+                return False, f"Unknown seat type '{kind}'"
+        if HUMAN not in seats:
+            return False, "At least one seat must be human."
+        characters = message.get("characters", list(range(len(seats))))
+        if (not isinstance(characters, list) or len(characters) != len(seats) or
+                sorted(set(characters)) != sorted(characters) or
+                not all(type(char_idx) is int and 0 <= char_idx < len(CHARACTERS) for char_idx in characters)):
+            return False, "Characters must be one distinct character index per seat."
+        seed = message.get("seed")
+        if seed is not None and type(seed) is not int:
+            return False, "The seed must be an integer."
+
+        game = GameHost(self.next_game_id, self.board, seats, characters, seed, self.mcts_workers)
+        self.games[game.game_id] = game
+        self.next_game_id += 1
+        return True, game
+
+    async def join(self, connection, game_id, seat):
+        if connection.game is not None:
+            connection.send({"type": "error", "message": "Leave your current game first."})
+            return
+        game = self.games.get(game_id)
+        if game is None:
+            connection.send({"type": "error", "message": f"No game {game_id}"})
+            return
+        async with game.lock:
+            if seat not in game.open_seats():
+                connection.send({"type": "error", "message": f"Seat {seat} is not open."})
+                return
+            connection.game = game
+            connection.seat = seat
+            connection.tracker = ViewTracker(seat)
+            game.connections[seat] = connection
+            connection.send({"type": "joined", "game": game.game_id, "seat": seat})
+            game.broadcast()
+            game.start_bots()
+
+    async def leave(self, connection):
+        game = connection.game
+        if game is None:
+            return
+        async with game.lock:
+            if game.connections.get(connection.seat) is connection:
+                del game.connections[connection.seat]
+            connection.game = None
+            connection.seat = None
+            connection.tracker = None
+            # A table nobody is sitting at is closed
+            if not game.connections:
+                self.games.pop(game.game_id, None)
+                game.close()
+
+    async def act(self, connection, action):
+        game = connection.game
+        if game is None:
+            connection.send({"type": "error", "message": "Join a game first."})
+            return
+        async with game.lock:
+            success, message = game.perform(connection.seat, action)
+            if not success:
+                connection.send({"type": "error", "message": message})
+                return
+            if game.state.game_phase != "playing":
+                close_agents(game.state.agents)
+            game.broadcast()
+            game.start_bots()
+
+    async def resync(self, connection, version):
+        # For a client that can't apply an update: one built on a version it still
+        # has, or the whole view if the server no longer holds that version
+        game = connection.game
+        if game is None:
+            connection.send({"type": "error", "message": "Join a game first."})
+            return
+        async with game.lock:
+            connection.send({"type": "update", "game": game.game_id, **connection.tracker.resync(game.state, version)})
+
+class LoopbackClient:
+    # A client for tests and load checks: sends requests and reads replies as dicts
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port, limit=MAX_UPDATE_BYTES)
+        return cls(reader, writer)
+
+    async def send(self, message):
+        self.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+        await self.writer.drain()
+
+    async def receive(self):
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        return json.loads(line)
+
+    async def receive_until(self, *kinds):
+        # Skip messages until one of the given types arrives
+        while True:
+            message = await self.receive()
+            if message["type"] in kinds:
+                return message
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+# Turns the loopback client plays before it accuses with a guess
+LOOPBACK_TURN_LIMIT = 60
+
+class LoopbackPlayer:
+    # Plays seat 0 through a LoopbackClient. It heads for the nearest other room
+    # with each roll, suggests cards it hasn't seen once there, and accuses when
+    # only three cards are unseen, it's the last player left, or it runs out of
+    # turns. Along the way it checks that the server never shows it a card it
+    # shouldn't see
+    def __init__(self, client, board, rng):
+        self.client = client
+        self.board = board
+        self.rng = rng
+        self.mirror = ViewMirror()
+        self.seen = set()
+        self.turn_start = None
+        self.suggested = False
+        self.turns = 0
+
+    async def play(self, seats):
+        """Create a table in seat 0 and play it to the end; returns the final view"""
+        await self.client.send({"type": "create", "seats": seats, "seed": self.rng.getrandbits(32), "seat": 0})
+        while True:
+            update = await self.client.receive_until("update", "error")
+            if update["type"] == "error":
+                raise RuntimeError(update["message"])
+            self.observe(self.mirror.apply(update))
+            self.mirror.acknowledge(update["version"])
+            await self.client.send({"type": "ack", "version": update["version"]})
+            view = self.mirror.view
+            if view["phase"] != "playing":
+                return view
+            if view["current_player"] == 0:
+                await self.client.send({"type": "action", "action": self.next_action(view)})
+
+    def observe(self, events):
+        self.seen.update(self.mirror.view["hand"])
+        for event in events:
+            if type(event) is Disproof:
+                involved = (event.player, event.suggester)
+            elif type(event) is CardSeen:
+                involved = (event.player, event.shown_by)
+            else:
+                continue
+            if event.card is not None:
+                if 0 not in involved:
+                    raise AssertionError(f"Seat 0 was shown someone else's card: {event}")
+                self.seen.add(event.card)
+
+    def next_action(self, view):
+        board = self.board
+        position = tuple(view["players"][0]["position"])
+        if not view["players"][0]["active"]:
+            return ["end_turn"]
+        if view["shown_card"] is not None:
+            return ["acknowledge_card"]
+        if view["notification"] is not None:
+            return ["acknowledge_notification"]
+        if not view["has_rolled"]:
+            self.turn_start = position
+            self.suggested = False
+            self.turns += 1
+            return ["roll"]
+
+        in_new_room = board.get_room_center_at(*position) is not None and position != self.turn_start
+        if view["moves_left"] > 0 and not in_new_room:
+            rooms = [center for center in board.room_centers
+                     if center != self.turn_start and board.distance(position, center)]
+            target = min(rooms, key=lambda center: board.distance(position, center))
+            return ["move", *board.next_step_toward(position, target)]
+        unseen = [card for card in range(NUM_CARDS) if card not in self.seen]
+        if in_new_room and not self.suggested:
+            self.suggested = True
+            return ["suggest", self.pick(unseen, CHARACTER_MASK), self.pick(unseen, WEAPON_MASK)]
+
+        alone = sum(1 for player in view["players"] if player["active"]) == 1
+        if len(unseen) == 3 or alone or self.turns >= LOOPBACK_TURN_LIMIT:
+            room = self.pick(unseen, ROOM_MASK)
+            return ["accuse", self.pick(unseen, CHARACTER_MASK), self.pick(unseen, WEAPON_MASK),
+                    room - FIRST_ROOM_CARD]
+        return ["end_turn"]
+
+    def pick(self, unseen, category):
+        return self.rng.choice([card for card in unseen if 1 << card & category] or cards_in(category))
+
+async def run_loopback(tables, seats, seed, mcts_workers=1):
+    """Serve on a free local port and play tables games against it at once"""
+    server = GameServer(mcts_workers=mcts_workers)
+    listener = await server.serve("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    board = GameBoard(verbose=False)
+
+    async def one_table(index):
+        client = await LoopbackClient.connect("127.0.0.1", port)
+        try:
+            return await LoopbackPlayer(client, board, random.Random(seed + index)).play(seats)
+        finally:
+            await client.close()
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(one_table(index) for index in range(tables)))
+    elapsed = time.perf_counter() - start_time
+    listener.close()
+    await listener.wait_closed()
+    # Let every handler see its client hang up before the event loop goes away
+    while server.connections:
+        await asyncio.sleep(0.01)
+    return results, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Host Cluedo tables for network clients (JSON lines over TCP).")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument("--max-games", type=int, default=MAX_GAMES, help="tables hosted at once")
+    parser.add_argument("--loopback", type=int, metavar="TABLES", default=None,
+                        help="instead of serving, play TABLES games against a local server and report")
+    parser.add_argument("--seats", default="human,deduction,deduction",
+                        help="seat types for --loopback tables; seat 0 is the loopback client")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for --loopback tables")
+    parser.add_argument("--mcts-workers", type=int, default=1, help="processes each mcts bot searches with")
+    args = parser.parse_args()
+
+    if args.loopback is not None:
+        seats = [seat.strip() for seat in args.seats.split(",") if seat.strip()]
+        if not seats or seats[0] != HUMAN or HUMAN in seats[1:]:
+            parser.error("--loopback plays seat 0, which must be human, against bots in the other seats")
+        results, elapsed = asyncio.run(run_loopback(args.loopback, seats, args.seed, args.mcts_workers))
+        wins = sum(1 for view in results if view["players"][0]["active"] and view["current_player"] == 0)
+        print(f"{len(results)} tables played in {elapsed:.2f} s ({len(results) / elapsed:.1f} tables/s)")
+        print(f"Loopback client won {wins} of {len(results)}")
+        return
+
+    async def serve():
+        listener = await GameServer(args.max_games, args.mcts_workers).serve(args.host, args.port)
+        print(f"Serving on {args.host}:{args.port}")
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
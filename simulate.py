@@ -0,0 +1,188 @@
+import argparse
+import multiprocessing
+import random
+import time
+from game_constants import *
+from board import get_board
+from game_state import GameState
+from cards import *
+from agents import AGENT_TYPES, make_agent, close_agents, play_turn
+from archive import ArchiveWriter, pack_game
+
+# Games handed to a worker at a time; each batch reports back as soon as it finishes
+BATCH_SIZE = 50
+
+
+class SimulationStats:
+    # Running totals merged from every finished batch
+    def __init__(self):
+        self.games = 0
+        self.solved = 0
+        self.turns_to_solve = 0
+        self.players = 0
+        self.eliminated = 0
+        self.wins = {character["name"]: 0 for character in CHARACTERS}
+        self.seats = {character["name"]: 0 for character in CHARACTERS}
+        self.agent_wins = {kind: 0 for kind in AGENT_TYPES}
+        self.agent_seats = {kind: 0 for kind in AGENT_TYPES}
+        self.elapsed = 0.0
+
+    def record_game(self, characters, kinds, winner, turns, eliminated):
+        # winner is the winning seat's index, or None
+        self.games += 1
+        self.players += len(characters)
+        self.eliminated += eliminated
+        for name, kind in zip(characters, kinds):
+            self.seats[name] += 1
+            self.agent_seats[kind] += 1
+        if winner is not None:
+            self.solved += 1
+            self.turns_to_solve += turns
+            self.wins[characters[winner]] += 1
+            self.agent_wins[kinds[winner]] += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.solved += other.solved
+        self.turns_to_solve += other.turns_to_solve
+        self.players += other.players
+        self.eliminated += other.eliminated
+        for name in self.wins:
+            self.wins[name] += other.wins[name]
+            self.seats[name] += other.seats[name]
+        for kind in self.agent_wins:
+            self.agent_wins[kind] += other.agent_wins[kind]
+            self.agent_seats[kind] += other.agent_seats[kind]
+
+    def win_rates(self):
+        return {name: self.wins[name] / self.seats[name] if self.seats[name] else 0.0
+                for name in self.wins}
+
+    def agent_win_rates(self):
+        return {kind: self.agent_wins[kind] / self.agent_seats[kind]
+                for kind in self.agent_wins if self.agent_seats[kind]}
+
+    def average_turns_to_solve(self):
+        return self.turns_to_solve / self.solved if self.solved else 0.0
+
+    def elimination_rate(self):
+        return self.eliminated / self.players if self.players else 0.0
+
+    def games_per_second(self):
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        lines = [f"Games: {self.games} ({self.solved} solved)"]
+        for name, rate in self.win_rates().items():
+            lines.append(f"  {name:<16} win rate {rate:6.1%} over {self.seats[name]} games")
+        for kind, rate in self.agent_win_rates().items():
+            lines.append(f"  {kind + ' bot':<16} win rate {rate:6.1%} over {self.agent_seats[kind]} seats")
+        lines.append(f"Average turns to solve: {self.average_turns_to_solve():.1f}")
+        lines.append(f"Elimination rate: {self.elimination_rate():.1%}")
+        lines.append(f"Games/second: {self.games_per_second():.1f}")
+        return "\n".join(lines)
+
+
+def play_game(num_players, rng, seats, archived=None, mcts_workers=1):
+    # Play one complete game between bots and return its outcome; seat i plays seats[i % len(seats)].
+    # If archived is a list, the game is packed for the archive and added to it. mcts_workers
+    # is the size of each search bot's process pool
+    state = GameState(get_board(), verbose=False, seed=rng.getrandbits(32))
+    state.num_players = num_players
+    state.selected_characters = rng.sample(range(len(CHARACTERS)), num_players)
+    state.initialize_game()
+    kinds = [seats[i % len(seats)] for i in range(num_players)]
+    state.agents = [make_agent(kind, rng, workers=mcts_workers) for kind in kinds]
+
+    winner = None
+    turns = 0
+    while state.game_phase == "playing" and turns < MAX_TURNS:
+        current = state.current_player_idx
+        play_turn(state, state.agents[current])
+        turns += 1
+        if state.game_phase == "game_over":
+            if state.players[current]["active"]:
+                winner = current
+            break
+    close_agents(state.agents)
+
+    eliminated = sum(1 for player in state.players if not player["active"])
+    if archived is not None:
+        archived.append(pack_game(state))
+    return [player["name"] for player in state.players], kinds, winner, turns, eliminated
+
+
+def play_batch(task):
+    # Worker entry point: each batch carries its own seed so results don't depend on scheduling.
+    # Returns the batch's stats and, if it's archiving, its packed games
+    seed, num_games, num_players, seats, archiving, mcts_workers = task
+    rng = random.Random(seed)
+    stats = SimulationStats()
+    archived = [] if archiving else None
+    for _ in range(num_games):
+        stats.record_game(*play_game(num_players, rng, seats, archived, mcts_workers))
+    return stats, archived
+
+
+def simulate(num_games, num_players=3, workers=None, seed=0, batch_size=BATCH_SIZE, progress=None,
+             seats=("deduction",), archive_path=None, mcts_workers=1):
+    """Play num_games headless games across a process pool and return the aggregate stats"""
+    # With archive_path, every game is also appended to that archive (see archive.py).
+    # With one worker the games are played in this process, which leaves search
+    # bots free to start their own pools of mcts_workers processes
+    tasks = []
+    for batch_idx, start in enumerate(range(0, num_games, batch_size)):
+        tasks.append((seed + batch_idx, min(batch_size, num_games - start), num_players, tuple(seats),
+                      archive_path is not None, mcts_workers))
+
+    stats = SimulationStats()
+    writer = ArchiveWriter(archive_path) if archive_path is not None else None
+    start_time = time.perf_counter()
+    pool = multiprocessing.Pool(workers) if workers != 1 else None
+    try:
+        # Batches stream back as they finish, so only running totals are kept
+        batches = pool.imap_unordered(play_batch, tasks) if pool is not None else map(play_batch, tasks)
+        for batch_stats, archived in batches:
+            stats.merge(batch_stats)
+            if writer is not None:
+                for packed in archived:
+                    writer.add_packed(packed)
+            if progress is not None:
+                progress(stats)
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if writer is not None:
+            writer.close()
+    stats.elapsed = time.perf_counter() - start_time
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless Cluedo games and report aggregate statistics.")
+    parser.add_argument("--games", type=int, default=1000, help="number of games to play")
+    parser.add_argument("--players", type=int, default=3, choices=range(3, 7), help="players per game")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed; batch i uses seed + i")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="games per worker task")
+    parser.add_argument("--seats", default="deduction",
+                        help=f"comma-separated bot types, repeated to fill the seats ({', '.join(AGENT_TYPES)})")
+    parser.add_argument("--archive", metavar="PATH", default=None,
+                        help="append every game to the archive at PATH, creating it if needed (see archive.py)")
+    parser.add_argument("--mcts-workers", type=int, default=1,
+                        help="processes each mcts bot searches with; needs --workers 1")
+    args = parser.parse_args()
+    seats = [seat.strip() for seat in args.seats.split(",") if seat.strip()]
+    for seat in seats:
+        if seat not in AGENT_TYPES:
+            parser.error(f"unknown bot type '{seat}'")
+    if args.mcts_workers > 1 and args.workers != 1:
+        parser.error("--mcts-workers needs --workers 1, as worker processes can't start pools of their own")
+
+    stats = simulate(args.games, args.players, args.workers, args.seed, args.batch_size, seats=seats,
+                     archive_path=args.archive, mcts_workers=args.mcts_workers)
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import pygame
 from game_constants import *
+from fonts import get_font, render_text
+from cards import CARD_TYPE_NAMES, FIRST_CHARACTER_CARD, card_name, card_type
 
 class Button:
     def __init__(self, x, y, width, height, text, color, text_color=BLACK, font_size=20):
@@ -18,8 +20,8 @@ class Button:
         
         # Draw text
         if font is None:
-            font = pygame.font.SysFont(None, self.font_size)
-        text_surface = font.render(self.text, True, self.text_color)
+            font = get_font(self.font_size)
+        text_surface = render_text(font, self.text, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
     
@@ -30,28 +32,308 @@ class Button:
     def check_click(self, mouse_pos, click):
         return self.rect.collidepoint(mouse_pos) and click
 
+class Dialog:
+    # A modal panel over a dimmed screen. The overlay, the panel's static contents and
+    # the buttons are built once when the dialog opens and reused until it is closed
+    def __init__(self, panel_width, panel_height, overlay_alpha=128):
+        self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, overlay_alpha))
+        
+        panel_x = (SCREEN_WIDTH - panel_width) // 2
+        panel_y = (SCREEN_HEIGHT - panel_height) // 2
+        self.panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
+        
+        # Static contents are drawn onto the panel in panel coordinates
+        self.panel = pygame.Surface(self.panel_rect.size)
+        self.panel.fill(WHITE)
+        pygame.draw.rect(self.panel, BLACK, self.panel.get_rect(), 2)
+        
+        # Buttons live in screen coordinates so clicks can be checked directly
+        self.buttons = []
+    
+    def draw(self, screen):
+        screen.blit(self.overlay, (0, 0))
+        screen.blit(self.panel, self.panel_rect)
+        for btn in self.buttons:
+            btn.draw(screen)
+    
+    def hover_state(self):
+        return tuple(btn.hovered for btn in self.buttons)
+
+class CardDialog(Dialog):
+    def __init__(self, ui, card):
+        super().__init__(300, 400)
+        panel = self.panel
+        panel_width = self.panel_rect.width
+        
+        # Title
+        title = render_text(ui.heading_font, "Card Revealed", BLACK)
+        panel.blit(title, title.get_rect(center=(panel_width // 2, 30)))
+        
+        # Card type
+        kind = card_type(card)
+        panel.blit(render_text(ui.normal_font, f"Type: {CARD_TYPE_NAMES[kind]}", BLACK), (50, 80))
+        
+        # Card name
+        name_text = render_text(ui.heading_font, card_name(card), BLACK)
+        panel.blit(name_text, name_text.get_rect(center=(panel_width // 2, 150)))
+        
+        # Card visual representation
+        if kind == CARD_TYPES["CHARACTER"]:
+            char_color = CHARACTERS[card - FIRST_CHARACTER_CARD]["color"]
+                    
+            # Draw character icon
+            pygame.draw.circle(panel, char_color, (panel_width // 2, 220), 40)
+            pygame.draw.circle(panel, BLACK, (panel_width // 2, 220), 40, 2)
+        elif kind == CARD_TYPES["WEAPON"]:
+            # Draw weapon icon 
+            weapon_rect = pygame.Rect(panel_width // 2 - 30, 200, 60, 40)
+            pygame.draw.rect(panel, LIGHT_RED, weapon_rect)
+            pygame.draw.rect(panel, BLACK, weapon_rect, 2)
+        elif kind == CARD_TYPES["ROOM"]:
+            # Draw room icon (simple house shape)
+            room_rect = pygame.Rect(panel_width // 2 - 40, 200, 80, 60)
+            pygame.draw.rect(panel, LIGHT_BLUE, room_rect)
+            pygame.draw.rect(panel, BLACK, room_rect, 2)
+            
+            roof_points = [(panel_width // 2 - 50, 200),
+                          (panel_width // 2, 170),
+                          (panel_width // 2 + 50, 200)]
+            pygame.draw.polygon(panel, LIGHT_RED, roof_points)
+            pygame.draw.polygon(panel, BLACK, roof_points, 2)
+        
+        self.ok_btn = Button(self.panel_rect.x + 75, self.panel_rect.y + 320, 150, 40, "OK", LIGHT_GREEN, BLACK, 20)
+        self.buttons = [self.ok_btn]
+
+class NotificationDialog(Dialog):
+    def __init__(self, ui, message):
+        super().__init__(400, 200)
+        panel = self.panel
+        panel_width = self.panel_rect.width
+        
+        title = render_text(ui.heading_font, "Suggestion Result", BLACK)
+        panel.blit(title, title.get_rect(center=(panel_width // 2, 30)))
+        
+        message_lines = []
+        words = message.split()
+        current_line = ""
+        for word in words:
+            test_line = current_line + " " + word if current_line else word
+            test_width = ui.normal_font.size(test_line)[0]
+            if test_width < panel_width - 40:
+                current_line = test_line
+            else:
+                message_lines.append(current_line)
+                current_line = word
+        if current_line:
+            message_lines.append(current_line)
+        
+        for i, line in enumerate(message_lines):
+            msg_text = render_text(ui.normal_font, line, BLACK)
+            panel.blit(msg_text, msg_text.get_rect(center=(panel_width // 2, 80 + i * 20)))
+        
+        self.ok_btn = Button(self.panel_rect.x + 125, self.panel_rect.y + 140, 150, 40, "OK", LIGHT_GREEN, BLACK, 20)
+        self.buttons = [self.ok_btn]
+
+class SuggestionDialog(Dialog):
+    def __init__(self, ui):
+        super().__init__(600, 400)
+        panel = self.panel
+        panel_x, panel_y = self.panel_rect.topleft
+        
+        # Title
+        panel.blit(render_text(ui.heading_font, "Make a Suggestion", BLACK), (20, 20))
+        
+        # Character selection
+        panel.blit(render_text(ui.normal_font, "Select Character:", BLACK), (20, 70))
+        
+        self.char_buttons = []
+        for i, character in enumerate(CHARACTERS):
+            row = i // 3
+            col = i % 3
+            btn_x = 20 + col * 190
+            btn_y = 100 + row * 45 
+            
+            # Draw character color indicator
+            pygame.draw.circle(panel, character["color"], (btn_x + 15, btn_y + 17), 8)
+            
+            btn = Button(panel_x + btn_x, panel_y + btn_y, 180, 35, character["name"], WHITE, BLACK, 16)
+            self.char_buttons.append((btn, character["name"]))
+        
+        # Weapon selection
+        panel.blit(render_text(ui.normal_font, "Select Weapon:", BLACK), (20, 200))
+        
+        self.weapon_buttons = []
+        for i, weapon in enumerate(WEAPONS):
+            # Weapon button
+            row = i // 3
+            col = i % 3
+            btn_x = panel_x + 20 + col * 190
+            btn_y = panel_y + 230 + row * 35  
+            
+            btn = Button(btn_x, btn_y, 180, 25, weapon, WHITE, BLACK, 16)
+            self.weapon_buttons.append((btn, weapon))
+        
+        # Submit and Cancel buttons
+        self.submit_btn = Button(panel_x + 150, panel_y + 340, 120, 40, "Submit", LIGHT_GREEN, BLACK, 20)
+        self.cancel_btn = Button(panel_x + 330, panel_y + 340, 120, 40, "Cancel", LIGHT_RED, BLACK, 20)
+        
+        self.buttons = ([btn for btn, _ in self.char_buttons] + [btn for btn, _ in self.weapon_buttons] +
+                        [self.submit_btn, self.cancel_btn])
+    
+    def select(self, selected_character, selected_weapon):
+        # Highlight the current selections
+        for btn, char_name in self.char_buttons:
+            btn.color = LIGHT_BLUE if char_name == selected_character else WHITE
+        for btn, weapon_name in self.weapon_buttons:
+            btn.color = LIGHT_BLUE if weapon_name == selected_weapon else WHITE
+
+class AccusationDialog(Dialog):
+    def __init__(self, ui):
+        super().__init__(600, 500)
+        panel = self.panel
+        panel_x, panel_y = self.panel_rect.topleft
+        
+        # Title
+        panel.blit(render_text(ui.heading_font, "Make an Accusation", BLACK), (20, 20))
+        
+        # Warning
+        panel.blit(render_text(ui.normal_font, "Warning: If wrong, you will be eliminated!", (200, 0, 0)), (20, 50))
+        
+        # Character selection
+        panel.blit(render_text(ui.normal_font, "Select Character:", BLACK), (20, 90))
+        
+        self.char_buttons = []
+        for i, character in enumerate(CHARACTERS):
+            # Character button
+            row = i // 3
+            col = i % 3
+            btn_x = 20 + col * 190
+            btn_y = 120 + row * 40  
+            
+            # Draw character color indicator
+            pygame.draw.circle(panel, character["color"], (btn_x + 15, btn_y + 15), 8)
+            
+            btn = Button(panel_x + btn_x, panel_y + btn_y, 180, 30, character["name"], WHITE, BLACK, 16)
+            self.char_buttons.append((btn, character["name"]))
+        
+        # Weapon selection
+        panel.blit(render_text(ui.normal_font, "Select Weapon:", BLACK), (20, 210))
+        
+        self.weapon_buttons = []
+        for i, weapon in enumerate(WEAPONS):
+            # Weapon button
+            row = i // 3
+            col = i % 3
+            btn_x = panel_x + 20 + col * 190
+            btn_y = panel_y + 240 + row * 35
+            
+            btn = Button(btn_x, btn_y, 180, 25, weapon, WHITE, BLACK, 16)
+            self.weapon_buttons.append((btn, weapon))
+        
+        # Room selection
+        panel.blit(render_text(ui.normal_font, "Select Room:", BLACK), (20, 320))
+        
+        self.room_buttons = []
+        for i, room in enumerate(ROOMS):
+            # Room button
+            row = i // 3
+            col = i % 3
+            btn_x = panel_x + 20 + col * 190
+            btn_y = panel_y + 350 + row * 35 
+            
+            btn = Button(btn_x, btn_y, 180, 25, room["name"], WHITE, BLACK, 16)
+            self.room_buttons.append((btn, i))
+        
+        # Submit and Cancel buttons
+        self.submit_btn = Button(panel_x + 150, panel_y + 450, 120, 40, "Submit", LIGHT_GREEN, BLACK, 20)
+        self.cancel_btn = Button(panel_x + 330, panel_y + 450, 120, 40, "Cancel", LIGHT_RED, BLACK, 20)
+        
+        self.buttons = ([btn for btn, _ in self.char_buttons] + [btn for btn, _ in self.weapon_buttons] +
+                        [btn for btn, _ in self.room_buttons] + [self.submit_btn, self.cancel_btn])
+    
+    def select(self, selected_character, selected_weapon, selected_room):
+        # Highlight the current selections
+        for btn, char_name in self.char_buttons:
+            btn.color = LIGHT_BLUE if char_name == selected_character else WHITE
+        for btn, weapon_name in self.weapon_buttons:
+            btn.color = LIGHT_BLUE if weapon_name == selected_weapon else WHITE
+        for btn, room_idx in self.room_buttons:
+            btn.color = LIGHT_BLUE if room_idx == selected_room else WHITE
+
+class GameOverDialog(Dialog):
+    def __init__(self, ui, solution, winner=None):
+        super().__init__(500, 300, overlay_alpha=180)
+        panel = self.panel
+        panel_width = self.panel_rect.width
+        
+        # Title
+        if winner:
+            title = render_text(ui.title_font, f"{winner} Wins!", (0, 128, 0))
+        else:
+            title = render_text(ui.title_font, "Game Over", (200, 0, 0))
+        panel.blit(title, title.get_rect(center=(panel_width // 2, 50)))
+        
+        # Solution
+        solution_text = render_text(ui.heading_font, "The solution was:", BLACK)
+        panel.blit(solution_text, solution_text.get_rect(center=(panel_width // 2, 100)))
+        
+        murderer_text = render_text(ui.normal_font, f"Murderer: {solution['murderer']}", BLACK)
+        panel.blit(murderer_text, murderer_text.get_rect(center=(panel_width // 2, 140)))
+        
+        weapon_text = render_text(ui.normal_font, f"Weapon: {solution['weapon']}", BLACK)
+        panel.blit(weapon_text, weapon_text.get_rect(center=(panel_width // 2, 170)))
+        
+        room_text = render_text(ui.normal_font, f"Room: {solution['room']}", BLACK)
+        panel.blit(room_text, room_text.get_rect(center=(panel_width // 2, 200)))
+        
+        # Back to menu button
+        self.menu_btn = Button(self.panel_rect.x + 150, self.panel_rect.y + 240, 200, 40, "Back to Menu", LIGHT_GREEN, BLACK, 20)
+        self.buttons = [self.menu_btn]
+
 class UI:
     def __init__(self):
         # Initialize fonts
-        self.title_font = pygame.font.SysFont(None, 40)
-        self.heading_font = pygame.font.SysFont(None, 28)
-        self.normal_font = pygame.font.SysFont(None, 18)
-        self.small_font = pygame.font.SysFont(None, 14)
+        self.title_font = get_font(40)
+        self.heading_font = get_font(28)
+        self.normal_font = get_font(18)
+        self.small_font = get_font(14)
         
         # Game log scroll position
         self.log_scroll_offset = 0
         self.log_buttons = []
+        
+        # Rendered log lines by sequence number, for the visible page of one GameLog
+        self.log_lines = {}
+        self.log_lines_source = None
+        
+        # Inputs each panel was last drawn with; a panel is only redrawn when they change
+        self.panel_state = {}
+        
+        # The open modal dialog, if any, and what it was opened for
+        self.dialog = None
+        self.dialog_key = None
+    
+    def invalidate(self):
+        # Force every panel to redraw on its next draw call
+        self.panel_state.clear()
+    
+    def _needs_redraw(self, panel, state):
+        if panel in self.panel_state and self.panel_state[panel] == state:
+            return False
+        self.panel_state[panel] = state
+        return True
     
     def draw_start_menu(self, screen, num_players):
         screen.fill(LIGHT_GRAY)
         
         # Draw title
-        title = self.title_font.render("CLUEDO", True, BLACK)
+        title = render_text(self.title_font, "CLUEDO", BLACK)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, 100))
         screen.blit(title, title_rect)
         
         # Draw player count selector
-        text = self.heading_font.render("Select Number of Players:", True, BLACK)
+        text = render_text(self.heading_font, "Select Number of Players:", BLACK)
         text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, 200))
         screen.blit(text, text_rect)
         
@@ -74,7 +356,7 @@ class UI:
         screen.fill(LIGHT_GRAY)
         
         # Draw title
-        title = self.title_font.render("Select Characters", True, BLACK)
+        title = render_text(self.title_font, "Select Characters", BLACK)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, 50))
         screen.blit(title, title_rect)
         
@@ -102,18 +384,22 @@ class UI:
         start_btn.draw(screen)
 
         if len(selected_characters) < len(CHARACTERS):
-            help_text = self.small_font.render(f"Select {len(selected_characters) + 1} of 6", True, BLACK)
+            help_text = render_text(self.small_font, f"Select {len(selected_characters) + 1} of 6", BLACK)
             screen.blit(help_text, (SCREEN_WIDTH // 2 - 70, 460))
         
         return char_buttons, start_btn
     
     def draw_player_panel(self, screen, players, current_player_idx):
         panel_rect = pygame.Rect(590, 20, 414, 230)
+        state = (current_player_idx, tuple((p["name"], p["color"], p["active"]) for p in players))
+        if not self._needs_redraw("players", state):
+            return None
+        
         pygame.draw.rect(screen, WHITE, panel_rect)
         pygame.draw.rect(screen, BLACK, panel_rect, 2)
         
         # Title
-        title = self.heading_font.render("PLAYERS", True, BLACK)
+        title = render_text(self.heading_font, "PLAYERS", BLACK)
         screen.blit(title, (panel_rect.x + 10, panel_rect.y + 10))
         
         # Player list
@@ -125,7 +411,7 @@ class UI:
                 indicator_rect = pygame.Rect(panel_rect.x + 5, y_pos - 2, panel_rect.width - 10, 24)
                 pygame.draw.rect(screen, LIGHT_YELLOW, indicator_rect)
                 pygame.draw.rect(screen, BLACK, indicator_rect, 1)
-                screen.blit(self.normal_font.render("►", True, BLACK), (panel_rect.x + 10, y_pos))
+                screen.blit(render_text(self.normal_font, "►", BLACK), (panel_rect.x + 10, y_pos))
             
             # Draw player color indicator
             pygame.draw.circle(screen, player["color"], (panel_rect.x + 40, y_pos + 10), 10) 
@@ -134,16 +420,22 @@ class UI:
             name_text = player["name"]
             if not player["active"]:
                 name_text += " (Eliminated)"
-            name_surf = self.normal_font.render(name_text, True, BLACK)
+            name_surf = render_text(self.normal_font, name_text, BLACK)
             screen.blit(name_surf, (panel_rect.x + 60, y_pos + 5))  
+        
+        return panel_rect
     
     def draw_player_cards(self, screen, player):
         panel_rect = pygame.Rect(590, 260, 414, 120)
+        state = (player["name"], tuple(player["cards"]))
+        if not self._needs_redraw("cards", state):
+            return None
+        
         pygame.draw.rect(screen, WHITE, panel_rect)
         pygame.draw.rect(screen, BLACK, panel_rect, 2)
         
         # Title
-        title = self.heading_font.render("YOUR CARDS", True, BLACK)
+        title = render_text(self.heading_font, "YOUR CARDS", BLACK)
         screen.blit(title, (panel_rect.x + 10, panel_rect.y + 10))
         
         # Draw cards (3 cards side by side)
@@ -160,13 +452,14 @@ class UI:
             card_y = start_y
             
             # Get appropriate color based on card type
-            if card["type"] == CARD_TYPES["CHARACTER"]:
+            kind = card_type(card)
+            if kind == CARD_TYPES["CHARACTER"]:
                 color = LIGHT_PURPLE
                 type_text = "Character"
-            elif card["type"] == CARD_TYPES["WEAPON"]:
+            elif kind == CARD_TYPES["WEAPON"]:
                 color = LIGHT_RED
                 type_text = "Weapon"
-            elif card["type"] == CARD_TYPES["ROOM"]:
+            elif kind == CARD_TYPES["ROOM"]:
                 color = LIGHT_BLUE
                 type_text = "Room"
             else:
@@ -179,21 +472,26 @@ class UI:
             pygame.draw.rect(screen, BLACK, card_rect, 2)
             
             # Draw card type
-            type_surf = self.small_font.render(type_text, True, BLACK)
+            type_surf = render_text(self.small_font, type_text, BLACK)
             screen.blit(type_surf, (card_x + 5, card_y + 5))
             
             # Draw card name
-            name_surf = self.normal_font.render(card["name"], True, BLACK)
+            name_surf = render_text(self.normal_font, card_name(card), BLACK)
             name_rect = name_surf.get_rect(center=(card_x + card_width // 2, card_y + card_height // 2))
             screen.blit(name_surf, name_rect)
+        
+        return panel_rect
     
     def draw_dice_panel(self, screen, dice_values, moves_left):
         panel_rect = pygame.Rect(590, 390, 414, 60)
+        if not self._needs_redraw("dice", (dice_values, moves_left)):
+            return None
+        
         pygame.draw.rect(screen, WHITE, panel_rect)
         pygame.draw.rect(screen, BLACK, panel_rect, 2)
         
         # Title
-        title = self.heading_font.render("DICE", True, BLACK)
+        title = render_text(self.heading_font, "DICE", BLACK)
         screen.blit(title, (panel_rect.x + 10, panel_rect.y + 10))
         
         # Draw dice
@@ -203,7 +501,7 @@ class UI:
         die_rect = pygame.Rect(panel_rect.x + 100, panel_rect.y + 15, 30, 30)  # Smaller dice
         pygame.draw.rect(screen, WHITE, die_rect)
         pygame.draw.rect(screen, BLACK, die_rect, 2)
-        die_text = self.normal_font.render(str(die1), True, BLACK)
+        die_text = render_text(self.normal_font, str(die1), BLACK)
         die_text_rect = die_text.get_rect(center=die_rect.center)
         screen.blit(die_text, die_text_rect)
         
@@ -211,32 +509,38 @@ class UI:
         die_rect = pygame.Rect(panel_rect.x + 140, panel_rect.y + 15, 30, 30)  # Smaller dice
         pygame.draw.rect(screen, WHITE, die_rect)
         pygame.draw.rect(screen, BLACK, die_rect, 2)
-        die_text = self.normal_font.render(str(die2), True, BLACK)
+        die_text = render_text(self.normal_font, str(die2), BLACK)
         die_text_rect = die_text.get_rect(center=die_rect.center)
         screen.blit(die_text, die_text_rect)
         
         # Total and moves left
-        total_text = self.normal_font.render(f"Total: {die1 + die2}", True, BLACK)
+        total_text = render_text(self.normal_font, f"Total: {die1 + die2}", BLACK)
         screen.blit(total_text, (panel_rect.x + 190, panel_rect.y + 22))
         
         if moves_left > 0:
-            moves_text = self.normal_font.render(f"Moves left: {moves_left}", True, BLACK)
+            moves_text = render_text(self.normal_font, f"Moves left: {moves_left}", BLACK)
             screen.blit(moves_text, (panel_rect.x + 280, panel_rect.y + 22))
+        
+        return panel_rect
     
     def draw_controls(self, screen):
         controls_rect = pygame.Rect(590, 460, 414, 130)  
+        if not self._needs_redraw("controls", ()):
+            return None
+        
         pygame.draw.rect(screen, WHITE, controls_rect)
         pygame.draw.rect(screen, BLACK, controls_rect, 2)  
         
         # Title
-        title = self.heading_font.render("CONTROLS", True, BLACK)
+        title = render_text(self.heading_font, "CONTROLS", BLACK)
         screen.blit(title, (controls_rect.x + 10, controls_rect.y + 10))
         
-        controls_font = pygame.font.SysFont(None, 20)  
+        controls_font = get_font(20)  
         
         controls_left = [
             "D - Roll dice",
             "Arrow keys - Move",
+            "U - Undo move",
             "ESC - Cancel"
         ]
         
@@ -248,24 +552,29 @@ class UI:
         
         for i, control in enumerate(controls_left):
             y_pos = controls_rect.y + 40 + i * 22  
-            control_text = controls_font.render(control, True, BLACK)
+            control_text = render_text(controls_font, control, BLACK)
             screen.blit(control_text, (controls_rect.x + 20, y_pos))
         
         for i, control in enumerate(controls_right):
             y_pos = controls_rect.y + 40 + i * 22  
-            control_text = controls_font.render(control, True, BLACK)
+            control_text = render_text(controls_font, control, BLACK)
             screen.blit(control_text, (controls_rect.x + 220, y_pos))
         
+        return controls_rect
     
     def draw_game_log(self, screen, game_log):
         log_rect = pygame.Rect(20, 590, 984, 158)
+        state = (id(game_log), game_log.total, self.log_scroll_offset)
+        if not self._needs_redraw("log", state):
+            return None
+        
         pygame.draw.rect(screen, WHITE, log_rect)
         pygame.draw.rect(screen, BLACK, log_rect, 2)
         
         # Title
         title_area = pygame.Rect(log_rect.x, log_rect.y, log_rect.width, 30)
         pygame.draw.rect(screen, LIGHT_GRAY, title_area)
-        title = self.heading_font.render("GAME LOG", True, BLACK)
+        title = render_text(self.heading_font, "GAME LOG", BLACK)
         screen.blit(title, (log_rect.x + 10, log_rect.y + 5))
         
         # Create a clip area for the log entries
@@ -293,14 +602,25 @@ class UI:
         
         start_idx = max(0, min(self.log_scroll_offset, len(game_log) - LOG_ENTRIES_PER_PAGE))
         end_idx = min(start_idx + LOG_ENTRIES_PER_PAGE, len(game_log))
-        visible_entries = game_log[start_idx:end_idx]
         
-        for i, entry in enumerate(visible_entries):
-            y_pos = log_content_rect.y + 5 + i * 18  
-            log_text = self.normal_font.render(entry, True, BLACK)
+        # Each line is rendered once and kept while it stays on the visible page
+        if self.log_lines_source is not game_log:
+            self.log_lines_source = game_log
+            self.log_lines = {}
+        lines = {}
+        for i in range(start_idx, end_idx):
+            sequence = game_log.first + i
+            log_text = self.log_lines.get(sequence)
+            if log_text is None:
+                log_text = self.normal_font.render(game_log.entry(sequence), True, BLACK)
+            lines[sequence] = log_text
+            
+            y_pos = log_content_rect.y + 5 + (i - start_idx) * 18  
             screen.blit(log_text, (log_content_rect.x + 10, y_pos))
+        self.log_lines = lines
         
         screen.set_clip(original_clip)
+        return log_rect
     
     def handle_log_scroll(self, mouse_pos, mouse_click, game_log):
         if len(game_log) <= LOG_ENTRIES_PER_PAGE:
@@ -320,325 +640,54 @@ class UI:
                 
         return False
     
+    def _open_dialog(self, key, factory):
+        # Reuse the open dialog if it's the same one, otherwise build a new one
+        if self.dialog is None or self.dialog_key != key:
+            self.dialog = factory()
+            self.dialog_key = key
+        return self.dialog
+    
+    def close_dialog(self):
+        # Free the open dialog's overlay, panel and buttons
+        self.dialog = None
+        self.dialog_key = None
+    
+    def dialog_hover_state(self):
+        # Hover flags of the open dialog's buttons, so callers know when to redraw
+        if self.dialog is None:
+            return ()
+        return self.dialog.hover_state()
+    
     def draw_card_ui(self, screen, card):
         if card is None:
             return None
-            
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        screen.blit(overlay, (0, 0))
-        
-        # Card panel
-        panel_width = 300
-        panel_height = 400
-        panel_x = (SCREEN_WIDTH - panel_width) // 2
-        panel_y = (SCREEN_HEIGHT - panel_height) // 2
         
-        panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-        pygame.draw.rect(screen, WHITE, panel_rect)
-        pygame.draw.rect(screen, BLACK, panel_rect, 2)
-        
-        # Title
-        title = self.heading_font.render("Card Revealed", True, BLACK)
-        title_rect = title.get_rect(center=(panel_x + panel_width // 2, panel_y + 30))
-        screen.blit(title, title_rect)
-        
-        # Card type
-        card_type_names = {
-            CARD_TYPES["CHARACTER"]: "Character",
-            CARD_TYPES["WEAPON"]: "Weapon",
-            CARD_TYPES["ROOM"]: "Room"
-        }
-        card_type = card_type_names[card["type"]]
-        type_text = self.normal_font.render(f"Type: {card_type}", True, BLACK)
-        screen.blit(type_text, (panel_x + 50, panel_y + 80))
-        
-        # Card name
-        name_text = self.heading_font.render(card["name"], True, BLACK)
-        name_rect = name_text.get_rect(center=(panel_x + panel_width // 2, panel_y + 150))
-        screen.blit(name_text, name_rect)
-        
-        # Card visual representation
-        if card["type"] == CARD_TYPES["CHARACTER"]:
-            char_color = BLACK
-            for character in CHARACTERS:
-                if character["name"] == card["name"]:
-                    char_color = character["color"]
-                    break
-                    
-            # Draw character icon
-            pygame.draw.circle(screen, char_color, (panel_x + panel_width // 2, panel_y + 220), 40)
-            pygame.draw.circle(screen, BLACK, (panel_x + panel_width // 2, panel_y + 220), 40, 2)
-        elif card["type"] == CARD_TYPES["WEAPON"]:
-            # Draw weapon icon 
-            weapon_rect = pygame.Rect(panel_x + panel_width // 2 - 30, panel_y + 200, 60, 40)
-            pygame.draw.rect(screen, LIGHT_RED, weapon_rect)
-            pygame.draw.rect(screen, BLACK, weapon_rect, 2)
-        elif card["type"] == CARD_TYPES["ROOM"]:
-            # Draw room icon (simple house shape)
-            room_rect = pygame.Rect(panel_x + panel_width // 2 - 40, panel_y + 200, 80, 60)
-            pygame.draw.rect(screen, LIGHT_BLUE, room_rect)
-            pygame.draw.rect(screen, BLACK, room_rect, 2)
-            
-            roof_points = [(panel_x + panel_width // 2 - 50, panel_y + 200),
-                          (panel_x + panel_width // 2, panel_y + 170),
-                          (panel_x + panel_width // 2 + 50, panel_y + 200)]
-            pygame.draw.polygon(screen, LIGHT_RED, roof_points)
-            pygame.draw.polygon(screen, BLACK, roof_points, 2)
-        
-        ok_btn = Button(panel_x + 75, panel_y + 320, 150, 40, "OK", LIGHT_GREEN, BLACK, 20)
-        ok_btn.draw(screen)
-        
-        return ok_btn
+        dialog = self._open_dialog(("card", card), lambda: CardDialog(self, card))
+        dialog.draw(screen)
+        return dialog.ok_btn
     
     def draw_notification_ui(self, screen, message):
         if message is None:
             return None
-            
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        screen.blit(overlay, (0, 0))
-        
-        panel_width = 400
-        panel_height = 200
-        panel_x = (SCREEN_WIDTH - panel_width) // 2
-        panel_y = (SCREEN_HEIGHT - panel_height) // 2
-        
-        panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-        pygame.draw.rect(screen, WHITE, panel_rect)
-        pygame.draw.rect(screen, BLACK, panel_rect, 2)
-        
-        title = self.heading_font.render("Suggestion Result", True, BLACK)
-        title_rect = title.get_rect(center=(panel_x + panel_width // 2, panel_y + 30))
-        screen.blit(title, title_rect)
-        
-        message_lines = []
-        words = message.split()
-        current_line = ""
-        for word in words:
-            test_line = current_line + " " + word if current_line else word
-            test_width = self.normal_font.size(test_line)[0]
-            if test_width < panel_width - 40:
-                current_line = test_line
-            else:
-                message_lines.append(current_line)
-                current_line = word
-        if current_line:
-            message_lines.append(current_line)
-        
-        for i, line in enumerate(message_lines):
-            msg_text = self.normal_font.render(line, True, BLACK)
-            msg_rect = msg_text.get_rect(center=(panel_x + panel_width // 2, panel_y + 80 + i * 20))
-            screen.blit(msg_text, msg_rect)
-        
-        ok_btn = Button(panel_x + 125, panel_y + 140, 150, 40, "OK", LIGHT_GREEN, BLACK, 20)
-        ok_btn.draw(screen)
         
-        return ok_btn
+        dialog = self._open_dialog(("notification", message), lambda: NotificationDialog(self, message))
+        dialog.draw(screen)
+        return dialog.ok_btn
         
     def draw_suggestion_ui(self, screen, selected_character, selected_weapon):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        screen.blit(overlay, (0, 0))
-        
-        # Suggestion panel
-        panel_width = 600
-        panel_height = 400
-        panel_x = (SCREEN_WIDTH - panel_width) // 2
-        panel_y = (SCREEN_HEIGHT - panel_height) // 2
-        
-        panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-        pygame.draw.rect(screen, WHITE, panel_rect)
-        pygame.draw.rect(screen, BLACK, panel_rect, 2)
-        
-        # Title
-        title = self.heading_font.render("Make a Suggestion", True, BLACK)
-        screen.blit(title, (panel_x + 20, panel_y + 20))
-        
-        # Character selection
-        title = self.normal_font.render("Select Character:", True, BLACK)
-        screen.blit(title, (panel_x + 20, panel_y + 70))
-        
-        char_buttons = []
-        for i, character in enumerate(CHARACTERS):
-            row = i // 3
-            col = i % 3
-            btn_x = panel_x + 20 + col * 190
-            btn_y = panel_y + 100 + row * 45 
-            
-            # Highlight selected character
-            color = LIGHT_BLUE if character["name"] == selected_character else WHITE
-            btn = Button(btn_x, btn_y, 180, 35, character["name"], color, BLACK, 16)
-            
-            # Draw character color indicator
-            pygame.draw.circle(screen, character["color"], (btn_x + 15, btn_y + 17), 8)
-            
-            btn.draw(screen)
-            char_buttons.append((btn, character["name"]))
-        
-        # Weapon selection
-        title = self.normal_font.render("Select Weapon:", True, BLACK)
-        screen.blit(title, (panel_x + 20, panel_y + 200))
-        
-        weapon_buttons = []
-        for i, weapon in enumerate(WEAPONS):
-            # Weapon button
-            row = i // 3
-            col = i % 3
-            btn_x = panel_x + 20 + col * 190
-            btn_y = panel_y + 230 + row * 35  
-            
-            # Highlight selected weapon
-            color = LIGHT_BLUE if weapon == selected_weapon else WHITE
-            btn = Button(btn_x, btn_y, 180, 25, weapon, color, BLACK, 16)
-            
-            btn.draw(screen)
-            weapon_buttons.append((btn, weapon))
-        
-        # Submit and Cancel buttons
-        submit_btn = Button(panel_x + 150, panel_y + 340, 120, 40, "Submit", LIGHT_GREEN, BLACK, 20)
-        submit_btn.draw(screen)
-        
-        cancel_btn = Button(panel_x + 330, panel_y + 340, 120, 40, "Cancel", LIGHT_RED, BLACK, 20)
-        cancel_btn.draw(screen)
-        
-        return char_buttons, weapon_buttons, submit_btn, cancel_btn
+        dialog = self._open_dialog(("suggestion",), lambda: SuggestionDialog(self))
+        dialog.select(selected_character, selected_weapon)
+        dialog.draw(screen)
+        return dialog.char_buttons, dialog.weapon_buttons, dialog.submit_btn, dialog.cancel_btn
     
     def draw_accusation_ui(self, screen, selected_character, selected_weapon, selected_room):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        screen.blit(overlay, (0, 0))
-        
-        # Accusation panel
-        panel_width = 600
-        panel_height = 500
-        panel_x = (SCREEN_WIDTH - panel_width) // 2
-        panel_y = (SCREEN_HEIGHT - panel_height) // 2
-        
-        panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-        pygame.draw.rect(screen, WHITE, panel_rect)
-        pygame.draw.rect(screen, BLACK, panel_rect, 2)
-        
-        # Title
-        title = self.heading_font.render("Make an Accusation", True, BLACK)
-        screen.blit(title, (panel_x + 20, panel_y + 20))
-        
-        # Warning
-        warning = self.normal_font.render("Warning: If wrong, you will be eliminated!", True, (200, 0, 0))
-        screen.blit(warning, (panel_x + 20, panel_y + 50))
-        
-        # Character selection
-        title = self.normal_font.render("Select Character:", True, BLACK)
-        screen.blit(title, (panel_x + 20, panel_y + 90))
-        
-        char_buttons = []
-        for i, character in enumerate(CHARACTERS):
-            # Character button
-            row = i // 3
-            col = i % 3
-            btn_x = panel_x + 20 + col * 190
-            btn_y = panel_y + 120 + row * 40  
-            
-            # Highlight selected character
-            color = LIGHT_BLUE if character["name"] == selected_character else WHITE
-            btn = Button(btn_x, btn_y, 180, 30, character["name"], color, BLACK, 16)
-            
-            # Draw character color indicator
-            pygame.draw.circle(screen, character["color"], (btn_x + 15, btn_y + 15), 8)
-            
-            btn.draw(screen)
-            char_buttons.append((btn, character["name"]))
-        
-        # Weapon selection
-        title = self.normal_font.render("Select Weapon:", True, BLACK)
-        screen.blit(title, (panel_x + 20, panel_y + 210))
-        
-        weapon_buttons = []
-        for i, weapon in enumerate(WEAPONS):
-            # Weapon button
-            row = i // 3
-            col = i % 3
-            btn_x = panel_x + 20 + col * 190
-            btn_y = panel_y + 240 + row * 35
-
-            # Highlight selected weapon
-            color = LIGHT_BLUE if weapon == selected_weapon else WHITE
-            btn = Button(btn_x, btn_y, 180, 25, weapon, color, BLACK, 16)
-            
-            btn.draw(screen)
-            weapon_buttons.append((btn, weapon))
-        
-        # Room selection
-        title = self.normal_font.render("Select Room:", True, BLACK)
-        screen.blit(title, (panel_x + 20, panel_y + 320))
-        
-        room_buttons = []
-        for i, room in enumerate(ROOMS):
-            # Room button
-            row = i // 3
-            col = i % 3
-            btn_x = panel_x + 20 + col * 190
-            btn_y = panel_y + 350 + row * 35 
-
-            # Highlight selected room
-            color = LIGHT_BLUE if i == selected_room else WHITE
-            btn = Button(btn_x, btn_y, 180, 25, room["name"], color, BLACK, 16)
-            
-            btn.draw(screen)
-            room_buttons.append((btn, i))
-        
-        # Submit and Cancel buttons
-        submit_btn = Button(panel_x + 150, panel_y + 450, 120, 40, "Submit", LIGHT_GREEN, BLACK, 20)
-        submit_btn.draw(screen)
-        
-        cancel_btn = Button(panel_x + 330, panel_y + 450, 120, 40, "Cancel", LIGHT_RED, BLACK, 20)
-        cancel_btn.draw(screen)
-        
-        return char_buttons, weapon_buttons, room_buttons, submit_btn, cancel_btn
+        dialog = self._open_dialog(("accusation",), lambda: AccusationDialog(self))
+        dialog.select(selected_character, selected_weapon, selected_room)
+        dialog.draw(screen)
+        return dialog.char_buttons, dialog.weapon_buttons, dialog.room_buttons, dialog.submit_btn, dialog.cancel_btn
     
     def draw_game_over(self, screen, solution, winner=None):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        screen.blit(overlay, (0, 0))
-        
-        # Game over panel
-        panel_width = 500
-        panel_height = 300
-        panel_x = (SCREEN_WIDTH - panel_width) // 2
-        panel_y = (SCREEN_HEIGHT - panel_height) // 2
-        
-        panel_rect = pygame.Rect(panel_x, panel_y, panel_width, panel_height)
-        pygame.draw.rect(screen, WHITE, panel_rect)
-        pygame.draw.rect(screen, BLACK, panel_rect, 2)
-        
-        # Title
-        if winner:
-            title = self.title_font.render(f"{winner} Wins!", True, (0, 128, 0))
-        else:
-            title = self.title_font.render("Game Over", True, (200, 0, 0))
-        
-        title_rect = title.get_rect(center=(panel_x + panel_width // 2, panel_y + 50))
-        screen.blit(title, title_rect)
-        
-        # Solution
-        solution_text = self.heading_font.render("The solution was:", True, BLACK)
-        solution_rect = solution_text.get_rect(center=(panel_x + panel_width // 2, panel_y + 100))
-        screen.blit(solution_text, solution_rect)
-        
-        murderer_text = self.normal_font.render(f"Murderer: {solution['murderer']}", True, BLACK)
-        murderer_rect = murderer_text.get_rect(center=(panel_x + panel_width // 2, panel_y + 140))
-        screen.blit(murderer_text, murderer_rect)
-        
-        weapon_text = self.normal_font.render(f"Weapon: {solution['weapon']}", True, BLACK)
-        weapon_rect = weapon_text.get_rect(center=(panel_x + panel_width // 2, panel_y + 170))
-        screen.blit(weapon_text, weapon_rect)
-        
-        room_text = self.normal_font.render(f"Room: {solution['room']}", True, BLACK)
-        room_rect = room_text.get_rect(center=(panel_x + panel_width // 2, panel_y + 200))
-        screen.blit(room_text, room_rect)
-        
-        # Back to menu button
-        menu_btn = Button(panel_x + 150, panel_y + 240, 200, 40, "Back to Menu", LIGHT_GREEN, BLACK, 20)
-        menu_btn.draw(screen)
-        
-        return menu_btn
\ No newline at end of file
+        key = ("game_over", solution["murderer"], solution["weapon"], solution["room"], winner)
+        dialog = self._open_dialog(key, lambda: GameOverDialog(self, solution, winner))
+        dialog.draw(screen)
+        return dialog.menu_btn